@@ -1,69 +1,339 @@
-from typing import List, Optional
-from datetime import date, datetime
+import os
+from typing import List, Optional, Sequence, Tuple
+from datetime import date, datetime, time, timedelta
 
-from sqlalchemy import cast, Date
+from sqlalchemy import cast, func, insert, or_, tuple_, update
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from . import models
+from .export import query_digest
+from .profile_cache import profile_cache
+from .text_search import bigram_tsvector, get_matcher
+from ..utils.answer_cache import USER_SCOPED_INTENTS
 
-async def create_chat_history(session: AsyncSession, intent: str, role: str, content: str) -> None:
+# Cosine distance (1 - cosine similarity) under which a stored question counts as a cache hit.
+SEMANTIC_CACHE_MAX_DISTANCE = float(os.getenv("SEMANTIC_CACHE_MAX_DISTANCE", "0.12"))
+
+async def create_chat_history(
+    session: AsyncSession,
+    intent: str,
+    role: str,
+    content: str,
+    embedding: Optional[List[float]] = None,
+    user_id: int = 1,
+    thread_id: Optional[str] = None,
+    intent_source: Optional[str] = None
+) -> None:
     """
     Saves a single chat message to the database.
+    For assistant rows, `embedding` is the embedding of the question being answered.
     """
     db_msg = models.ChatHistory(
+        user_id=user_id,
+        thread_id=thread_id,
         intent=intent,
+        intent_source=intent_source,
         role=role,
-        content=content
+        content=content,
+        embedding=embedding,
+        search_vector=bigram_tsvector(content)
     )
     session.add(db_msg)
     await session.commit()
 
 
-async def get_chat_history(session: AsyncSession, target_date: date, limit: int = 5) -> List[models.ChatHistory]:
+def chat_history_row(
+    intent: str,
+    role: str,
+    content: str,
+    embedding: Optional[List[float]] = None,
+    created_at: Optional[datetime] = None,
+    user_id: int = 1,
+    thread_id: Optional[str] = None,
+    intent_source: Optional[str] = None
+) -> dict:
+    """
+    Builds the column values of a ChatHistory row for bulk inserts.
+    `created_at` is taken when the row is built, not when it is flushed.
+    """
+    return {
+        "user_id": user_id,
+        "thread_id": thread_id,
+        "intent": intent,
+        "intent_source": intent_source,
+        "role": role,
+        "content": content,
+        "embedding": embedding,
+        "search_vector": bigram_tsvector(content),
+        "created_at": created_at or datetime.utcnow(),
+    }
+
+
+async def create_chat_histories(session: AsyncSession, rows: List[dict]) -> None:
+    """
+    Saves many chat messages with a single multi-row INSERT and one commit.
+    Args:
+        rows: Values built with `chat_history_row`.
+    """
+    if not rows:
+        return
+    await session.execute(insert(models.ChatHistory).values(rows))
+    await session.commit()
+
+
+def day_bounds(target_date: date) -> Tuple[datetime, datetime]:
+    """
+    Half-open [start, end) timestamp range of a calendar day.
+    Comparing created_at against a range (instead of casting it to a date)
+    keeps the predicate sargable: indexes and partition pruning both apply.
+    """
+    start = datetime.combine(target_date, time.min)
+    return start, start + timedelta(days=1)
+
+
+async def get_chat_history(
+    session: AsyncSession,
+    target_date: date,
+    limit: int = 5,
+    user_id: Optional[int] = None
+) -> List[models.ChatHistory]:
     """
     Retrieves chat history for a specific date.
     Args:
         target_date: The date to filter by (usually today).
         limit: Number of messages to retrieve (default 5).
+        user_id: Restrict to one user's messages.
     """
+    start, end = day_bounds(target_date)
     statement = (
         select(models.ChatHistory)
-        .where(cast(models.ChatHistory.created_at, Date) == target_date)
-        .order_by(models.ChatHistory.created_at.desc())
-        .limit(limit)
+        .where(models.ChatHistory.created_at >= start)
+        .where(models.ChatHistory.created_at < end)
     )
+    if user_id is not None:
+        statement = statement.where(models.ChatHistory.user_id == user_id)
+    statement = statement.order_by(models.ChatHistory.created_at.desc()).limit(limit)
     result = await session.execute(statement)
     return result.scalars().all()
 
 
-async def get_recent_chat_history(session: AsyncSession, limit: int = 5) -> List[models.ChatHistory]:
+async def get_messages_between(
+    session: AsyncSession,
+    user_id: int,
+    after: Tuple[datetime, int],
+    end: datetime,
+    limit: int = 200
+) -> List[models.ChatHistory]:
     """
-    Retrieves the most recent chat messages (across all dates).
+    A user's messages after the (created_at, id) keyset `after` and before `end`,
+    oldest first. `after` is exclusive so it can be the watermark of a previous
+    pass; the id tie-breaker keeps rows sharing the boundary timestamp from
+    being skipped when a batch stops in the middle of them.
     """
     statement = (
         select(models.ChatHistory)
+        .where(models.ChatHistory.user_id == user_id)
+        .where(tuple_(models.ChatHistory.created_at, models.ChatHistory.id) > tuple_(*after))
+        .where(models.ChatHistory.created_at < end)
+        .order_by(models.ChatHistory.created_at, models.ChatHistory.id)
+        .limit(limit)
+    )
+    result = await session.execute(statement)
+    return result.scalars().all()
+
+
+async def get_active_users(session: AsyncSession, since: datetime) -> List[int]:
+    """
+    IDs of users who sent or received messages since `since`.
+    """
+    statement = (
+        select(models.ChatHistory.user_id)
+        .where(models.ChatHistory.created_at >= since)
+        .distinct()
+    )
+    result = await session.execute(statement)
+    return list(result.scalars().all())
+
+
+async def get_labeled_intents(
+    session: AsyncSession,
+    labels: Sequence[str],
+    limit: int = 20000,
+    sources: Sequence[str] = ("llm", "verified")
+) -> List[Tuple[str, str]]:
+    """
+    (content, intent) pairs of the newest user messages whose intent is one of `labels`
+    and was assigned by one of `sources`. Training data for the local intent classifier;
+    the classifier's own predictions ("classifier") are left out so it never learns from itself.
+    """
+    statement = (
+        select(models.ChatHistory.content, models.ChatHistory.intent)
+        .where(models.ChatHistory.role == "user")
+        .where(models.ChatHistory.intent.in_(list(labels)))
+        .where(models.ChatHistory.intent_source.in_(list(sources)))
         .order_by(models.ChatHistory.created_at.desc())
         .limit(limit)
     )
     result = await session.execute(statement)
+    return [(content, intent) for content, intent in result.all()]
+
+
+async def get_recent_chat_history(
+    session: AsyncSession,
+    user_id: int,
+    limit: int = 5,
+    thread_id: Optional[str] = None
+) -> List[models.ChatHistory]:
+    """
+    Retrieves the user's most recent chat messages (across all dates), newest first.
+    """
+    return await get_history_page(session, user_id=user_id, limit=limit, thread_id=thread_id)
+
+
+async def get_history_page(
+    session: AsyncSession,
+    user_id: int,
+    limit: int = 20,
+    before: Optional[Tuple[datetime, int]] = None,
+    thread_id: Optional[str] = None
+) -> List[models.ChatHistory]:
+    """
+    Keyset-paginated history for one user, newest first.
+    Args:
+        before: (created_at, id) of the last row of the previous page; None for the first page.
+        thread_id: Restrict to a single conversation thread.
+    Served by the (user_id|thread_id, created_at DESC, id DESC) indexes, so every
+    page is an index range scan regardless of how deep it is.
+    """
+    statement = select(models.ChatHistory).where(models.ChatHistory.user_id == user_id)
+    if thread_id is not None:
+        statement = statement.where(models.ChatHistory.thread_id == thread_id)
+    if before is not None:
+        statement = statement.where(
+            tuple_(models.ChatHistory.created_at, models.ChatHistory.id) < tuple_(*before)
+        )
+    statement = statement.order_by(
+        models.ChatHistory.created_at.desc(),
+        models.ChatHistory.id.desc()
+    ).limit(limit)
+    result = await session.execute(statement)
     return result.scalars().all()
 
 
-async def find_similar_answer(session: AsyncSession, query: str) -> Optional[models.ChatHistory]:
+async def find_similar_answer(
+    session: AsyncSession,
+    query_embedding: Optional[List[float]],
+    user_id: int = 1,
+    max_distance: float = SEMANTIC_CACHE_MAX_DISTANCE
+) -> Optional[models.ChatHistory]:
     """
-    Finds a recent assistant answer that likely matches the query.
-    Naive keyword match using ILIKE.
+    Finds the assistant answer whose original question is closest to the query.
+    Answers to user-scoped intents (built from someone's history or machine)
+    are only returned to the user they were given to.
+    Uses the HNSW index on `embedding` (cosine distance), so the lookup stays
+    sub-linear in the size of the history table.
+    Returns None when nothing is within `max_distance`.
     """
+    if not query_embedding:
+        return None
+
+    distance = models.ChatHistory.embedding.cosine_distance(query_embedding)
     statement = (
-        select(models.ChatHistory)
+        select(models.ChatHistory, distance.label("distance"))
         .where(models.ChatHistory.role == "assistant")
-        .where(models.ChatHistory.content.ilike(f"%{query}%"))
-        .order_by(models.ChatHistory.created_at.desc())
+        .where(models.ChatHistory.embedding.is_not(None))
+        .where(or_(
+            models.ChatHistory.intent.not_in(USER_SCOPED_INTENTS),
+            models.ChatHistory.user_id == user_id
+        ))
+        .order_by(distance)
         .limit(1)
     )
     result = await session.execute(statement)
-    return result.scalars().first()
+    row = result.first()
+    if row is None or row.distance > max_distance:
+        return None
+    return row[0]
+
+
+async def search_history(
+    session: AsyncSession,
+    query: str,
+    k: int = 5,
+    matcher: Optional[str] = None,
+    user_id: Optional[int] = None
+) -> List[Tuple[models.ChatHistory, float]]:
+    """
+    Ranked keyword search over chat history (no embedding model involved).
+    Args:
+        query: Free text; Korean is matched through character bigrams.
+        k: Maximum number of rows to return.
+        matcher: "bigram" (tsvector) or "trgm" (pg_trgm). Defaults to HISTORY_SEARCH_MATCHER.
+        user_id: Restrict to one user's messages.
+    Returns:
+        (row, score) pairs, best match first.
+    """
+    statement = get_matcher(matcher).statement(query, k)
+    if statement is None:
+        return []
+    if user_id is not None:
+        statement = statement.where(models.ChatHistory.user_id == user_id)
+    result = await session.execute(statement)
+    return [(row[0], float(row.score)) for row in result.all()]
+
+
+async def backfill_search_vectors(session: AsyncSession, batch_size: int = 500) -> int:
+    """
+    Fills `search_vector` for rows written before the column existed.
+    Returns the number of rows updated.
+    """
+    total = 0
+    while True:
+        statement = (
+            select(models.ChatHistory.id, models.ChatHistory.content)
+            .where(models.ChatHistory.search_vector.is_(None))
+            .limit(batch_size)
+        )
+        rows = (await session.execute(statement)).all()
+        if not rows:
+            break
+        for row_id, content in rows:
+            await session.execute(
+                update(models.ChatHistory)
+                .where(models.ChatHistory.id == row_id)
+                .values(search_vector=bigram_tsvector(content))
+            )
+        await session.commit()
+        total += len(rows)
+    return total
+
+
+async def backfill_query_digests(session: AsyncSession, batch_size: int = 500) -> int:
+    """
+    Fills `query_digest` for distillation rows written before the column existed.
+    Returns the number of rows updated.
+    """
+    total = 0
+    while True:
+        statement = (
+            select(models.KnowledgeDistillation.id, models.KnowledgeDistillation.query)
+            .where(models.KnowledgeDistillation.query_digest.is_(None))
+            .limit(batch_size)
+        )
+        rows = (await session.execute(statement)).all()
+        if not rows:
+            break
+        for row_id, query in rows:
+            await session.execute(
+                update(models.KnowledgeDistillation)
+                .where(models.KnowledgeDistillation.id == row_id)
+                .values(query_digest=query_digest(query))
+            )
+        await session.commit()
+        total += len(rows)
+    return total
 
 
 async def create_knowledge_distillation(
@@ -80,26 +350,56 @@ async def create_knowledge_distillation(
         query=query,
         intent=intent,
         gemini_response=gemini_response,
-        local_model_failure_reason=local_model_failure_reason
+        local_model_failure_reason=local_model_failure_reason,
+        query_digest=query_digest(query)
     )
     session.add(distillation_entry)
     await session.commit()
     
 
-async def create_daily_summary(session: AsyncSession, summary_date: date, summary_content: str) -> None:
+async def create_daily_summary(
+    session: AsyncSession,
+    summary_date: date,
+    summary_content: str,
+    user_id: int = 1,
+    updated_at: Optional[datetime] = None,
+    last_message_id: Optional[int] = None
+) -> None:
     """
-    Creates or updates a daily summary.
+    Creates or updates a daily summary (single upsert statement).
+    Args:
+        updated_at: Watermark - created_at of the newest message included in the summary.
+        last_message_id: Watermark tie-breaker - id of that message.
     """
-    summary = models.DailySummary(date=summary_date, summary_content=summary_content)
-    session.add(summary)
+    values = {
+        "date": datetime.combine(summary_date, time.min),
+        "user_id": user_id,
+        "summary_content": summary_content,
+        "updated_at": updated_at or datetime.utcnow(),
+        "last_message_id": last_message_id,
+    }
+    statement = pg_insert(models.DailySummary).values(**values)
+    statement = statement.on_conflict_do_update(
+        index_elements=["date", "user_id"],
+        set_={
+            "summary_content": values["summary_content"],
+            "updated_at": values["updated_at"],
+            "last_message_id": values["last_message_id"],
+        }
+    )
+    await session.execute(statement)
     await session.commit()
 
 
-async def get_daily_summary(session: AsyncSession, summary_date: date) -> models.DailySummary:
+async def get_daily_summary(session: AsyncSession, summary_date: date, user_id: int = 1) -> models.DailySummary:
     """
     Retrieves a daily summary for a specific date.
     """
-    statement = select(models.DailySummary).where(models.DailySummary.date == summary_date)
+    statement = (
+        select(models.DailySummary)
+        .where(models.DailySummary.date == datetime.combine(summary_date, time.min))
+        .where(models.DailySummary.user_id == user_id)
+    )
     result = await session.execute(statement)
     return result.scalars().first()
 
@@ -113,23 +413,43 @@ async def get_user(session: AsyncSession, user_id: int = 1) -> models.User:
     result = await session.execute(statement)
     return result.scalars().first()
 
+async def get_user_profile(session: AsyncSession, user_id: int = 1) -> Optional[dict]:
+    """
+    Returns the user's profile (`User.info`) through the in-process profile cache.
+    Only a cache miss reads the database.
+    """
+    info = profile_cache.get(user_id)
+    if info is None:
+        user = await get_user(session, user_id)
+        if not user:
+            return None
+        info = dict(user.info or {})
+        profile_cache.set(user_id, info)
+    return dict(info)
+
 async def update_user(session: AsyncSession, user_id: int, new_info_dict: dict) -> models.User:
     """
     Updates a user's profile information.
+    The keys are merged server-side (`info || patch`) in a single UPDATE ... RETURNING,
+    so there is no read-modify-write round trip. The merge is shallow: top-level
+    keys in `new_info_dict` replace existing ones.
     """
-    user = await get_user(session, user_id)
+    statement = (
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(
+            info=func.coalesce(models.User.info, cast({}, JSONB)).op("||")(cast(new_info_dict, JSONB)),
+            updated_at=datetime.utcnow()
+        )
+        .returning(models.User)
+    )
+    result = await session.execute(statement)
+    user = result.scalars().first()
+    await session.commit()
+
     if not user:
         # Or create a new user, for now we assume user 1 exists
-        return None 
-    
-    # Merge new info into existing info
-    user.info.update(new_info_dict)
-    
-    # Mark as modified to ensure JSONB updates are picked up
-    from sqlalchemy.orm.attributes import flag_modified
-    flag_modified(user, "info")
-
-    session.add(user)
-    await session.commit()
-    await session.refresh(user)
+        profile_cache.pop(user_id)
+        return None
+    profile_cache.set(user_id, dict(user.info or {}))
     return user
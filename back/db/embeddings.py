@@ -0,0 +1,29 @@
+# back/db/embeddings.py
+from typing import List, Optional
+
+from .models import EMBEDDING_DIM
+from ..llm.registry import llm_registry
+
+
+# 4. Shared Functions
+def get_embedder():
+    """ Shared embedding client (warm pool transport, concurrency limit; see back/llm/registry.py). """
+    return llm_registry.get("embedder")
+
+
+async def embed_text(text: str) -> Optional[List[float]]:
+    """
+    Embeds a single text for the semantic answer cache.
+    Returns None when the embedding model is unavailable so callers can skip the lookup.
+    """
+    if not text or not text.strip():
+        return None
+    try:
+        vector = await get_embedder().aembed_query(text)
+    except Exception as e:
+        print(f"[Embedding] Failed to embed text: {e}")
+        return None
+    if len(vector) != EMBEDDING_DIM:
+        print(f"[Embedding] Dimension mismatch: got {len(vector)}, expected {EMBEDDING_DIM}")
+        return None
+    return vector
@@ -1,7 +1,10 @@
 import os
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
 from sqlmodel import SQLModel, create_engine
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 # 1. External Imports
 from dotenv import load_dotenv
@@ -12,6 +15,9 @@ from dotenv import load_dotenv
 # 3. Shared Variables
 load_dotenv()
 
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
 POSTGRES_USER = os.getenv("POSTGRES_USER", "app_user")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "app_password")
 POSTGRES_DB = os.getenv("POSTGRES_DB", "assistant_db")
@@ -21,17 +27,42 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5433")
 DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 SYNC_DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
+# Engine profile (override per deployment through the environment)
+DB_ECHO = _env_bool("DB_ECHO", "false")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", "true")
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Per-connection prepared statement caches (SQLAlchemy adapter + asyncpg itself)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
 # 4. Shared Functions
-async_engine = create_async_engine(DATABASE_URL, echo=True, future=True)
+async_engine = create_async_engine(
+    DATABASE_URL,
+    echo=DB_ECHO,
+    future=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_recycle=DB_POOL_RECYCLE,
+    connect_args={
+        "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+    },
+)
+
+# Single session factory shared by the whole app
+async_session_factory = async_sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False
+)
 
 async def get_session() -> AsyncSession:
     """
     Dependency to get an async database session.
     """
-    async_session = sessionmaker(
-        async_engine, class_=AsyncSession, expire_on_commit=False
-    )
-    async with async_session() as session:
+    async with async_session_factory() as session:
         yield session
 
 async def init_db():
@@ -42,8 +73,66 @@ async def init_db():
     from back.db import models
     
     async with async_engine.begin() as conn:
+        for statement in _EXTENSIONS:
+            await conn.execute(text(statement))
         # await conn.run_sync(SQLModel.metadata.drop_all) # Uncomment to reset
         await conn.run_sync(SQLModel.metadata.create_all)
+        # create_all() skips existing tables, so bring older schemas up to date
+        for statement in _schema_upgrades(models):
+            await conn.execute(text(statement))
+
+_EXTENSIONS = [
+    "CREATE EXTENSION IF NOT EXISTS vector",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+]
+
+def _schema_upgrades(models) -> list:
+    """
+    Idempotent DDL for columns/indexes added after the tables were first created.
+    """
+    return [
+        f"ALTER TABLE chathistory ADD COLUMN IF NOT EXISTS embedding vector({models.EMBEDDING_DIM})",
+        "CREATE INDEX IF NOT EXISTS ix_chathistory_embedding_hnsw ON chathistory "
+        "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)",
+        "ALTER TABLE chathistory ADD COLUMN IF NOT EXISTS search_vector tsvector",
+        "CREATE INDEX IF NOT EXISTS ix_chathistory_search_vector ON chathistory USING gin (search_vector)",
+        "CREATE INDEX IF NOT EXISTS ix_chathistory_content_trgm ON chathistory USING gin (content gin_trgm_ops)",
+        "ALTER TABLE chathistory ADD COLUMN IF NOT EXISTS user_id integer NOT NULL DEFAULT 1",
+        "ALTER TABLE chathistory ADD COLUMN IF NOT EXISTS thread_id varchar",
+        "ALTER TABLE chathistory ADD COLUMN IF NOT EXISTS intent_source varchar",
+        "CREATE INDEX IF NOT EXISTS ix_chathistory_user_created ON chathistory (user_id, created_at DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_chathistory_thread_created ON chathistory (thread_id, created_at DESC, id DESC)",
+        "ALTER TABLE knowledgedistillation ADD COLUMN IF NOT EXISTS query_digest varchar",
+        "CREATE INDEX IF NOT EXISTS ix_knowledgedistillation_query_digest ON knowledgedistillation (query_digest)",
+        # DailySummary became per-user: (date) -> (date, user_id) primary key
+        "DO $$ BEGIN "
+        "IF NOT EXISTS (SELECT 1 FROM information_schema.columns "
+        "WHERE table_name = 'dailysummary' AND column_name = 'user_id') THEN "
+        "ALTER TABLE dailysummary ADD COLUMN user_id integer NOT NULL DEFAULT 1; "
+        "ALTER TABLE dailysummary DROP CONSTRAINT dailysummary_pkey; "
+        "ALTER TABLE dailysummary ADD PRIMARY KEY (date, user_id); "
+        "END IF; END $$",
+        "ALTER TABLE dailysummary ADD COLUMN IF NOT EXISTS last_message_id integer",
+    ]
+
+# Sync engine for tools or scripts that might need it (created on first use)
+_sync_engine: Optional[Engine] = None
+
+def get_sync_engine() -> Engine:
+    global _sync_engine
+    if _sync_engine is None:
+        _sync_engine = create_engine(
+            SYNC_DATABASE_URL,
+            echo=DB_ECHO,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_pre_ping=DB_POOL_PRE_PING,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return _sync_engine
 
-# Sync engine for tools or scripts that might need it
-sync_engine = create_engine(SYNC_DATABASE_URL, echo=True)
+def __getattr__(name: str):
+    # Keeps `from back.db.engine import sync_engine` working without building it at import time
+    if name == "sync_engine":
+        return get_sync_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
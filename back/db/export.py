@@ -0,0 +1,137 @@
+# back/db/export.py
+"""
+Streams KnowledgeDistillation rows out as a JSONL training set.
+
+Rows are read through a server-side cursor in (created_at, id) order, so memory
+use does not depend on table size. Near-identical queries (same text after
+normalize_query, stored as `query_digest`) are exported once: a row is skipped
+in SQL when an earlier row has the same digest, so the dedupe also holds across
+incremental runs. A watermark file makes runs incremental.
+
+Usage:
+    python -m back.db.export --out distillation.jsonl --watermark distillation.watermark.json
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+from datetime import datetime
+from typing import AsyncIterator, Optional, Tuple
+
+from sqlalchemy import and_, exists, tuple_
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from . import models
+from .engine import async_session_factory
+from ..utils.answer_cache import normalize_query
+
+# 3. Shared Variables
+EXPORT_BATCH_SIZE = 500
+
+
+# 4. Shared Functions
+def distillation_record(row: models.KnowledgeDistillation) -> dict:
+    return {
+        "id": f"kd-{row.id}",
+        "intent": row.intent,
+        "prompt": row.query,
+        "completion": row.gemini_response,
+        "failure_reason": row.local_model_failure_reason or "",
+        "created_at": row.created_at.isoformat(),
+    }
+
+
+async def stream_distillation(
+    session: AsyncSession,
+    since: Optional[Tuple[datetime, int]] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    dedupe: bool = False
+) -> AsyncIterator[models.KnowledgeDistillation]:
+    """
+    Yields distillation rows after the `since` watermark, oldest first.
+    Args:
+        since: (created_at, id) of the last exported row; None exports everything.
+        dedupe: Skip rows whose `query_digest` already appeared on an earlier row.
+            Rows without a digest are always yielded.
+    """
+    statement = select(models.KnowledgeDistillation)
+    if since is not None:
+        statement = statement.where(
+            tuple_(models.KnowledgeDistillation.created_at, models.KnowledgeDistillation.id) > tuple_(*since)
+        )
+    if dedupe:
+        earlier = aliased(models.KnowledgeDistillation)
+        statement = statement.where(~exists().where(and_(
+            earlier.query_digest == models.KnowledgeDistillation.query_digest,
+            tuple_(earlier.created_at, earlier.id)
+            < tuple_(models.KnowledgeDistillation.created_at, models.KnowledgeDistillation.id)
+        )))
+    statement = statement.order_by(
+        models.KnowledgeDistillation.created_at,
+        models.KnowledgeDistillation.id
+    ).execution_options(yield_per=batch_size)
+
+    result = await session.stream(statement)
+    async for row in result.scalars():
+        yield row
+
+
+def query_digest(query: str) -> str:
+    """ Dedupe key: 8-byte digest of the normalized query, hex-encoded (small even for millions of rows). """
+    return hashlib.blake2b(normalize_query(query).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def load_watermark(path: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if not path:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    return datetime.fromisoformat(data["created_at"]), int(data["id"])
+
+
+def save_watermark(path: str, created_at: datetime, row_id: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"created_at": created_at.isoformat(), "id": row_id}, f)
+
+
+async def export_jsonl(out, since: Optional[Tuple[datetime, int]] = None, dedupe: bool = True):
+    """
+    Writes JSONL to the file object `out`.
+    Rows whose normalized query appeared on an earlier row are skipped when `dedupe` is set.
+    Returns (rows written, (created_at, id) of the last row written or None).
+    """
+    written = 0
+    last = None
+    async with async_session_factory() as session:
+        async for row in stream_distillation(session, since=since, dedupe=dedupe):
+            last = (row.created_at, row.id)
+            out.write(json.dumps(distillation_record(row), ensure_ascii=False) + "\n")
+            written += 1
+    return written, last
+
+
+async def _main(args):
+    since = load_watermark(args.watermark)
+    out = sys.stdout if args.out == "-" else open(args.out, "a" if since else "w", encoding="utf-8")
+    try:
+        written, last = await export_jsonl(out, since=since, dedupe=not args.no_dedupe)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if args.watermark and last:
+        save_watermark(args.watermark, *last)
+    print(f"[Export] {written} rows exported", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export KnowledgeDistillation rows to JSONL")
+    parser.add_argument("--out", default="-", help="Output file ('-' for stdout); appended to when resuming")
+    parser.add_argument("--watermark", help="JSON file holding the last exported (created_at, id)")
+    parser.add_argument("--no-dedupe", action="store_true", help="Keep near-identical queries")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,145 @@
+# back/db/history_writer.py
+import asyncio
+import os
+from datetime import datetime
+from typing import List, Optional
+
+from . import crud
+from .engine import async_session_factory
+
+# 3. Shared Variables
+# "buffered": rows are queued and flushed in batches (commit latency off the request path)
+# "sync": every write commits before returning (previous behaviour)
+HISTORY_WRITE_MODE = os.getenv("HISTORY_WRITE_MODE", "buffered")
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "100"))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "0.5"))
+HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", "10000"))
+
+_STOP = object()
+
+
+class ChatHistoryWriter:
+    """
+    Write-behind persistence for ChatHistory.
+    Rows go through an asyncio queue and are flushed as multi-row INSERTs when
+    `batch_size` rows are pending or `flush_interval` seconds have passed,
+    and once more on `stop()` during shutdown.
+    """
+    def __init__(
+        self,
+        mode: str = HISTORY_WRITE_MODE,
+        batch_size: int = HISTORY_BATCH_SIZE,
+        flush_interval: float = HISTORY_FLUSH_INTERVAL,
+        max_queue: int = HISTORY_QUEUE_SIZE,
+    ):
+        if mode not in ("sync", "buffered"):
+            raise ValueError(f"Unknown history write mode '{mode}' (expected 'sync' or 'buffered')")
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rows_dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    async def start(self):
+        if self.mode != "buffered" or self.running:
+            return
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self.task = asyncio.create_task(self._run(), name="chat_history_writer")
+
+    async def stop(self):
+        """ Flushes everything queued so far and stops the background task. """
+        if not self.running:
+            return
+        await self.queue.put(_STOP)
+        await self.task
+        self.task = None
+
+    async def write(
+        self,
+        intent: str,
+        role: str,
+        content: str,
+        embedding: Optional[List[float]] = None,
+        user_id: int = 1,
+        thread_id: Optional[str] = None,
+        created_at: Optional[datetime] = None,
+        intent_source: Optional[str] = None
+    ) -> None:
+        """
+        Persists one message. In buffered mode this only enqueues the row;
+        if the writer isn't running (scripts, sync mode) it commits directly.
+        `created_at` defaults to now; pass the receipt time for rows written late.
+        `intent_source` records who labelled a user row (see ChatHistory.intent_source).
+        """
+        row = crud.chat_history_row(
+            intent=intent,
+            role=role,
+            content=content,
+            embedding=embedding,
+            created_at=created_at,
+            user_id=user_id,
+            thread_id=thread_id,
+            intent_source=intent_source
+        )
+        if self.running:
+            await self.queue.put(row)
+            return
+        await self._flush([row])
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, rows: List[dict]):
+        for attempt in (1, 2):
+            try:
+                async with async_session_factory() as session:
+                    await crud.create_chat_histories(session, rows)
+                self.rows_written += len(rows)
+                self.batches_written += 1
+                return
+            except Exception as e:
+                print(f"[HistoryWriter] Flush of {len(rows)} rows failed (attempt {attempt}): {e}")
+                if attempt == 1:
+                    await asyncio.sleep(1.0)
+        self.rows_dropped += len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "pending": self.queue.qsize() if self.queue else 0,
+            "rows_written": self.rows_written,
+            "batches_written": self.batches_written,
+            "rows_dropped": self.rows_dropped,
+        }
+
+
+# 전역 history writer
+history_writer = ChatHistoryWriter()
@@ -1,7 +1,13 @@
+import os
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from sqlmodel import SQLModel, Field, Column
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import Index
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from pgvector.sqlalchemy import Vector
+
+# Dimension of the question embeddings stored for the semantic answer cache.
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "1024"))
 
 class User(SQLModel, table=True):
     """
@@ -15,28 +21,91 @@ class User(SQLModel, table=True):
 class ChatHistory(SQLModel, table=True):
     """
     Table to store all conversation history.
+    Assistant rows carry the embedding of the question they answered,
+    which backs the semantic answer cache (HNSW, cosine distance).
+    `search_vector` holds character bigrams of `content` for lexical search.
+    Range-partitioned by month on `created_at` (see db/partitions.py).
     """
-    id: Optional[int] = Field(default=None, primary_key=True)
+    __table_args__ = (
+        Index(
+            "ix_chathistory_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        Index("ix_chathistory_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_chathistory_content_trgm",
+            "content",
+            postgresql_using="gin",
+            postgresql_ops={"content": "gin_trgm_ops"},
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True, sa_column_kwargs={"autoincrement": True})
+    user_id: int = Field(default=1, description="Owner of the message")
+    thread_id: Optional[str] = Field(default=None, description="Conversation thread the message belongs to")
     intent: str = Field(index=True, description="The intent of the conversation")
+    intent_source: Optional[str] = Field(
+        default=None,
+        description="Who assigned `intent` on user rows: 'llm' (router), 'classifier' (local fast path) or 'verified'"
+    )
     role: str = Field(description="Role of the message sender (user/assistant)")
     content: str = Field(description="Content of the message")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    embedding: Optional[List[float]] = Field(
+        default=None,
+        sa_column=Column(Vector(EMBEDDING_DIM), nullable=True),
+        description="Embedding of the answered question (assistant rows only)"
+    )
+    search_vector: Optional[str] = Field(
+        default=None,
+        sa_column=Column(TSVECTOR, nullable=True),
+        description="Character-bigram tsvector of content (see db/text_search.py)"
+    )
+    # Partition key, so it is part of the primary key
+    created_at: datetime = Field(default_factory=datetime.utcnow, primary_key=True)
+
+# Per-user / per-thread history reads are index range scans in keyset order
+Index(
+    "ix_chathistory_user_created",
+    ChatHistory.user_id,
+    ChatHistory.created_at.desc(),
+    ChatHistory.id.desc(),
+)
+Index(
+    "ix_chathistory_thread_created",
+    ChatHistory.thread_id,
+    ChatHistory.created_at.desc(),
+    ChatHistory.id.desc(),
+)
 
 class DailySummary(SQLModel, table=True):
     """
-    Table to store daily summaries. One row per day.
+    Table to store daily summaries. One row per user per day.
+    (`updated_at`, `last_message_id`) is the (created_at, id) of the newest message
+    already summarized, so the summarizer only reads messages after it.
     """
     date: datetime = Field(primary_key=True, description="The date of the summary")
+    user_id: int = Field(default=1, primary_key=True, description="Owner of the summarized messages")
     summary_content: str = Field(description="The content of the daily summary")
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    last_message_id: Optional[int] = Field(default=None, description="Id of the newest summarized message")
 
 class KnowledgeDistillation(SQLModel, table=True):
     """
     Table to store distilled knowledge for training/fine-tuning.
+    Range-partitioned by month on `created_at` (see db/partitions.py).
     """
-    id: Optional[int] = Field(default=None, primary_key=True)
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    id: Optional[int] = Field(default=None, primary_key=True, sa_column_kwargs={"autoincrement": True})
     query: str = Field(description="The user query")
     intent: str = Field(description="The identified intent")
     gemini_response: str = Field(description="The response from the advanced model (Gemini)")
     local_model_failure_reason: Optional[str] = Field(default=None, description="Reason why local model failed")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    query_digest: Optional[str] = Field(
+        default=None, index=True, description="Digest of the normalized query (export dedupe key)"
+    )
+    created_at: datetime = Field(default_factory=datetime.utcnow, primary_key=True)
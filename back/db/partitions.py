@@ -0,0 +1,273 @@
+# back/db/partitions.py
+"""
+Monthly range partitions for ChatHistory and KnowledgeDistillation.
+
+- Partitions are named <table>_pYYYYMM and cover [month start, next month start).
+- A <table>_default partition catches rows outside the prepared range.
+- Partitions older than the retention window are detached and moved to the
+  `archive` schema (cold storage, still queryable) or dropped.
+
+Usage:
+    python -m back.db.partitions            # one maintenance pass
+    python -m back.db.partitions --convert  # migrate pre-partitioning tables first
+"""
+import argparse
+import asyncio
+import os
+import re
+from datetime import date, datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from .engine import async_engine, init_db
+
+# 3. Shared Variables
+PARTITIONED_TABLES = ("chathistory", "knowledgedistillation")
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+# 0 keeps every partition forever
+HISTORY_RETENTION_MONTHS = int(os.getenv("HISTORY_RETENTION_MONTHS", "12"))
+# "archive": detach + move to ARCHIVE_SCHEMA, "drop": delete the data
+HISTORY_RETENTION_ACTION = os.getenv("HISTORY_RETENTION_ACTION", "archive")
+ARCHIVE_SCHEMA = os.getenv("HISTORY_ARCHIVE_SCHEMA", "archive")
+PARTITION_MAINTENANCE_INTERVAL = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL", str(6 * 3600)))
+
+_PARTITION_RE = re.compile(r"^(?P<table>\w+)_p(?P<year>\d{4})(?P<month>\d{2})$")
+
+
+# 4. Shared Functions
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(day: date, months: int) -> date:
+    index = day.year * 12 + (day.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+async def is_partitioned(conn: AsyncConnection, table: str) -> bool:
+    result = await conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": table}
+    )
+    return result.scalar() == "p"
+
+
+async def require_partitioned():
+    """
+    Startup guard: raises if a table still has the pre-partitioning layout.
+    Maintenance would skip such a table, so no monthly partitions are created
+    and retention never runs; the one-off `--convert` migration fixes it.
+    """
+    async with async_engine.connect() as conn:
+        missing = [table for table in PARTITIONED_TABLES if not await is_partitioned(conn, table)]
+    if missing:
+        raise RuntimeError(
+            f"Tables {missing} are not partitioned; stop the server and run "
+            "`python -m back.db.partitions --convert` once before starting it"
+        )
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> List[Tuple[str, date]]:
+    """
+    Monthly partitions currently attached to `table`, oldest first.
+    """
+    result = await conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(:table)"
+        ),
+        {"table": table}
+    )
+    partitions = []
+    for (name,) in result.all():
+        match = _PARTITION_RE.match(name)
+        if match and match.group("table") == table:
+            partitions.append((name, date(int(match.group("year")), int(match.group("month")), 1)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+async def ensure_partitions(
+    conn: AsyncConnection,
+    table: str,
+    first_month: date,
+    last_month: date
+) -> List[str]:
+    """
+    Creates the default partition and one partition per month in [first_month, last_month].
+    Returns the names of partitions that were created.
+
+    Postgres refuses a new partition while the default partition holds rows in its
+    range (they land there whenever maintenance falls behind), so those rows are
+    moved into the new month first.
+    """
+    default = f"{table}_default"
+    await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {default} PARTITION OF {table} DEFAULT"))
+    existing = {name for name, _ in await list_partitions(conn, table)}
+    created = []
+    month = month_start(first_month)
+    while month <= last_month:
+        name = partition_name(table, month)
+        if name not in existing:
+            bounds = {"start": month, "end": add_months(month, 1)}
+            range_sql = f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            stray = await conn.execute(
+                text(f"SELECT 1 FROM {default} WHERE created_at >= :start AND created_at < :end LIMIT 1"),
+                bounds
+            )
+            if stray.scalar() is None:
+                await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} {range_sql}"))
+            else:
+                # Build the month as a plain table, move the stray rows into it, then attach
+                await conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+                moved = await conn.execute(
+                    text(
+                        f"WITH moved AS (DELETE FROM {default} WHERE created_at >= :start AND created_at < :end RETURNING *) "
+                        f"INSERT INTO {name} SELECT * FROM moved"
+                    ),
+                    bounds
+                )
+                await conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} {range_sql}"))
+                print(f"[Partitions] Moved {moved.rowcount} rows from {default} into {name}")
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+async def apply_retention(
+    conn: AsyncConnection,
+    table: str,
+    today: date,
+    retention_months: int = HISTORY_RETENTION_MONTHS,
+    action: str = HISTORY_RETENTION_ACTION
+) -> List[str]:
+    """
+    Archives or drops partitions that end before the retention window.
+    Returns the names of partitions that were removed from `table`.
+    """
+    if retention_months <= 0:
+        return []
+    if action not in ("archive", "drop"):
+        raise ValueError(f"Unknown retention action '{action}' (expected 'archive' or 'drop')")
+
+    cutoff = add_months(month_start(today), -retention_months)
+    removed = []
+    for name, month in await list_partitions(conn, table):
+        if month >= cutoff:
+            break
+        if action == "drop":
+            await conn.execute(text(f"DROP TABLE {name}"))
+        else:
+            await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+            await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            await conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+        removed.append(name)
+    return removed
+
+
+async def run_maintenance(today: date = None) -> Dict[str, Dict[str, List[str]]]:
+    """
+    One maintenance pass: create upcoming partitions, then apply retention.
+    Tables that are not partitioned yet are skipped (see `convert_to_partitioned`);
+    the server refuses to start on them (see `require_partitioned`).
+    """
+    today = today or datetime.utcnow().date()
+    report = {}
+    async with async_engine.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            if not await is_partitioned(conn, table):
+                print(f"[Partitions] '{table}' is not partitioned; run `python -m back.db.partitions --convert`")
+                continue
+            created = await ensure_partitions(
+                conn, table, month_start(today), add_months(month_start(today), PARTITION_MONTHS_AHEAD)
+            )
+            removed = await apply_retention(conn, table, today)
+            report[table] = {"created": created, "removed": removed}
+    return report
+
+
+async def run_maintenance_loop(interval_seconds: float = PARTITION_MAINTENANCE_INTERVAL):
+    """
+    Background task: repeats `run_maintenance` every `interval_seconds`.
+    The first pass is expected to have run at startup.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            report = await run_maintenance()
+            for table, changes in report.items():
+                if changes["created"] or changes["removed"]:
+                    print(f"[Partitions] {table}: created={changes['created']} removed={changes['removed']}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Partitions] Maintenance failed: {e}")
+
+
+async def convert_to_partitioned(conn: AsyncConnection, table: str) -> int:
+    """
+    One-off migration of a plain (pre-partitioning) table into the partitioned layout.
+    The old table is renamed, the partitioned table is created from the model
+    metadata, rows are copied over and the old table is dropped.
+    Returns the number of copied rows.
+    """
+    from sqlmodel import SQLModel
+    from . import models  # noqa: F401  (registers the tables)
+
+    legacy = f"{table}_legacy"
+    await conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    # Index, constraint and sequence names are schema-wide; move them out of the way
+    index_rows = await conn.execute(
+        text("SELECT indexname FROM pg_indexes WHERE tablename = :legacy"), {"legacy": legacy}
+    )
+    for (index_name,) in index_rows.all():
+        await conn.execute(text(f"ALTER INDEX {index_name} RENAME TO {index_name}_legacy"))
+    sequence = (await conn.execute(
+        text("SELECT pg_get_serial_sequence(:legacy, 'id')"), {"legacy": legacy}
+    )).scalar()
+    if sequence:
+        await conn.execute(text(f"ALTER SEQUENCE {sequence} RENAME TO {legacy}_id_seq"))
+
+    sa_table = SQLModel.metadata.tables[table]
+    await conn.run_sync(lambda sync_conn: sa_table.create(sync_conn))
+
+    bounds = (await conn.execute(text(f"SELECT min(created_at), max(created_at) FROM {legacy}"))).first()
+    today = datetime.utcnow().date()
+    first = bounds[0].date() if bounds[0] else today
+    last = max(bounds[1].date() if bounds[1] else today, today)
+    await ensure_partitions(conn, table, first, add_months(month_start(last), PARTITION_MONTHS_AHEAD))
+
+    columns = ", ".join(column.name for column in sa_table.columns)
+    result = await conn.execute(text(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {legacy}"))
+    await conn.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+        f"COALESCE((SELECT max(id) FROM {table}), 0) + 1, false)"
+    ))
+    await conn.execute(text(f"DROP TABLE {legacy}"))
+    return result.rowcount
+
+
+async def _main(convert: bool):
+    await init_db()
+    if convert:
+        async with async_engine.begin() as conn:
+            for table in PARTITIONED_TABLES:
+                if await is_partitioned(conn, table):
+                    continue
+                copied = await convert_to_partitioned(conn, table)
+                print(f"[Partitions] Converted '{table}' ({copied} rows)")
+    report = await run_maintenance()
+    print(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ChatHistory/KnowledgeDistillation partition maintenance")
+    parser.add_argument("--convert", action="store_true", help="Migrate plain tables to monthly partitions first")
+    args = parser.parse_args()
+    asyncio.run(_main(args.convert))
@@ -0,0 +1,10 @@
+# back/db/profile_cache.py
+import os
+
+from ..utils.ttl_cache import TTLCache
+
+# 전역 profile cache: user_id -> User.info (read-through, refreshed on every write)
+profile_cache = TTLCache(
+    max_size=int(os.getenv("PROFILE_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("PROFILE_CACHE_TTL", "600")),
+)
@@ -0,0 +1,98 @@
+# back/db/text_search.py
+import os
+import re
+from typing import Dict, List
+
+from sqlalchemy import func, literal
+from sqlmodel import select
+
+from . import models
+
+# 3. Shared Variables
+HISTORY_SEARCH_MATCHER = os.getenv("HISTORY_SEARCH_MATCHER", "bigram")
+
+_WORD_RE = re.compile(r"[0-9A-Za-z가-힣ㄱ-ㆎ]+")
+
+
+# 4. Shared Functions
+def korean_bigrams(text: str) -> List[str]:
+    """
+    Splits text into character bigrams per word ("안녕하세요" -> 안녕, 녕하, 하세, 세요).
+    Korean has no whitespace between stems and particles, so bigrams give
+    usable recall without a morphological analyzer. One-character words are kept as-is.
+    """
+    tokens = []
+    for word in _WORD_RE.findall((text or "").lower()):
+        if len(word) == 1:
+            tokens.append(word)
+            continue
+        tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def bigram_document(text: str) -> str:
+    """ Space-joined bigrams, fed to to_tsvector('simple', ...) for indexing. """
+    return " ".join(korean_bigrams(text))
+
+
+def bigram_tsvector(text: str):
+    """ SQL expression for the `search_vector` column of a ChatHistory row. """
+    return func.to_tsvector("simple", bigram_document(text))
+
+
+class BigramMatcher:
+    """
+    Ranked match over the `search_vector` tsvector column (GIN index).
+    Any shared bigram is a candidate; ts_rank orders by how many match.
+    """
+    name = "bigram"
+
+    def statement(self, query: str, k: int):
+        terms = sorted(set(korean_bigrams(query)))
+        if not terms:
+            return None
+        # Quote each lexeme so tsquery operators in user text are inert
+        ts_query = func.to_tsquery("simple", " | ".join(f"'{t}'" for t in terms))
+        rank = func.ts_rank(models.ChatHistory.search_vector, ts_query)
+        return (
+            select(models.ChatHistory, rank.label("score"))
+            .where(models.ChatHistory.search_vector.op("@@")(ts_query))
+            .order_by(rank.desc(), models.ChatHistory.created_at.desc())
+            .limit(k)
+        )
+
+
+class TrigramMatcher:
+    """
+    Ranked match using pg_trgm word similarity over `content` (GIN gin_trgm_ops index).
+    """
+    name = "trgm"
+
+    def statement(self, query: str, k: int):
+        query = (query or "").strip()
+        if not query:
+            return None
+        score = func.word_similarity(literal(query), models.ChatHistory.content)
+        return (
+            select(models.ChatHistory, score.label("score"))
+            # `<%` is the index-supported form of word_similarity() >= threshold
+            .where(literal(query).op("<%")(models.ChatHistory.content))
+            .order_by(score.desc(), models.ChatHistory.created_at.desc())
+            .limit(k)
+        )
+
+
+MATCHERS: Dict[str, object] = {
+    BigramMatcher.name: BigramMatcher(),
+    TrigramMatcher.name: TrigramMatcher(),
+}
+
+
+def get_matcher(name: str = None):
+    """
+    Returns the matcher registered under `name` (defaults to HISTORY_SEARCH_MATCHER).
+    """
+    name = name or HISTORY_SEARCH_MATCHER
+    if name not in MATCHERS:
+        raise ValueError(f"Unknown history matcher '{name}'. Available: {list(MATCHERS)}")
+    return MATCHERS[name]
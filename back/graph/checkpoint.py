@@ -0,0 +1,262 @@
+# back/graph/checkpoint.py
+import asyncio
+import os
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from ..db.engine import SYNC_DATABASE_URL
+
+# 3. Shared Variables
+# "memory": BoundedMemorySaver (lost on restart, per process)
+# "postgres": AsyncPostgresSaver (shared by workers, survives restarts)
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "memory")
+# Memory backend only:
+# "bounded": threads are kept until evicted (LRU / TTL / byte budget)
+# "oneshot": a thread is deleted as soon as its run has been read back
+CHECKPOINT_MODE = os.getenv("CHECKPOINT_MODE", "bounded")
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "1000"))
+CHECKPOINT_TTL = float(os.getenv("CHECKPOINT_TTL", "1800"))
+CHECKPOINT_MAX_BYTES = int(os.getenv("CHECKPOINT_MAX_BYTES", str(256 * 1024 * 1024)))
+CHECKPOINT_POOL_SIZE = int(os.getenv("CHECKPOINT_POOL_SIZE", "10"))
+# Serialized values at least this large are zlib-compressed
+CHECKPOINT_COMPRESS_MIN_BYTES = int(os.getenv("CHECKPOINT_COMPRESS_MIN_BYTES", "512"))
+# Postgres backend only: threads idle for longer than this are deleted (0 keeps them forever)
+CHECKPOINT_RETENTION_DAYS = float(os.getenv("CHECKPOINT_RETENTION_DAYS", "30"))
+CHECKPOINT_RETENTION_INTERVAL = float(os.getenv("CHECKPOINT_RETENTION_INTERVAL", str(6 * 3600)))
+
+
+# 4. Shared Functions
+def _typed_size(value: Any) -> int:
+    """ Approximate size of a stored (serialized) checkpoint entry. """
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_typed_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_typed_size(item) for item in value.values())
+    return 0
+
+
+def _thread_of(config) -> Optional[str]:
+    return (config or {}).get("configurable", {}).get("thread_id")
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    MemorySaver with bounded memory. Threads are tracked in LRU order with the
+    approximate size of their serialized checkpoints, blobs and writes; after
+    every write, expired threads (idle > ttl) are dropped, then the least
+    recently used ones until both `max_threads` and `max_bytes` hold.
+    The thread being written is never evicted.
+    """
+    def __init__(
+        self,
+        max_threads: int = CHECKPOINT_MAX_THREADS,
+        ttl_seconds: float = CHECKPOINT_TTL,
+        max_bytes: int = CHECKPOINT_MAX_BYTES,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._threads: "OrderedDict[str, float]" = OrderedDict()
+        self._thread_bytes: Dict[str, int] = {}
+        self.evictions = 0
+        self.expirations = 0
+
+    def _touch(self, thread_id: Optional[str], added_bytes: int = 0):
+        if thread_id is None:
+            return
+        self._threads[thread_id] = time.monotonic()
+        self._threads.move_to_end(thread_id)
+        self._thread_bytes[thread_id] = self._thread_bytes.get(thread_id, 0) + added_bytes
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._thread_bytes.values())
+
+    def get_tuple(self, config):
+        result = super().get_tuple(config)
+        if result is not None and _thread_of(config) in self._threads:
+            self._touch(_thread_of(config))
+        return result
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = _thread_of(config)
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        try:
+            added = _typed_size(self.storage[thread_id][checkpoint_ns][checkpoint["id"]])
+            added += sum(
+                _typed_size(self.blobs.get((thread_id, checkpoint_ns, channel, version)))
+                for channel, version in new_versions.items()
+            )
+        except Exception:
+            added = 0
+        self._touch(thread_id, added)
+        self._evict(keep=thread_id)
+        return next_config
+
+    def put_writes(self, config, writes, task_id, task_path: str = ""):
+        before = self._writes_size(config)
+        super().put_writes(config, writes, task_id, task_path)
+        thread_id = _thread_of(config)
+        self._touch(thread_id, max(self._writes_size(config) - before, 0))
+        self._evict(keep=thread_id)
+
+    def _writes_size(self, config) -> int:
+        try:
+            key = (
+                _thread_of(config),
+                config["configurable"].get("checkpoint_ns", ""),
+                config["configurable"]["checkpoint_id"],
+            )
+            return _typed_size(self.writes.get(key, {}))
+        except Exception:
+            return 0
+
+    def delete_thread(self, thread_id: str) -> None:
+        """ Drops every checkpoint, write and blob of `thread_id`. """
+        self.storage.pop(thread_id, None)
+        for key in [key for key in self.writes if key[0] == thread_id]:
+            del self.writes[key]
+        for key in [key for key in self.blobs if key[0] == thread_id]:
+            del self.blobs[key]
+        self._threads.pop(thread_id, None)
+        self._thread_bytes.pop(thread_id, None)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+    def _evict(self, keep: Optional[str] = None):
+        if self.ttl_seconds > 0:
+            cutoff = time.monotonic() - self.ttl_seconds
+            while self._threads:
+                thread_id, last_used = next(iter(self._threads.items()))
+                if last_used >= cutoff or thread_id == keep:
+                    break
+                self.delete_thread(thread_id)
+                self.expirations += 1
+
+        total = self.total_bytes
+        for thread_id in list(self._threads):
+            if len(self._threads) <= self.max_threads and total <= self.max_bytes:
+                break
+            if thread_id == keep:
+                continue
+            total -= self._thread_bytes.get(thread_id, 0)
+            self.delete_thread(thread_id)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "mode": CHECKPOINT_MODE,
+            "threads": len(self._threads),
+            "bytes": self.total_bytes,
+            "max_threads": self.max_threads,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+async def release_thread(checkpointer, thread_id: str) -> None:
+    """ In "oneshot" mode, frees an in-memory thread once its final state has been read. """
+    if CHECKPOINT_MODE == "oneshot" and isinstance(checkpointer, BoundedMemorySaver):
+        await checkpointer.adelete_thread(thread_id)
+
+
+class CompressedSerializer(JsonPlusSerializer):
+    """
+    JsonPlusSerializer whose larger payloads are zlib-compressed.
+    Compressed values carry a "+zlib" suffix on their type tag, so rows written
+    before compression was enabled (or below the threshold) still load.
+    """
+    def __init__(self, min_bytes: int = CHECKPOINT_COMPRESS_MIN_BYTES, level: int = 6, **kwargs):
+        super().__init__(**kwargs)
+        self.min_bytes = min_bytes
+        self.level = level
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = super().dumps_typed(obj)
+        if isinstance(data, (bytes, bytearray)) and len(data) >= self.min_bytes:
+            return f"{type_}+zlib", zlib.compress(data, self.level)
+        return type_, data
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith("+zlib"):
+            return super().loads_typed((type_[: -len("+zlib")], zlib.decompress(payload)))
+        return super().loads_typed(data)
+
+
+async def open_checkpointer() -> Tuple[Any, Callable[[], Awaitable[None]]]:
+    """
+    Builds the checkpointer selected by CHECKPOINT_BACKEND.
+    Returns (checkpointer, async close function).
+    """
+    if CHECKPOINT_BACKEND == "memory":
+        async def _noop():
+            return None
+        return BoundedMemorySaver(), _noop
+    if CHECKPOINT_BACKEND != "postgres":
+        raise ValueError(f"Unknown checkpoint backend '{CHECKPOINT_BACKEND}' (expected 'memory' or 'postgres')")
+
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+
+    pool = AsyncConnectionPool(
+        conninfo=SYNC_DATABASE_URL,
+        max_size=CHECKPOINT_POOL_SIZE,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        open=False,
+    )
+    await pool.open()
+    saver = AsyncPostgresSaver(pool, serde=CompressedSerializer())
+    await saver.setup()
+    return saver, pool.close
+
+
+async def expire_threads(saver, retention_days: float = CHECKPOINT_RETENTION_DAYS) -> int:
+    """
+    Deletes Postgres threads whose newest checkpoint is older than `retention_days`
+    (checkpoints carry their write time in `checkpoint->>'ts'`).
+    Returns the number of threads deleted.
+    """
+    if retention_days <= 0:
+        return 0
+    async with saver.conn.connection() as conn:
+        cursor = await conn.execute(
+            "SELECT thread_id FROM checkpoints GROUP BY thread_id "
+            "HAVING max((checkpoint->>'ts')::timestamptz) < now() - %s * interval '1 day'",
+            (retention_days,)
+        )
+        thread_ids = [row["thread_id"] for row in await cursor.fetchall()]
+    for thread_id in thread_ids:
+        await saver.adelete_thread(thread_id)
+    return len(thread_ids)
+
+
+async def run_retention_loop(saver, interval_seconds: float = CHECKPOINT_RETENTION_INTERVAL):
+    """
+    Background task (Postgres backend): repeats `expire_threads` every `interval_seconds`.
+    The memory backend expires threads itself (BoundedMemorySaver).
+    """
+    while True:
+        try:
+            expired = await expire_threads(saver)
+            if expired:
+                print(f"[Checkpoint] Deleted {expired} threads idle for over {CHECKPOINT_RETENTION_DAYS:g} days")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Checkpoint] Retention pass failed: {e}")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,224 @@
+# back/graph/context.py
+"""
+Token-budgeted prompt context for the answer nodes.
+
+- `count_tokens`: cheap heuristic (no tokenizer download): one token per Hangul
+  syllable, about four characters per token for everything else.
+- Each model's budget is its context window (for the local model, the num_ctx
+  sent to Ollama) minus an output reserve and the fixed part of the prompt
+  (system prompt, template, intent line); the conversation gets HISTORY_SHARE
+  of it and tool results get the rest.
+- Recent turns are packed newest-first; older turns are folded into an
+  extractive rolling summary, cached per thread and extended incrementally.
+"""
+import math
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from ..llm.settings import LOCAL_NUM_CTX, LOCAL_OUTPUT_TOKENS
+from ..utils.ttl_cache import TTLCache
+
+# 3. Shared Variables
+MODEL_CONTEXT_WINDOWS = {
+    "local": LOCAL_NUM_CTX,
+    "gemini": int(os.getenv("GEMINI_CONTEXT_TOKENS", "24000")),
+}
+# Tokens kept free for the answer
+OUTPUT_RESERVE = {
+    "local": LOCAL_OUTPUT_TOKENS,
+    "gemini": int(os.getenv("GEMINI_OUTPUT_TOKENS", "2048")),
+}
+# Chat-template tokens per message (role markers) and slack for the heuristic token count
+TEMPLATE_TOKENS_PER_MESSAGE = 8
+ESTIMATE_SAFETY = 0.9
+HISTORY_SHARE = float(os.getenv("CONTEXT_HISTORY_SHARE", "0.35"))
+# Part of the history budget reserved for the rolling summary of older turns
+SUMMARY_SHARE = 0.3
+# ChatHistory rows loaded when a conversation starts without a checkpoint
+HISTORY_LOAD_LIMIT = int(os.getenv("CONTEXT_HISTORY_ROWS", "20"))
+SUMMARY_LINE_CHARS = 80
+
+# Appended to text cut by truncate_to_tokens
+TRUNCATION_MARK = " …(생략)"
+
+_HANGUL_RE = re.compile(r"[가-힣ㄱ-ㆎ]")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?。])\s|\n")
+
+# 전역 rolling summaries: thread_id -> (number of messages summarized, summary lines)
+summary_cache = TTLCache(
+    max_size=int(os.getenv("CONTEXT_SUMMARY_CACHE_SIZE", "1000")),
+    ttl_seconds=float(os.getenv("CONTEXT_SUMMARY_CACHE_TTL", "3600"))
+)
+
+
+# 4. Shared Functions
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    hangul = len(_HANGUL_RE.findall(text))
+    other = len(re.sub(r"\s+", "", text)) - hangul
+    return hangul + math.ceil(other / 4)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """ Longest prefix of `text` within `max_tokens`, marked when cut. """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    # count_tokens(a + b) <= count_tokens(a) + count_tokens(b), so the mark's own cost is enough slack
+    room = max_tokens - count_tokens(TRUNCATION_MARK)
+    if room <= 0:
+        return ""
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) <= room:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low].rstrip() + TRUNCATION_MARK
+
+
+def _role(message: BaseMessage) -> str:
+    return "user" if isinstance(message, HumanMessage) else "assistant"
+
+
+def _summary_line(message: BaseMessage) -> str:
+    first = _SENTENCE_END_RE.split(str(message.content).strip(), maxsplit=1)[0]
+    if len(first) > SUMMARY_LINE_CHARS:
+        first = first[:SUMMARY_LINE_CHARS].rstrip() + "…"
+    return f"- {_role(message)}: {first}"
+
+
+def rolling_summary(thread_id: Optional[str], older: Sequence[BaseMessage], max_tokens: int) -> str:
+    """
+    Extractive summary (first sentence of each turn) of the messages that no
+    longer fit the history budget. Cached per thread: only messages that fell
+    out of the window since the last call are added.
+    """
+    if not older or max_tokens <= 0:
+        return ""
+    cached = summary_cache.get(thread_id) if thread_id else None
+    # Reuse only if the thread still starts with the same message
+    if cached and cached[0] <= len(older) and cached[1][:1] == [_summary_line(older[0])]:
+        count, lines = cached
+        lines = lines + [_summary_line(m) for m in older[count:]]
+    else:
+        lines = [_summary_line(m) for m in older]
+    if thread_id:
+        summary_cache.set(thread_id, (len(older), lines))
+
+    # Newest summary lines matter most; drop the oldest when over budget
+    kept: List[str] = []
+    used = 0
+    for line in reversed(lines):
+        cost = count_tokens(line)
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(reversed(kept))
+
+
+def pack_history(
+    messages: Sequence[BaseMessage],
+    max_tokens: int,
+    thread_id: Optional[str] = None
+) -> str:
+    """
+    Conversation text within `max_tokens`: the latest message always, then
+    earlier turns newest-first, with a rolling summary of whatever is left.
+    """
+    if not messages:
+        return ""
+    summary_budget = int(max_tokens * SUMMARY_SHARE)
+    recent_budget = max_tokens - summary_budget
+
+    latest = messages[-1]
+    recent = [f"{_role(latest)}: {truncate_to_tokens(str(latest.content), recent_budget)}"]
+    used = count_tokens(recent[0])
+    cutoff = len(messages) - 1
+    for index in range(len(messages) - 2, -1, -1):
+        line = f"{_role(messages[index])}: {messages[index].content}"
+        cost = count_tokens(line)
+        if used + cost > recent_budget:
+            break
+        recent.append(line)
+        used += cost
+        cutoff = index
+
+    # Unused recent budget goes to the summary
+    summary = rolling_summary(thread_id, messages[:cutoff], summary_budget + recent_budget - used)
+    parts = [f"[Earlier conversation]\n{summary}"] if summary else []
+    parts.append("\n".join(reversed(recent)))
+    return "\n".join(parts)
+
+
+def pack_tool_results(tool_results: Any, max_tokens: int) -> str:
+    """
+    Tool outputs within `max_tokens`. Small outputs are kept whole; the rest
+    share the remaining budget evenly (water-filling).
+    """
+    if not tool_results:
+        return "No tool results."
+    if isinstance(tool_results, str):
+        return truncate_to_tokens(tool_results, max_tokens)
+
+    entries: List[Tuple[str, str]] = [
+        (str(result.get("tool_name", "tool")), str(result.get("output", "")))
+        if isinstance(result, dict) else ("tool", str(result))
+        for result in tool_results
+    ]
+    costs = [count_tokens(output) + count_tokens(name) + 2 for name, output in entries]
+    allowance = [0] * len(entries)
+    remaining = max_tokens
+    pending = sorted(range(len(entries)), key=lambda i: costs[i])
+    while pending:
+        share = remaining // len(pending)
+        index = pending.pop(0)
+        allowance[index] = min(costs[index], share)
+        remaining -= allowance[index]
+
+    return "\n".join(
+        f"[{name}] {truncate_to_tokens(output, allowance[i] - count_tokens(name) - 2)}"
+        for i, (name, output) in enumerate(entries)
+        if allowance[i] > count_tokens(name) + 2
+    ) or "No tool results."
+
+
+def context_budget(model: str, fixed_prompt: str = "", messages: int = 2) -> int:
+    """
+    Tokens left for the packed slots: the model's window (with slack for the
+    estimate) minus the output reserve, the fixed prompt text and the per-message template.
+    """
+    window = int(MODEL_CONTEXT_WINDOWS[model] * ESTIMATE_SAFETY)
+    fixed = count_tokens(fixed_prompt) + messages * TEMPLATE_TOKENS_PER_MESSAGE
+    return max(window - OUTPUT_RESERVE[model] - fixed, 0)
+
+
+def build_context(
+    state: Dict[str, Any],
+    model: str,
+    thread_id: Optional[str] = None,
+    fixed_prompt: str = ""
+) -> Dict[str, str]:
+    """
+    Prompt slots for `model` ("local" or "gemini"): {"history": ..., "tool_results": ...}.
+    `fixed_prompt` is everything else sent with them (system prompt + template
+    with empty slots); its size comes out of the budget.
+    """
+    budget = context_budget(model, fixed_prompt)
+    history = pack_history(state.get("messages") or [], int(budget * HISTORY_SHARE), thread_id)
+    tool_budget = budget - count_tokens(history)
+    return {
+        "history": history,
+        "tool_results": pack_tool_results(state.get("tool_results"), tool_budget),
+    }
+
+
+def thread_id_of(config: Optional[Dict[str, Any]]) -> Optional[str]:
+    return ((config or {}).get("configurable") or {}).get("thread_id")
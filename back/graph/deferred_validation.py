@@ -0,0 +1,34 @@
+# back/graph/deferred_validation.py
+from typing import Any, Dict, Optional, Tuple
+
+from .local_validator import validation_metrics
+from .nodes.call_gemini import call_gemini
+from ..utils.rate_limiter import gemini_limiter
+from .nodes.validate_answer import judge_answer, rejection_reason
+
+async def validate_deferred(values: Dict[str, Any], judge_llm, fallback_llm) -> Tuple[str, Optional[str]]:
+    """
+    Runs the Gemini judge for an answer that was already sent (validation_deferred).
+    Returns (verdict, correction); verdict is "approved", "corrected" (with the
+    Gemini correction), "rejected" (no usable correction) or "unjudged" (judge unavailable).
+    `values` is the final graph state of the turn.
+    """
+    user_intent = values.get("user_intent", "")
+    answer = values.get("final_answer", "")
+    try:
+        # Nobody is waiting on this answer, so queue for a judge token instead of skipping
+        await gemini_limiter.acquire("judge")
+        if await judge_answer(judge_llm, user_intent, answer):
+            return "approved", None
+    except Exception as e:
+        validation_metrics.record("judge_unavailable")
+        print(f"[Validation] Deferred judge skipped (Gemini unavailable): {e}")
+        return "unjudged", None
+
+    print("[Validation] Deferred judge rejected the answer; asking Gemini for a correction")
+    state = {**values, "tool_results": rejection_reason(user_intent), "log": []}
+    result = await call_gemini(state, llm=fallback_llm, budget="correction")
+    correction = result.get("final_answer")
+    if not correction or correction == answer:
+        return "rejected", None
+    return "corrected", correction
@@ -1,28 +1,39 @@
+import os
 from functools import partial
-from langchain_ollama import ChatOllama
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import Any, Optional
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 
+from .checkpoint import BoundedMemorySaver
 from .state import AgentState
 from .nodes.clarify_intent import clarify_intent
 from .nodes.initial_planner import initial_planner
 from .nodes.db_search import db_search
+from .nodes.speculative_intent import speculative_intent
 from .nodes.update_user_profile import update_user_profile
 from .nodes.execute_tools import execute_tools
+from .nodes.reduce_tool_outputs import reduce_tool_outputs
 from .nodes.synthesize_answer import synthesize_answer
 from .nodes.check_with_8b import check_with_8b
 from .nodes.validate_answer import validate_answer
 from .nodes.call_gemini import call_gemini
 from .nodes.give_final_answer import give_final_answer
 
+from ..llm.registry import llm_registry
 from ..tools.manager import MCPToolManager
+from ..tools.registry import ToolRegistry
+
+# "speculative": the answer-cache lookup runs concurrently with intent classification
+# "sequential": clarify_intent first, then db_search
+GRAPH_FANOUT_MODE = os.getenv("GRAPH_FANOUT_MODE", "speculative")
 
 # --- Conditional Edges (Routing Logic) ---
 
 def route_after_intent(state: AgentState) -> str:
     """Routes to the correct node based on the classified user intent."""
     intent = state.get("user_intent", "Chat")
+    if state.get("db_hit"):
+        print("  > Speculative cache hit, skipping the plan")
+        return "give_final_answer"
     if intent == "Profile":
         print("  > ?덉쉵堉?琉?筌??덉슦萸?? Updating User Profile")
         return "update_user_profile"
@@ -39,9 +50,9 @@ def should_use_db_result(state: AgentState) -> str:
     return "initial_planner"
 
 def should_execute_tools(state: AgentState) -> str:
-    """If the tool queue has items, execute next tool; otherwise move on."""
+    """If the tool plan has items, execute it; otherwise move on."""
     if state.get("tool_queue") and len(state.get("tool_queue", [])) > 0:
-        print("  > ?덉쉵堉?琉?筌??덉슦萸?? Executing Next Tool")
+        print("  > ?덉쉵堉?琉?筌??덉슦萸?? Executing Tool Plan")
         return "execute_tools"
     else:
         print("  > ?덉쉵堉?琉?筌??덉슦萸?? No Tools, Going to Chat")
@@ -52,7 +63,7 @@ def should_continue_tools(state: AgentState) -> str:
     if state.get("tool_queue") and len(state.get("tool_queue", [])) > 0:
         return "execute_tools"
     if state.get("tool_results") and len(state.get("tool_results", [])) > 0:
-        return "synthesize_answer"
+        return "reduce_tool_outputs"
     return "check_with_8b"
 
 def is_answer_satisfactory(state: AgentState) -> str:
@@ -67,22 +78,32 @@ def is_answer_satisfactory(state: AgentState) -> str:
 
 # --- Graph Definition ---
 
-async def create_graph(tool_manager: MCPToolManager):
-    # 1. Initialize Models
-    local_llm = ChatOllama(model="exaone3.5", temperature=0)
-    gemini_llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp", temperature=0)
+async def create_graph(
+    tool_manager: MCPToolManager,
+    tool_registry: Optional[ToolRegistry] = None,
+    checkpointer: Any = None
+):
+    # 1. Models (shared clients with per-model concurrency limits)
+    local_llm = llm_registry.get("local")
+    gemini_llm = llm_registry.get("gemini")
     
-    # 2. Get Tools
-    tools = await tool_manager.get_langchain_tools()
+    # 2. Get Tools (precompiled once; nodes share the registry instance)
+    if tool_registry is None:
+        tool_registry = ToolRegistry(await tool_manager.get_langchain_tools())
 
     workflow = StateGraph(AgentState)
     
     # --- Add Nodes ---
-    workflow.add_node("clarify_intent", partial(clarify_intent, llm=local_llm))
+    if GRAPH_FANOUT_MODE == "speculative":
+        # Same node id so streamed node events still match the frontend graph
+        workflow.add_node("clarify_intent", partial(speculative_intent, llm=local_llm))
+    else:
+        workflow.add_node("clarify_intent", partial(clarify_intent, llm=local_llm))
     workflow.add_node("db_search", db_search)
-    workflow.add_node("initial_planner", partial(initial_planner, llm=local_llm, tools=tools))
+    workflow.add_node("initial_planner", partial(initial_planner, llm=local_llm, registry=tool_registry))
     workflow.add_node("update_user_profile", partial(update_user_profile, llm=local_llm))
-    workflow.add_node("execute_tools", partial(execute_tools, tools=tools))
+    workflow.add_node("execute_tools", partial(execute_tools, registry=tool_registry))
+    workflow.add_node("reduce_tool_outputs", partial(reduce_tool_outputs, llm=local_llm))
     workflow.add_node("synthesize_answer", partial(synthesize_answer, llm=local_llm))
     workflow.add_node("check_with_8b", partial(check_with_8b, llm=local_llm))
     workflow.add_node("validate_answer", partial(validate_answer, llm=gemini_llm))
@@ -98,7 +119,8 @@ async def create_graph(tool_manager: MCPToolManager):
         route_after_intent,
         {
             "update_user_profile": "update_user_profile",
-            "db_search": "db_search"
+            "db_search": "db_search",
+            "give_final_answer": "give_final_answer"
         }
     )
 
@@ -114,7 +136,7 @@ async def create_graph(tool_manager: MCPToolManager):
     # 2. The profile node goes directly to the end
     workflow.add_edge("update_user_profile", "give_final_answer")
 
-    # 3. Execute tools in queue order (if any)
+    # 3. Execute the tool plan (if any); independent steps run concurrently
     workflow.add_conditional_edges(
         "initial_planner",
         should_execute_tools,
@@ -124,17 +146,19 @@ async def create_graph(tool_manager: MCPToolManager):
         }
     )
 
-    # 4. Tool queue loop: execute until empty
+    # 4. After the plan has run, synthesize (or chat if nothing ran)
     workflow.add_conditional_edges(
         "execute_tools",
         should_continue_tools,
         {
             "execute_tools": "execute_tools",
-            "synthesize_answer": "synthesize_answer",
+            "reduce_tool_outputs": "reduce_tool_outputs",
             "check_with_8b": "check_with_8b"
         }
     )
 
+    # Oversized tool outputs are cut down to what the question needs before synthesis
+    workflow.add_edge("reduce_tool_outputs", "synthesize_answer")
     workflow.add_edge("synthesize_answer", "validate_answer")
     workflow.add_edge("check_with_8b", "validate_answer")
     
@@ -150,6 +174,8 @@ async def create_graph(tool_manager: MCPToolManager):
     workflow.add_edge("call_gemini", "give_final_answer")
     workflow.add_edge("give_final_answer", END)
     
-    memory = MemorySaver()
+    # Checkpointer from open_checkpointer() (Postgres or bounded memory); bounded memory by default
+    if checkpointer is None:
+        checkpointer = BoundedMemorySaver()
     
-    return workflow.compile(checkpointer=memory)
+    return workflow.compile(checkpointer=checkpointer)
@@ -0,0 +1,278 @@
+# back/graph/intent_classifier.py
+"""
+Local intent classifier: hashed character n-gram TF-IDF + softmax regression in NumPy.
+
+`clarify_intent` asks it first and only falls back to the LLM router when the
+top probability is below INTENT_CONFIDENCE_THRESHOLD. The model is trained
+from ChatHistory user rows labelled by the LLM router (or verified), never
+from its own predictions, plus the seed examples below and stored as a
+single .npz file.
+
+Usage:
+    python -m back.graph.intent_classifier train [--limit 20000] [--out intent_model.npz]
+"""
+import argparse
+import asyncio
+import os
+import re
+import unicodedata
+import zlib
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..prompts import INTENT_CLASSIFIER_PROMPT
+
+# 3. Shared Variables
+INTENT_LABELS = ("Search", "Database", "System", "Profile", "Chat")
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "intent_model.npz")
+# Below this top-class probability the LLM router decides
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.8"))
+INTENT_HASH_FEATURES = 2 ** 15
+INTENT_NGRAM_RANGE = (1, 3)
+
+# Bootstrap data so a model can be trained before any history exists
+SEED_EXAMPLES: List[Tuple[str, str]] = [
+    ("오늘 뉴스 검색해줘", "Search"),
+    ("최신 파이썬 버전 찾아줘", "Search"),
+    ("이 에러 메시지 구글에서 찾아봐", "Search"),
+    ("latest news about AI", "Search"),
+    ("어제 내가 뭐 했지?", "Database"),
+    ("지난주에 무슨 얘기 했었지", "Database"),
+    ("내 정보 알려줘", "Database"),
+    ("what did we talk about last week", "Database"),
+    ("test.py 파일 만들어줘", "System"),
+    ("현재 폴더 목록 보여줘", "System"),
+    ("이 파일 내용 읽어줘", "System"),
+    ("delete the temp directory", "System"),
+    ("내 이름은 민수야", "Profile"),
+    ("나는 개발자로 일하고 있어", "Profile"),
+    ("나는 커피보다 차를 좋아해", "Profile"),
+    ("I live in Seoul", "Profile"),
+    ("안녕 반가워", "Chat"),
+    ("재귀 함수가 뭔지 설명해줘", "Chat"),
+    ("이 코드 로직 좀 설명해줘", "Chat"),
+    ("tell me a joke", "Chat"),
+]
+
+_PROMPT_EXAMPLE_RE = re.compile(r'Input:\s*"(?P<text>[^"]+)"\s*->\s*(?P<label>\w+)')
+_WS_RE = re.compile(r"\s+")
+
+
+# 4. Shared Functions
+def prompt_examples() -> List[Tuple[str, str]]:
+    """ (text, label) pairs from the <Examples> block of INTENT_CLASSIFIER_PROMPT. """
+    return [
+        (match.group("text"), match.group("label"))
+        for match in _PROMPT_EXAMPLE_RE.finditer(INTENT_CLASSIFIER_PROMPT)
+        if match.group("label") in INTENT_LABELS
+    ]
+
+
+def _char_ngrams(text: str, ngram_range: Tuple[int, int] = INTENT_NGRAM_RANGE) -> List[str]:
+    text = _WS_RE.sub(" ", unicodedata.normalize("NFKC", text or "").lower()).strip()
+    padded = f" {text} "
+    low, high = ngram_range
+    return [padded[i:i + n] for n in range(low, high + 1) for i in range(len(padded) - n + 1)]
+
+
+def _hash_counts(text: str, n_features: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ Sparse (indices, sublinear tf) of one text; crc32 keeps hashing stable across processes. """
+    buckets = [zlib.crc32(gram.encode("utf-8")) % n_features for gram in _char_ngrams(text)]
+    if not buckets:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    indices, counts = np.unique(np.asarray(buckets, dtype=np.int64), return_counts=True)
+    return indices, (1.0 + np.log(counts)).astype(np.float32)
+
+
+class _SparseRows:
+    """ Minimal CSR matrix: enough for X @ W and X.T @ G without SciPy. """
+    def __init__(self, rows: List[Tuple[np.ndarray, np.ndarray]]):
+        lengths = np.asarray([len(indices) for indices, _ in rows], dtype=np.int64)
+        self.n_rows = len(rows)
+        self.row_of = np.repeat(np.arange(self.n_rows), lengths)
+        self.indices = np.concatenate([indices for indices, _ in rows]) if rows else np.zeros(0, dtype=np.int64)
+        self.data = np.concatenate([data for _, data in rows]) if rows else np.zeros(0, dtype=np.float32)
+
+    def scale_columns(self, column_weights: np.ndarray):
+        self.data = self.data * column_weights[self.indices]
+
+    def normalize_rows(self):
+        norms = np.zeros(self.n_rows, dtype=np.float32)
+        np.add.at(norms, self.row_of, self.data ** 2)
+        norms = np.sqrt(norms)
+        norms[norms == 0] = 1.0
+        self.data = self.data / norms[self.row_of]
+
+    def dot(self, weights: np.ndarray) -> np.ndarray:
+        out = np.zeros((self.n_rows, weights.shape[1]), dtype=np.float32)
+        np.add.at(out, self.row_of, self.data[:, None] * weights[self.indices])
+        return out
+
+    def t_dot(self, grad_rows: np.ndarray, n_features: int) -> np.ndarray:
+        out = np.zeros((n_features, grad_rows.shape[1]), dtype=np.float32)
+        np.add.at(out, self.indices, self.data[:, None] * grad_rows[self.row_of])
+        return out
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class IntentClassifier:
+    """
+    Multinomial logistic regression over L2-normalized TF-IDF vectors.
+    Weights are dense (n_features x n_labels, ~640KB) so prediction is one gather.
+    """
+    def __init__(
+        self,
+        weights: np.ndarray,
+        bias: np.ndarray,
+        idf: np.ndarray,
+        labels: Sequence[str] = INTENT_LABELS
+    ):
+        self.weights = weights.astype(np.float32)
+        self.bias = bias.astype(np.float32)
+        self.idf = idf.astype(np.float32)
+        self.labels = tuple(labels)
+        self.n_features = self.weights.shape[0]
+
+    def _vectorize(self, texts: Sequence[str]) -> _SparseRows:
+        rows = _SparseRows([_hash_counts(text, self.n_features) for text in texts])
+        rows.scale_columns(self.idf)
+        rows.normalize_rows()
+        return rows
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        return _softmax(self._vectorize(texts).dot(self.weights) + self.bias)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """ Returns (label, probability of that label). """
+        proba = self.predict_proba([text])[0]
+        best = int(proba.argmax())
+        return self.labels[best], float(proba[best])
+
+    @classmethod
+    def train(
+        cls,
+        samples: Sequence[Tuple[str, str]],
+        labels: Sequence[str] = INTENT_LABELS,
+        n_features: int = INTENT_HASH_FEATURES,
+        epochs: int = 200,
+        learning_rate: float = 2.0,
+        l2: float = 1e-4
+    ) -> "IntentClassifier":
+        """
+        Full-batch gradient descent on the cross-entropy loss.
+        Classes are weighted by inverse frequency so "Chat"-heavy history doesn't drown the rest.
+        """
+        label_index = {label: i for i, label in enumerate(labels)}
+        samples = [(text, label) for text, label in samples if label in label_index and text]
+        if not samples:
+            raise ValueError("No labeled samples to train on")
+
+        raw = [_hash_counts(text, n_features) for text, _ in samples]
+        doc_freq = np.zeros(n_features, dtype=np.float32)
+        for indices, _ in raw:
+            doc_freq[indices] += 1
+        idf = (np.log((1 + len(raw)) / (1 + doc_freq)) + 1.0).astype(np.float32)
+
+        rows = _SparseRows(raw)
+        rows.scale_columns(idf)
+        rows.normalize_rows()
+
+        targets = np.zeros((len(samples), len(labels)), dtype=np.float32)
+        targets[np.arange(len(samples)), [label_index[label] for _, label in samples]] = 1.0
+        class_counts = targets.sum(axis=0)
+        class_weights = np.where(class_counts > 0, len(samples) / (len(labels) * np.maximum(class_counts, 1)), 0.0)
+        sample_weights = (targets @ class_weights).astype(np.float32)[:, None]
+
+        weights = np.zeros((n_features, len(labels)), dtype=np.float32)
+        bias = np.zeros(len(labels), dtype=np.float32)
+        for _ in range(epochs):
+            proba = _softmax(rows.dot(weights) + bias)
+            grad_rows = (proba - targets) * sample_weights / len(samples)
+            weights -= learning_rate * (rows.t_dot(grad_rows, n_features) + l2 * weights)
+            bias -= learning_rate * grad_rows.sum(axis=0)
+        return cls(weights, bias, idf, labels)
+
+    def save(self, path: str = INTENT_MODEL_PATH) -> None:
+        np.savez_compressed(
+            path, weights=self.weights, bias=self.bias, idf=self.idf, labels=np.asarray(self.labels)
+        )
+
+    @classmethod
+    def load(cls, path: str = INTENT_MODEL_PATH) -> "IntentClassifier":
+        with np.load(path) as data:
+            return cls(data["weights"], data["bias"], data["idf"], [str(label) for label in data["labels"]])
+
+
+# 전역 classifier (reloaded when the model file changes, e.g. after `train`)
+_classifier: Optional[IntentClassifier] = None
+_classifier_mtime: Optional[float] = None
+
+
+def get_intent_classifier(path: str = INTENT_MODEL_PATH) -> Optional[IntentClassifier]:
+    """ The persisted classifier, or None if no model has been trained yet. """
+    global _classifier, _classifier_mtime
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _classifier is None or mtime != _classifier_mtime:
+        try:
+            _classifier = IntentClassifier.load(path)
+            _classifier_mtime = mtime
+        except Exception as e:
+            print(f"[Intent] Failed to load intent model '{path}': {e}")
+            return None
+    return _classifier
+
+
+async def load_training_samples(limit: int = 20000) -> List[Tuple[str, str]]:
+    from ..db import crud
+    from ..db.engine import async_session_factory
+
+    async with async_session_factory() as session:
+        history = await crud.get_labeled_intents(session, INTENT_LABELS, limit=limit)
+    return history + prompt_examples() + SEED_EXAMPLES
+
+
+async def _train(args):
+    samples = await load_training_samples(limit=args.limit)
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(samples))
+    holdout = [samples[i] for i in order[: len(samples) // 10]]
+    counts = {label: sum(1 for _, l in samples if l == label) for label in INTENT_LABELS}
+    print(f"[Intent] {len(samples)} samples: {counts}")
+
+    if holdout:
+        train_part = [samples[i] for i in order[len(holdout):]]
+        model = IntentClassifier.train(train_part)
+        correct = confident = confident_correct = 0
+        for text, label in holdout:
+            predicted, probability = model.predict(text)
+            correct += predicted == label
+            if probability >= INTENT_CONFIDENCE_THRESHOLD:
+                confident += 1
+                confident_correct += predicted == label
+        print(
+            f"[Intent] Holdout accuracy {correct / len(holdout):.3f}; "
+            f"{confident}/{len(holdout)} above threshold at "
+            f"{confident_correct / max(confident, 1):.3f} accuracy"
+        )
+
+    model = IntentClassifier.train(samples)
+    model.save(args.out)
+    print(f"[Intent] Model saved to {args.out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local intent classifier")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    train_parser = subparsers.add_parser("train", help="Retrain from ChatHistory and save the model")
+    train_parser.add_argument("--limit", type=int, default=20000, help="Newest labeled user messages to use")
+    train_parser.add_argument("--out", default=INTENT_MODEL_PATH, help="Model file (.npz)")
+    asyncio.run(_train(parser.parse_args()))
@@ -0,0 +1,199 @@
+# back/graph/local_validator.py
+"""
+Scored local validation of a draft answer, run before the Gemini judge.
+
+Each check returns a penalty in [0, 1] that is weighted into a single score:
+- score >= LOCAL_VALIDATOR_ACCEPT and the answer is relevant: "accept", the Gemini judge is skipped
+- score <= LOCAL_VALIDATOR_REJECT: "reject", straight to call_gemini without a judge call
+- anything else: "judge", the Gemini judge decides (blocking or deferred)
+
+Passing every penalty check only shows the answer is well-formed, so "accept"
+also needs positive evidence of relevance: the answer reuses enough of the
+question's terms, or is grounded in the tool outputs.
+"""
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from ..db.text_search import korean_bigrams
+
+# 3. Shared Variables
+LOCAL_VALIDATOR_ACCEPT = float(os.getenv("LOCAL_VALIDATOR_ACCEPT", "0.85"))
+LOCAL_VALIDATOR_REJECT = float(os.getenv("LOCAL_VALIDATOR_REJECT", "0.4"))
+# Below this share of Hangul among letters the answer is not considered Korean
+HANGUL_MIN_RATIO = float(os.getenv("HANGUL_MIN_RATIO", "0.5"))
+# Relevance evidence required for "accept": share of question terms found in the answer...
+LOCAL_VALIDATOR_MIN_RELEVANCE = float(os.getenv("LOCAL_VALIDATOR_MIN_RELEVANCE", "0.3"))
+# ...or share of answer terms found in the tool outputs
+TOOL_GROUNDING_MIN = 0.2
+# Tool outputs with fewer terms are too short to judge grounding
+MIN_SOURCE_TERMS = 20
+
+CHECK_WEIGHTS: Dict[str, float] = {
+    "hangul_ratio": 0.6,
+    "truncation": 0.4,
+    "repetition": 0.6,
+    "length": 0.3,
+    "tool_overlap": 0.3,
+}
+
+_CODE_RE = re.compile(r"```.*?```|`[^`]*`", re.DOTALL)
+_URL_RE = re.compile(r"https?://\S+")
+_HANGUL_RE = re.compile(r"[가-힣]")
+_LETTER_RE = re.compile(r"[A-Za-z가-힣一-鿿぀-ヿ]")
+# Sentence endings that count as finished: punctuation, closing brackets/markdown, Korean endings
+_FINISHED_RE = re.compile(r"([.!?。…~)\]\"'*`>|]|[다요죠네음함임됨까니오]|\d)\s*$")
+
+
+# 4. Shared Functions
+def _prose(text: str) -> str:
+    """ Text without code and URLs, which are legitimately non-Korean. """
+    return _URL_RE.sub(" ", _CODE_RE.sub(" ", text))
+
+
+def check_hangul_ratio(answer: str) -> Tuple[float, Optional[str]]:
+    letters = _LETTER_RE.findall(_prose(answer))
+    if len(letters) < 5:
+        return 0.0, None
+    ratio = len(_HANGUL_RE.findall("".join(letters))) / len(letters)
+    if ratio >= HANGUL_MIN_RATIO:
+        return 0.0, None
+    return 1.0 - ratio / HANGUL_MIN_RATIO, f"Hangul ratio {ratio:.2f}"
+
+
+def check_truncation(answer: str) -> Tuple[float, Optional[str]]:
+    if answer.count("```") % 2:
+        return 1.0, "unclosed code block"
+    if _FINISHED_RE.search(_CODE_RE.sub("", answer).strip() or "."):
+        return 0.0, None
+    return 0.7, "unfinished last sentence"
+
+
+def check_repetition(answer: str) -> Tuple[float, Optional[str]]:
+    """ Degenerate output: repeated lines or one short phrase looping. """
+    lines = [line.strip() for line in answer.splitlines() if len(line.strip()) > 10]
+    if len(lines) >= 4:
+        duplicate_share = 1 - len(set(lines)) / len(lines)
+        if duplicate_share > 0.3:
+            return min(1.0, duplicate_share * 2), f"{duplicate_share:.0%} repeated lines"
+
+    compact = re.sub(r"\s+", " ", answer)
+    if len(compact) >= 80:
+        grams = Counter(compact[i:i + 20] for i in range(0, len(compact) - 20, 5))
+        top_count = grams.most_common(1)[0][1]
+        covered = top_count * 20 / len(compact)
+        if top_count >= 4 and covered > 0.3:
+            return min(1.0, covered * 1.5), "looping phrase"
+    return 0.0, None
+
+
+def check_length(question: str, answer: str) -> Tuple[float, Optional[str]]:
+    answer_len = len(answer.strip())
+    if answer_len < 5:
+        return 1.0, "answer too short"
+    if len(question) > 30 and answer_len < 15:
+        return 0.6, "answer short for the question"
+    if answer_len > 4000 and answer_len > 60 * max(len(question), 1):
+        return 0.5, "answer unusually long"
+    return 0.0, None
+
+
+def tool_grounding(answer: str, tool_outputs: List[str]) -> Optional[float]:
+    """ Share of the answer's terms found in the tool outputs; None when the outputs are too short to tell. """
+    source = korean_bigrams(" ".join(tool_outputs))
+    if len(source) < MIN_SOURCE_TERMS:
+        return None
+    answer_terms = set(korean_bigrams(answer))
+    if not answer_terms:
+        return 0.0
+    return len(answer_terms & set(source)) / len(answer_terms)
+
+
+def question_overlap(question: str, answer: str) -> float:
+    """ Share of the question's terms (bigrams, with repeats) that the answer reuses. """
+    query = Counter(korean_bigrams(question))
+    if not query:
+        return 0.0
+    answer_terms = set(korean_bigrams(answer))
+    return sum(count for term, count in query.items() if term in answer_terms) / sum(query.values())
+
+
+def check_tool_overlap(answer: str, tool_outputs: List[str]) -> Tuple[float, Optional[str]]:
+    """ An answer built on tool results should reuse some of their wording. """
+    overlap = tool_grounding(answer, tool_outputs)
+    if overlap is None or overlap >= TOOL_GROUNDING_MIN:
+        return 0.0, None
+    if overlap == 0.0:
+        return 1.0, "no overlap with tool results"
+    return 1.0 - overlap / TOOL_GROUNDING_MIN, f"tool overlap {overlap:.2f}"
+
+
+def check_relevance(question: str, answer: str, tool_outputs: List[str]) -> Tuple[bool, str]:
+    """ Positive evidence that the answer addresses the question (required for "accept"). """
+    grounding = tool_grounding(answer, tool_outputs)
+    if grounding is not None and grounding >= TOOL_GROUNDING_MIN:
+        return True, f"grounded in tool results ({grounding:.2f})"
+    overlap = question_overlap(question, answer)
+    if overlap >= LOCAL_VALIDATOR_MIN_RELEVANCE:
+        return True, f"question overlap {overlap:.2f}"
+    return False, f"no relevance signal (question overlap {overlap:.2f})"
+
+
+class LocalVerdict:
+    """ Outcome of `score_answer`: the tier, the score, the failed checks and the relevance evidence. """
+    def __init__(self, score: float, reasons: List[str], relevant: bool = False, relevance: str = ""):
+        self.score = score
+        self.reasons = reasons
+        self.relevant = relevant
+        self.relevance = relevance
+        if score >= LOCAL_VALIDATOR_ACCEPT and relevant:
+            self.tier = "accept"
+        elif score <= LOCAL_VALIDATOR_REJECT:
+            self.tier = "reject"
+        else:
+            self.tier = "judge"
+
+    def describe(self) -> str:
+        checks = ", ".join(self.reasons) or "all checks passed"
+        return f"{self.tier} (score {self.score:.2f}; {checks}; {self.relevance})"
+
+
+def score_answer(question: str, answer: str, tool_outputs: Optional[List[str]] = None) -> LocalVerdict:
+    tool_outputs = tool_outputs or []
+    checks = {
+        "hangul_ratio": check_hangul_ratio(answer),
+        "truncation": check_truncation(answer),
+        "repetition": check_repetition(answer),
+        "length": check_length(question, answer),
+        "tool_overlap": check_tool_overlap(answer, tool_outputs),
+    }
+    score = 1.0
+    reasons = []
+    for name, (penalty, reason) in checks.items():
+        score -= CHECK_WEIGHTS[name] * penalty
+        if reason:
+            reasons.append(reason)
+    relevant, relevance = check_relevance(question, answer, tool_outputs)
+    return LocalVerdict(max(0.0, score), reasons, relevant, relevance)
+
+
+class ValidationMetrics:
+    """ Counts which stage decided each answer; exposed on /api/system/health. """
+    def __init__(self):
+        self.counts: Counter = Counter()
+
+    def record(self, outcome: str):
+        self.counts[outcome] += 1
+
+    def stats(self) -> Dict[str, object]:
+        decided = sum(self.counts[k] for k in ("fast_fail", "local_accept", "local_reject", "judge"))
+        judged_locally = self.counts["local_accept"] + self.counts["local_reject"] + self.counts["fast_fail"]
+        return {
+            **dict(self.counts),
+            "local_decision_rate": round(judged_locally / decided, 3) if decided else 0.0,
+        }
+
+
+# 전역 metrics
+validation_metrics = ValidationMetrics()
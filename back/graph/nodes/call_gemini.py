@@ -1,17 +1,25 @@
 # back/graph/nodes/call_gemini.py
+from typing import Optional
 from langchain_core.messages import SystemMessage, HumanMessage
-from sqlmodel.ext.asyncio.session import AsyncSession
+from langchain_core.runnables import RunnableConfig
 
+from ..context import build_context, thread_id_of
 from ..state import AgentState
 from ...db import crud
-from ...db.engine import async_engine
+from ...db.engine import async_session_factory
 from ...prompts import GEMINI_FALLBACK_PROMPT, GEMINI_FALLBACK_SYSTEM_PROMPT
-from ...utils.rate_limiter import rate_limited_gemini
+from ...utils.rate_limiter import gemini_limiter
 
-@rate_limited_gemini
-async def call_gemini(state: AgentState, llm):
+async def call_gemini(
+    state: AgentState,
+    llm,
+    config: Optional[RunnableConfig] = None,
+    budget: str = "fallback"
+):
     """
     Calls the Gemini model as a fallback and saves the response for distillation.
+    The Gemini token is charged to `budget` ("correction" for deferred-validation
+    corrections), and only when Gemini is actually called.
     """
     state["current_node"] = "call_gemini"
     log_message = "---NODE: Call Gemini as Fallback---"
@@ -25,12 +33,20 @@ async def call_gemini(state: AgentState, llm):
         return {"final_answer": state.get("final_answer", "죄송합니다. 현재 답변을 생성할 수 없습니다.")}
 
     user_intent_str = state.get('user_intent', 'unknown')
-    original_query = state['messages'][0].content
-    tool_results_str = state.get('tool_results', 'No tool results.')
+    # The current question (threads carry earlier turns before it)
+    original_query = next(
+        (m.content for m in reversed(state['messages']) if isinstance(m, HumanMessage)),
+        state['messages'][-1].content
+    )
+    fixed_prompt = GEMINI_FALLBACK_SYSTEM_PROMPT + GEMINI_FALLBACK_PROMPT.format(
+        history="", user_intent=user_intent_str, tool_results=""
+    )
+    context = build_context(state, "gemini", thread_id_of(config), fixed_prompt)
     
     user_prompt = GEMINI_FALLBACK_PROMPT.format(
+        history=context["history"],
         user_intent=user_intent_str,
-        tool_results=tool_results_str
+        tool_results=context["tool_results"]
     )
     
     messages = [
@@ -39,6 +55,7 @@ async def call_gemini(state: AgentState, llm):
     ]
     
     try:
+        await gemini_limiter.acquire(budget)
         response = await llm.ainvoke(messages)
         gemini_answer = response.content
         
@@ -47,7 +64,7 @@ async def call_gemini(state: AgentState, llm):
         print(distillation_log)
 
         # Save to knowledge distillation table
-        async with AsyncSession(async_engine) as session:
+        async with async_session_factory() as session:
             await crud.create_knowledge_distillation(
                 session=session,
                 query=original_query,
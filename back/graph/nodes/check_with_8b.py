@@ -1,9 +1,12 @@
 # back/graph/nodes/check_with_8b.py
+from typing import Optional
 from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from ..context import build_context, thread_id_of
 from ..state import AgentState
 from ...prompts import CHECK_8B_PROMPT, CHECK_8B_SYSTEM_PROMPT
 
-async def check_with_8b(state: AgentState, llm):
+async def check_with_8b(state: AgentState, llm, config: Optional[RunnableConfig] = None):
     """
     Generates a draft answer using the local 8B model.
     """
@@ -12,9 +15,14 @@ async def check_with_8b(state: AgentState, llm):
     state["log"] = [log_message]
     print(log_message) # Keep print for now
 
+    user_intent = state.get('rewritten_prompt') or state.get('user_intent')
+    # The fixed part of the prompt comes out of the local context budget
+    fixed_prompt = CHECK_8B_SYSTEM_PROMPT + CHECK_8B_PROMPT.format(history="", user_intent=user_intent, tool_results="")
+    context = build_context(state, "local", thread_id_of(config), fixed_prompt)
     user_prompt = CHECK_8B_PROMPT.format(
-        user_intent=state.get('rewritten_prompt', state.get('user_intent')),
-        tool_results=state.get('tool_results', 'No tool results.')
+        history=context["history"],
+        user_intent=user_intent,
+        tool_results=context["tool_results"]
     )
     
     messages = [
@@ -4,6 +4,7 @@ from langchain_core.messages import SystemMessage, HumanMessage
 from ...prompts import INTENT_CLASSIFIER_PROMPT, INTENT_CLASSIFIER_SYSTEM_PROMPT
 
 from ..state import AgentState
+from ..intent_classifier import INTENT_CONFIDENCE_THRESHOLD, get_intent_classifier
 
 
 
@@ -20,7 +21,15 @@ async def clarify_intent(state: AgentState, llm):
 
     user_message = state["messages"][-1].content
 
-    
+    # Fast path: the local classifier answers when it is confident enough
+    classifier = get_intent_classifier()
+    if classifier is not None:
+        intent, confidence = classifier.predict(user_message)
+        if confidence >= INTENT_CONFIDENCE_THRESHOLD:
+            fast_log = f">> Intent '{intent}' from local classifier (p={confidence:.2f})"
+            state["log"].append(fast_log)
+            print(fast_log)
+            return {"user_intent": intent, "intent_source": "classifier"}
 
     # Create the prompt
 
@@ -42,4 +51,4 @@ async def clarify_intent(state: AgentState, llm):
 
     
 
-    return {"user_intent": response.content.strip()}
+    return {"user_intent": response.content.strip(), "intent_source": "llm"}
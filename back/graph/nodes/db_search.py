@@ -1,12 +1,56 @@
 # back/graph/nodes/db_search.py
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
 from ..state import AgentState, ToolResult
-from ...db.engine import async_engine
+from ...db.engine import async_session_factory
+from ...db.embeddings import embed_text
 from ...db import crud
-from sqlmodel.ext.asyncio.session import AsyncSession
+from ...utils.answer_cache import answer_cache
+
+# Number of history rows surfaced to the answer model for "Database" questions
+HISTORY_RECALL_K = 8
+
+# Relative-day words that point a "Database" question at a precomputed DailySummary
+_DAY_OFFSETS = {
+    "그저께": 2, "그제": 2, "어제": 1, "오늘": 0,
+    "day before yesterday": 2, "yesterday": 1, "today": 0,
+}
+
+def _resolve_summary_date(message: str) -> Optional[date]:
+    lowered = message.lower()
+    for word, offset in _DAY_OFFSETS.items():
+        if word in lowered:
+            return datetime.utcnow().date() - timedelta(days=offset)
+    return None
+
+async def lookup_cached_answer(
+    user_message: str,
+    query_embedding: Optional[List[float]] = None,
+    user_id: int = 1
+) -> Tuple[Optional[str], Optional[List[float]]]:
+    """
+    Answer-cache lookup that only needs the raw message: in-process cache first,
+    then the pgvector semantic cache. A recent miss means Postgres was already
+    asked for this message, so it is not asked again.
+    Returns (answer or None, query embedding if one was computed).
+    """
+    cached_answer = answer_cache.get(user_message, user_id)
+    if cached_answer is None and not answer_cache.recently_missed(user_message, user_id):
+        query_embedding = query_embedding or await embed_text(user_message)
+        async with async_session_factory() as session:
+            match = await crud.find_similar_answer(session, query_embedding, user_id=user_id)
+        if match:
+            cached_answer = match.content
+            answer_cache.put(user_message, cached_answer, user_id=user_id, intent=match.intent)
+        else:
+            answer_cache.mark_miss(user_message, user_id)
+    return cached_answer, query_embedding
 
 async def db_search(state: AgentState):
     """
-    Search DB for a similar answer before using external tools.
+    Search DB for a semantically similar answer before using external tools.
+    For "Database" intents, a miss falls back to ranked keyword search over history.
     """
     state["current_node"] = "db_search"
     log_message = "---NODE: DB Search---"
@@ -14,19 +58,61 @@ async def db_search(state: AgentState):
     print(log_message)
 
     user_message = state["messages"][-1].content
-    async with AsyncSession(async_engine) as session:
-        match = await crud.find_similar_answer(session, user_message)
+    query_embedding = state.get("query_embedding")
+
+    # db_hit is already False when the lookup ran speculatively next to clarify_intent
+    cached_answer = None
+    if state.get("db_hit") is not False:
+        cached_answer, query_embedding = await lookup_cached_answer(user_message, query_embedding, state.get("user_id", 1))
 
-    if match:
+    if cached_answer is not None:
         tool_results = state.get("tool_results") or []
         tool_results.append(ToolResult(
             tool_name="db_search",
-            output=match.content
+            output=cached_answer
         ))
         return {
             "db_hit": True,
-            "final_answer": match.content,
-            "tool_results": tool_results
+            "final_answer": cached_answer,
+            "tool_results": tool_results,
+            "query_embedding": query_embedding
         }
 
-    return {"db_hit": False}
+    # "Database" intent (e.g. "What did I do yesterday?"): daily summary + keyword recall over history
+    if state.get("user_intent") == "Database":
+        user_id = state.get("user_id", 1)
+        summary_date = _resolve_summary_date(user_message)
+        async with async_session_factory() as session:
+            summary = await crud.get_daily_summary(session, summary_date, user_id=user_id) if summary_date else None
+            matches = await crud.search_history(
+                session, user_message, k=HISTORY_RECALL_K, user_id=user_id
+            )
+        tool_results = state.get("tool_results") or []
+        if summary:
+            summary_log = f">> Daily summary found for {summary_date}"
+            state["log"].append(summary_log)
+            print(summary_log)
+            tool_results.append(ToolResult(
+                tool_name="daily_summary",
+                output=f"[{summary_date}] {summary.summary_content}"
+            ))
+        if matches:
+            recall_log = f">> History search: {len(matches)} matching messages"
+            state["log"].append(recall_log)
+            print(recall_log)
+            lines = [
+                f"[{row.created_at:%Y-%m-%d %H:%M}] {row.role}: {row.content}"
+                for row, _score in matches
+            ]
+            tool_results.append(ToolResult(
+                tool_name="history_search",
+                output="\n".join(lines)
+            ))
+        if tool_results:
+            return {
+                "db_hit": False,
+                "tool_results": tool_results,
+                "query_embedding": query_embedding
+            }
+
+    return {"db_hit": False, "query_embedding": query_embedding}
@@ -1,7 +1,17 @@
 # back/graph/nodes/execute_tools.py
-import json
-from typing import Any
-from ..state import AgentState, ToolResult
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+from ..state import AgentState, ToolCall, ToolResult
+from ..tool_output import compact_tool_output
+from ...tools.registry import ToolRegistry
+
+# Max concurrent in-flight calls per tool (by resolved tool name)
+DEFAULT_TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", "4"))
+TOOL_CONCURRENCY_LIMITS: Dict[str, int] = {
+    "web_search": int(os.getenv("WEB_SEARCH_CONCURRENCY", "2")),
+}
+_tool_semaphores: Dict[str, asyncio.Semaphore] = {}
 
 def _jsonable_tool_result(result: Any):
     if result is None:
@@ -25,61 +35,122 @@ def _jsonable_tool_result(result: Any):
                 pass
     return str(result)
 
-async def execute_tools(state: AgentState, tools):
+def _execution_waves(plan: List[ToolCall]) -> List[List[int]]:
+    """
+    Groups plan indices into waves: every step in a wave only depends on steps
+    in earlier waves, so a wave can run concurrently.
+    """
+    index_by_id = {_step_id(step, i): i for i, step in enumerate(plan)}
+    level = {}
+    for i, step in enumerate(plan):
+        deps = [index_by_id[d] for d in step.get("depends_on", []) if index_by_id.get(d, i) < i]
+        level[i] = max((level[d] + 1 for d in deps), default=0)
+    waves: List[List[int]] = [[] for _ in range(max(level.values(), default=-1) + 1)]
+    for i in range(len(plan)):
+        waves[level[i]].append(i)
+    return waves
+
+def _step_id(step: ToolCall, index: int) -> str:
+    return step.get("id", f"t{index + 1}")
+
+def _is_failure(result: Optional[ToolResult]) -> bool:
+    """ Outputs written by `_run_tool_call` / `execute_tools` when a step produced nothing usable. """
+    if result is None:
+        return True
+    output = result.get("output")
+    return isinstance(output, str) and (output == "Tool not found." or output.startswith(("Error: ", "Skipped: ")))
+
+def _failed_dependency(step: ToolCall, index: int, plan: List[ToolCall], results: List[Optional[ToolResult]]) -> Optional[str]:
+    """ Id of the first earlier step this one depends on that failed (or was skipped), if any. """
+    index_by_id = {_step_id(s, i): i for i, s in enumerate(plan)}
+    for dep in step.get("depends_on", []):
+        dep_index = index_by_id.get(dep)
+        if dep_index is not None and dep_index < index and _is_failure(results[dep_index]):
+            return dep
+    return None
+
+def _semaphore_for(tool_name: str) -> asyncio.Semaphore:
+    if tool_name not in _tool_semaphores:
+        limit = TOOL_CONCURRENCY_LIMITS.get(tool_name, DEFAULT_TOOL_CONCURRENCY)
+        _tool_semaphores[tool_name] = asyncio.Semaphore(limit)
+    return _tool_semaphores[tool_name]
+
+def _resolve_tool(tool_name: str, registry: ToolRegistry, log: List[str]):
+    lc_tool = registry.resolve(tool_name)
+    if lc_tool is not None and lc_tool.name != tool_name:
+        # Tool name given without server prefix (e.g., "write_file")
+        log.append(f"Resolved tool alias '{tool_name}' -> '{lc_tool.name}'")
+        print(f"Resolved tool alias '{tool_name}' -> '{lc_tool.name}'")
+    return lc_tool
+
+async def _run_tool_call(tool_call: ToolCall, registry: ToolRegistry, log: List[str]) -> ToolResult:
+    tool_name = tool_call["name"]
+    tool_args = tool_call["args"]
+
+    # Log which tool is being executed
+    execution_log = f"Executing tool: {tool_name} with args: {tool_args}"
+    log.append(execution_log)
+    print(execution_log)
+
+    lc_tool = _resolve_tool(tool_name, registry, log)
+    if not lc_tool:
+        not_found_log = f"Tool '{tool_name}' not found."
+        log.append(not_found_log)
+        print(not_found_log)
+        return ToolResult(tool_name=tool_name, output="Tool not found.")
+
+    try:
+        async with _semaphore_for(lc_tool.name):
+            # Assuming the tool's coroutine method exists
+            result = await lc_tool.coroutine(**tool_args)
+        safe_result = _jsonable_tool_result(result)
+        return ToolResult(
+            tool_name=tool_name,
+            output=compact_tool_output(safe_result)
+        )
+    except Exception as e:
+        error_log = f"Error executing tool {tool_name}: {e}"
+        log.append(error_log)
+        print(error_log)
+        return ToolResult(tool_name=tool_name, output=f"Error: {e}")
+
+async def execute_tools(state: AgentState, registry: ToolRegistry):
     """
     Executes the planned tool calls.
+    Independent steps run concurrently (asyncio.gather), wave by wave along
+    `depends_on`; results keep the plan order. A step whose dependency failed
+    is skipped (its result records which dependency), as are the steps after it.
     """
     state["current_node"] = "execute_tools"
     log_message = "---NODE: Execute Tools---"
     state["log"] = [log_message]
     print(log_message) # Keep print for now
 
-    tool_queue = state.get("tool_queue") or []
-    plan = state.get("plan", []) or []
-    if tool_queue:
-        plan = [tool_queue[0]]
-    tool_results = []
-    for tool_call in plan:
-        tool_name = tool_call["name"]
-        tool_args = tool_call["args"]
-        
-        # Log which tool is being executed
-        execution_log = f"Executing tool: {tool_name} with args: {tool_args}"
-        state["log"].append(execution_log)
-        print(execution_log)
+    plan = state.get("tool_queue") or state.get("plan", []) or []
+    results: List[Optional[ToolResult]] = [None] * len(plan)
+    for wave in _execution_waves(plan):
+        runnable = []
+        for i in wave:
+            failed_dep = _failed_dependency(plan[i], i, plan, results)
+            if failed_dep is None:
+                runnable.append(i)
+                continue
+            skip_log = f"Skipping tool {plan[i]['name']} ({_step_id(plan[i], i)}): dependency '{failed_dep}' failed"
+            state["log"].append(skip_log)
+            print(skip_log)
+            results[i] = ToolResult(tool_name=plan[i]["name"], output=f"Skipped: dependency '{failed_dep}' failed.")
+        if len(runnable) > 1:
+            wave_log = f"Running {len(runnable)} tools concurrently: {[plan[i]['name'] for i in runnable]}"
+            state["log"].append(wave_log)
+            print(wave_log)
+        wave_results = await asyncio.gather(
+            *(_run_tool_call(plan[i], registry, state["log"]) for i in runnable)
+        )
+        for i, result in zip(runnable, wave_results):
+            results[i] = result
 
-        lc_tool = next((t for t in tools if t.name == tool_name), None)
-        if lc_tool is None:
-            # Fallback: allow tool names without server prefix (e.g., "write_file")
-            suffix = f"__{tool_name}"
-            candidates = [t for t in tools if t.name.endswith(suffix)]
-            if candidates:
-                lc_tool = candidates[0]
-                state["log"].append(f"Resolved tool alias '{tool_name}' -> '{lc_tool.name}'")
-                print(f"Resolved tool alias '{tool_name}' -> '{lc_tool.name}'")
-        if lc_tool:
-            try:
-                # Assuming the tool's coroutine method exists
-                result = await lc_tool.coroutine(**tool_args)
-                safe_result = _jsonable_tool_result(result)
-                tool_results.append(ToolResult(
-                    tool_name=tool_name,
-                    output=json.dumps(safe_result, ensure_ascii=False, indent=2)
-                ))
-            except Exception as e:
-                error_log = f"Error executing tool {tool_name}: {e}"
-                state["log"].append(error_log)
-                print(error_log)
-                tool_results.append(ToolResult(tool_name=tool_name, output=f"Error: {e}"))
-        else:
-            not_found_log = f"Tool '{tool_name}' not found."
-            state["log"].append(not_found_log)
-            print(not_found_log)
-            tool_results.append(ToolResult(tool_name=tool_name, output="Tool not found."))
-            
     existing_results = state.get("tool_results") or []
-    remaining_queue = tool_queue[1:] if tool_queue else tool_queue
     return {
-        "tool_results": existing_results + tool_results,
-        "tool_queue": remaining_queue
+        "tool_results": existing_results + results,
+        "tool_queue": []
     }
@@ -2,18 +2,11 @@
 import json
 from langchain_core.messages import SystemMessage, HumanMessage
 from ..state import AgentState
+from ...db import crud
+from ...db.engine import async_session_factory
+from ...llm.scheduler import LocalModelOverloaded
 from ...prompts import TOOL_PLANNER_PROMPT, TOOL_PLANNER_SYSTEM_PROMPT
-
-def _safe_tool_schema(tool):
-    if not getattr(tool, "args_schema", None):
-        return {}
-    try:
-        return tool.args_schema.schema()
-    except Exception:
-        try:
-            return tool.args_schema.model_json_schema()
-        except Exception:
-            return {}
+from ...tools.registry import ToolRegistry
 
 def _extract_json_array(text: str):
     if not text:
@@ -28,9 +21,34 @@ def _extract_json_array(text: str):
     except Exception:
         return None
 
-async def initial_planner(state: AgentState, llm, tools):
+def _normalize_plan(plan) -> list:
     """
-    Creates an ordered tool queue for sequential execution.
+    Drops malformed steps and gives every step an `id` and a `depends_on` list
+    that only references earlier steps (so the plan is always a DAG).
+    """
+    normalized = []
+    seen_ids = set()
+    for index, step in enumerate(plan):
+        if not isinstance(step, dict) or not step.get("name"):
+            continue
+        step_id = str(step.get("id") or f"t{index + 1}")
+        if step_id in seen_ids:
+            step_id = f"{step_id}_{index + 1}"
+        depends_on = step.get("depends_on") or []
+        if not isinstance(depends_on, list):
+            depends_on = [depends_on]
+        normalized.append({
+            "id": step_id,
+            "name": step["name"],
+            "args": step.get("args") or {},
+            "depends_on": [str(d) for d in depends_on if str(d) in seen_ids],
+        })
+        seen_ids.add(step_id)
+    return normalized
+
+async def initial_planner(state: AgentState, llm, registry: ToolRegistry):
+    """
+    Creates a tool plan. Steps carry `depends_on` so independent calls can run concurrently.
     """
     state["current_node"] = "initial_planner"
     log_message = "---NODE: Initial Planner---"
@@ -44,19 +62,16 @@ async def initial_planner(state: AgentState, llm, tools):
 
     plan = []
     if intent in ["Search", "Database", "System"]:
-        tools_payload = []
-        for tool in tools:
-            schema = _safe_tool_schema(tool)
-            tools_payload.append({
-                "name": tool.name,
-                "description": tool.description or "",
-                "args_schema": schema.get("properties", schema)
-            })
-
+        shortlist = registry.shortlist(user_message, intent)
+        print(f"  > Tool Shortlist: {list(shortlist)}")
+        # Read through the profile cache (a database read only on a miss)
+        async with async_session_factory() as session:
+            profile = await crud.get_user_profile(session, state.get("user_id", 1))
         prompt = TOOL_PLANNER_PROMPT.format(
             user_intent=intent,
             user_message=user_message,
-            tools_json=json.dumps(tools_payload, ensure_ascii=False, indent=2)
+            user_profile=json.dumps(profile or {}, ensure_ascii=False),
+            tools_json=registry.planner_payload_for(shortlist)
         )
 
         messages = [
@@ -84,6 +99,9 @@ async def initial_planner(state: AgentState, llm, tools):
             if not isinstance(plan, list):
                 raise ValueError("Tool plan is not a JSON array")
 
+        except LocalModelOverloaded:
+            # Reject the turn now rather than continuing into a long generation
+            raise
         except Exception as e:
             print(f"  > Tool planning failed, falling back to heuristic plan: {e}")
             if intent == "Search":
@@ -91,6 +109,7 @@ async def initial_planner(state: AgentState, llm, tools):
             else:
                 plan = []
 
+    plan = _normalize_plan(plan)
     print(f"  > Initial Plan: {plan}")
 
     return {
@@ -0,0 +1,34 @@
+# back/graph/nodes/reduce_tool_outputs.py
+import asyncio
+
+from ..state import AgentState, ToolResult
+from ..tool_output import reduce_output, tool_output_metrics
+
+async def reduce_tool_outputs(state: AgentState, llm):
+    """
+    Shrinks oversized tool outputs to the parts relevant to the question
+    (per-tool limits; optional concurrent chunk summaries) before synthesis.
+    """
+    state["current_node"] = "reduce_tool_outputs"
+    log_message = "---NODE: Reduce Tool Outputs---"
+    state["log"] = [log_message]
+    print(log_message)
+
+    question = state["messages"][-1].content
+    tool_results = state.get("tool_results") or []
+    if isinstance(tool_results, str):
+        return {}
+
+    reduced_outputs = await asyncio.gather(*(
+        reduce_output(question, result["tool_name"], str(result["output"]), llm=llm)
+        for result in tool_results
+    ))
+    reduced = []
+    for result, output in zip(tool_results, reduced_outputs):
+        tool_output_metrics.record(result["tool_name"], str(result["output"]), output)
+        if output != result["output"]:
+            reduce_log = f">> {result['tool_name']}: {len(str(result['output']))} -> {len(output)} chars"
+            state["log"].append(reduce_log)
+            print(reduce_log)
+        reduced.append(ToolResult(tool_name=result["tool_name"], output=output))
+    return {"tool_results": reduced, "log": state["log"]}
@@ -0,0 +1,56 @@
+# back/graph/nodes/speculative_intent.py
+import asyncio
+
+from ..state import AgentState, ToolResult
+from .clarify_intent import clarify_intent
+from .db_search import lookup_cached_answer
+
+async def speculative_intent(state: AgentState, llm):
+    """
+    Runs the answer-cache lookup concurrently with intent classification.
+    - Cache hit first: the classifier is cancelled and the cached answer is returned.
+    - Profile intent: the lookup result is discarded.
+    - Otherwise: the intent is returned together with the lookup result.
+    """
+    user_message = state["messages"][-1].content
+
+    lookup = asyncio.create_task(lookup_cached_answer(user_message, state.get("query_embedding"), state.get("user_id", 1)))
+    classify = asyncio.create_task(clarify_intent(state, llm))
+    state["current_node"] = "clarify_intent"
+
+    try:
+        done, _ = await asyncio.wait({lookup, classify}, return_when=asyncio.FIRST_COMPLETED)
+
+        if lookup in done and not classify.done():
+            cached_answer, query_embedding = lookup.result()
+            if cached_answer is not None:
+                classify.cancel()
+                hit_log = ">> Speculative DB lookup hit; intent classification cancelled."
+                state["log"].append(hit_log)
+                print(hit_log)
+                return _hit(state, cached_answer, query_embedding, intent="db_cache")
+
+        intent_update = await classify
+        if intent_update.get("user_intent") == "Profile":
+            lookup.cancel()
+            return {**intent_update, "db_hit": False}
+
+        cached_answer, query_embedding = await lookup
+        if cached_answer is not None:
+            return _hit(state, cached_answer, query_embedding, intent=intent_update.get("user_intent"))
+        return {**intent_update, "db_hit": False, "query_embedding": query_embedding}
+    finally:
+        for task in (lookup, classify):
+            if not task.done():
+                task.cancel()
+
+def _hit(state: AgentState, answer: str, query_embedding, intent: str) -> dict:
+    tool_results = state.get("tool_results") or []
+    tool_results.append(ToolResult(tool_name="db_search", output=answer))
+    return {
+        "user_intent": intent,
+        "db_hit": True,
+        "final_answer": answer,
+        "tool_results": tool_results,
+        "query_embedding": query_embedding
+    }
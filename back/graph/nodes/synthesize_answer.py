@@ -1,9 +1,12 @@
 # back/graph/nodes/synthesize_answer.py
+from typing import Optional
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langchain_core.runnables import RunnableConfig
+from ..context import build_context, thread_id_of
 from ..state import AgentState
 from ...prompts import CHECK_8B_PROMPT, CHECK_8B_SYSTEM_PROMPT
 
-async def synthesize_answer(state: AgentState, llm):
+async def synthesize_answer(state: AgentState, llm, config: Optional[RunnableConfig] = None):
     """
     Synthesizes the results from tool execution into a natural language answer.
     This node sets the 'final_answer' key in the state for validation.
@@ -19,9 +22,12 @@ async def synthesize_answer(state: AgentState, llm):
     print(f"  > Synthesizing answer for intent: {user_intent}")
     print(f"  > Using tool results: {tool_results}")
 
+    fixed_prompt = CHECK_8B_SYSTEM_PROMPT + CHECK_8B_PROMPT.format(history="", user_intent=user_intent, tool_results="")
+    context = build_context(state, "local", thread_id_of(config), fixed_prompt)
     prompt = CHECK_8B_PROMPT.format(
+        history=context["history"],
         user_intent=user_intent,
-        tool_results=tool_results
+        tool_results=context["tool_results"]
     )
 
     messages = [
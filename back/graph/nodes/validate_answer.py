@@ -1,7 +1,22 @@
+import os
 import re
+from typing import Dict, List, Optional
 from langchain_core.messages import SystemMessage, HumanMessage
 from ..state import AgentState
-from ...utils.rate_limiter import rate_limited_gemini
+from ..local_validator import score_answer, validation_metrics
+from ...utils.rate_limiter import gemini_limiter
+
+# "blocking": the answer waits for the Gemini judge
+# "deferred": the answer is sent right away and judged after the turn (see deferred_validation)
+DEFAULT_VALIDATION_MODE = os.getenv("DEFAULT_VALIDATION_MODE", "blocking")
+# Per-intent overrides, e.g. VALIDATION_POLICY="Chat=deferred,Search=blocking"
+VALIDATION_POLICY: Dict[str, str] = {"Chat": "deferred", "Database": "deferred"}
+VALIDATION_POLICY.update(
+    (intent.strip(), mode.strip())
+    for intent, _, mode in (
+        item.partition("=") for item in os.getenv("VALIDATION_POLICY", "").split(",") if "=" in item
+    )
+)
 
 # Gemini 심사위원 프롬프트
 VALIDATOR_PROMPT = """You are a strict Quality Assurance AI for a Korean user.
@@ -27,10 +42,44 @@ def has_chinese_chars(text: str) -> bool:
     """텍스트에 중국어(CJK 한자)가 포함되어 있는지 정규식으로 검사"""
     return bool(re.search(r'[\u4e00-\u9fff]', text))
 
-@rate_limited_gemini
+def validation_mode(intent: Optional[str]) -> str:
+    return VALIDATION_POLICY.get(intent or "", DEFAULT_VALIDATION_MODE)
+
+async def judge_answer(llm, user_intent: str, final_response: str) -> bool:
+    """
+    Gemini LLM-as-a-Judge. Returns True for VALID.
+    Raises if Gemini can't be reached; callers decide what that means.
+    Callers take the "judge" rate-limit token themselves.
+    """
+    prompt = VALIDATOR_PROMPT.format(
+        user_intent=user_intent,
+        final_response=final_response
+    )
+    messages = [
+        SystemMessage(content="You are a QA Judge."),
+        HumanMessage(content=prompt)
+    ]
+    judge_result = await llm.ainvoke(messages)
+    judge_score = judge_result.content.strip().upper()
+    print(f">> Gemini Judge Result: {judge_score}")
+    valid = "INVALID" not in judge_score
+    validation_metrics.record("judge_valid" if valid else "judge_invalid")
+    return valid
+
+def _tool_outputs(tool_results) -> List[str]:
+    if isinstance(tool_results, str):
+        return [tool_results]
+    return [str(result.get("output", "")) for result in tool_results or [] if isinstance(result, dict)]
+
+def rejection_reason(user_intent: str) -> str:
+    return f"[System Error] The previous answer was rejected by QA. Please provide a better answer for: {user_intent}"
+
 async def validate_answer(state: AgentState, llm):
     """
     Validates the answer generated by the 8B model using Gemini as a judge.
+    Cheap local checks always run and decide clear-cut cases on their own;
+    otherwise the Gemini judge either blocks the answer or is deferred until
+    after the answer was sent, depending on the intent.
     """
     state["current_node"] = "validate_answer"
     log_message = "---NODE: Validate Answer (Judge: Gemini)---"
@@ -45,6 +94,7 @@ async def validate_answer(state: AgentState, llm):
         fail_log = ">> Validation Failed: Response is empty."
         state["log"].append(fail_log)
         print(fail_log)
+        validation_metrics.record("fast_fail")
         return {"is_final_answer_satisfactory": False}
 
     # 2. [Fast Fail] Chinese character check (Regex)
@@ -52,45 +102,65 @@ async def validate_answer(state: AgentState, llm):
         fail_log = ">> Validation Failed: Chinese characters detected."
         state["log"].append(fail_log)
         print(fail_log)
+        validation_metrics.record("fast_fail")
         return {
             "is_final_answer_satisfactory": False,
             "tool_results": f"[System Error] Local model generated Chinese text. User intent was: {user_intent}"
         }
 
-    # 3. [Deep Check] Gemini LLM-as-a-Judge
+    # 3. [Scored] Local checks decide clear-cut answers without a judge call
+    verdict = score_answer(
+        state["messages"][-1].content,
+        final_response,
+        _tool_outputs(state.get("tool_results"))
+    )
+    verdict_log = f">> Local validator: {verdict.describe()}"
+    state["log"].append(verdict_log)
+    print(verdict_log)
+    if verdict.tier == "accept":
+        validation_metrics.record("local_accept")
+        return {"is_final_answer_satisfactory": True}
+    if verdict.tier == "reject":
+        validation_metrics.record("local_reject")
+        return {
+            "is_final_answer_satisfactory": False,
+            "tool_results": f"[System Error] Local checks rejected the answer ({', '.join(verdict.reasons)}). User intent was: {user_intent}"
+        }
+    validation_metrics.record("judge")
+
+    # 4. [Deferred] Answer goes out now; the judge runs after the turn
+    if validation_mode(user_intent) == "deferred":
+        deferred_log = ">> Validation deferred: answer is sent before the Gemini judge runs."
+        state["log"].append(deferred_log)
+        print(deferred_log)
+        validation_metrics.record("deferred")
+        return {"is_final_answer_satisfactory": True, "validation_deferred": True}
+
+    # 5. [Deep Check] Gemini LLM-as-a-Judge, unless the judge budget is used up
+    if not gemini_limiter.try_acquire("judge"):
+        skip_log = ">> Validation skipped: Gemini judge budget exhausted, keeping the local answer."
+        state["log"].append(skip_log)
+        print(skip_log)
+        validation_metrics.record("judge_skipped")
+        return {"is_final_answer_satisfactory": True}
+
     state["log"].append(">> Sending to Gemini for final validation...")
     print(">> Sending to Gemini for final validation...")
-    prompt = VALIDATOR_PROMPT.format(
-        user_intent=user_intent,
-        final_response=final_response
-    )
-    
-    messages = [
-        SystemMessage(content="You are a QA Judge."),
-        HumanMessage(content=prompt)
-    ]
-    
     try:
-        judge_result = await llm.ainvoke(messages)
-        judge_score = judge_result.content.strip().upper()
-        
-        judge_log = f">> Gemini Judge Result: {judge_score}"
-        state["log"].append(judge_log)
-        print(judge_log)
-
-        if "INVALID" in judge_score:
+        if not await judge_answer(llm, user_intent, final_response):
             fail_log = ">> Validation Failed: Gemini rejected the response."
             state["log"].append(fail_log)
             print(fail_log)
             return {
                 "is_final_answer_satisfactory": False,
-                "tool_results": f"[System Error] The previous answer was rejected by QA. Please provide a better answer for: {user_intent}"
+                "tool_results": rejection_reason(user_intent)
             }
             
     except Exception as e:
         error_log = f">> Validation Error (Gemini unavailable): {e}"
         state["log"].append(error_log)
         print(error_log)
+        validation_metrics.record("judge_unavailable")
         # Gemini 연결 실패 시 검증 스킵
         return {
             "is_final_answer_satisfactory": True,
@@ -101,4 +171,4 @@ async def validate_answer(state: AgentState, llm):
     success_log = ">> Validation Passed: Perfect Korean response."
     state["log"].append(success_log)
     print(success_log)
-    return {"is_final_answer_satisfactory": True}
\ No newline at end of file
+    return {"is_final_answer_satisfactory": True}
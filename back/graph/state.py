@@ -1,12 +1,27 @@
-from typing import Annotated, Sequence, TypedDict, List, Optional, Dict, Any
+from typing import Annotated, Sequence, List, Optional, Dict, Any
+# NotRequired is only in `typing` from Python 3.11; TypedDict must come from the same module
+from typing_extensions import NotRequired, TypedDict
 from langchain_core.messages import BaseMessage
 from sqlmodel.ext.asyncio.session import AsyncSession
 import operator
 
+def turn_log(existing: Optional[List[str]], update: Optional[List[str]]) -> List[str]:
+    """
+    Reducer of `log`: a node's lines are appended, an empty list starts over.
+    Each turn starts (and give_final_answer ends) with `[]`, so a checkpointed
+    thread never carries the logs of earlier turns.
+    """
+    if not update:
+        return []
+    return list(existing or []) + list(update)
+
 class ToolCall(TypedDict):
     """ A planned tool call. """
     name: str
     args: Dict[str, Any]
+    # Step id within the plan, and ids of steps that must finish first
+    id: NotRequired[str]
+    depends_on: NotRequired[List[str]]
 
 class ToolResult(TypedDict):
     """ The result of a tool call. """
@@ -27,6 +42,9 @@ class AgentState(TypedDict):
     # The user's clarified intent
     user_intent: Optional[str]
 
+    # Who classified it: "llm" (router prompt) or "classifier" (local fast path)
+    intent_source: Optional[str]
+
     # The rewritten prompt after DB lookup
     rewritten_prompt: Optional[str]
     
@@ -41,6 +59,9 @@ class AgentState(TypedDict):
 
     # Whether DB search returned a hit
     db_hit: Optional[bool]
+
+    # Embedding of the latest user message (semantic answer cache key)
+    query_embedding: Optional[List[float]]
     
     # The final answer generated by a model
     final_answer: Optional[str]
@@ -48,11 +69,17 @@ class AgentState(TypedDict):
     # A flag to check if the final answer is satisfactory
     is_final_answer_satisfactory: Optional[bool]
 
+    # The Gemini judge was skipped because Gemini could not be reached
+    gemini_unavailable: Optional[bool]
+
+    # The answer was sent unjudged; the Gemini judge runs after the turn
+    validation_deferred: Optional[bool]
+
     # The database session
     db_session: Optional[AsyncSession]
 
     # Real-time log of operations
-    log: Annotated[List[str], operator.add]
+    log: Annotated[List[str], turn_log]
 
     # The name of the current node being executed
     current_node: Optional[str]
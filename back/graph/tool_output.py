@@ -0,0 +1,167 @@
+# back/graph/tool_output.py
+"""
+Tool-output reduction before synthesis.
+
+1. `compact_tool_output`: MCP text content is unwrapped, everything else is compact JSON.
+2. Outputs over their tool's limit are split into line-aligned chunks.
+3. Chunks are ranked by character-bigram overlap with the question and the
+   best ones are kept (in original order) up to the limit.
+4. Optionally (TOOL_SUMMARY_MODE=llm) the kept chunks are summarized by the
+   local model concurrently.
+"""
+import asyncio
+import json
+import os
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from ..db.text_search import korean_bigrams
+from ..llm.scheduler import LocalModelOverloaded
+from ..prompts import TOOL_CHUNK_SUMMARY_PROMPT, TOOL_CHUNK_SUMMARY_SYSTEM_PROMPT
+
+# 3. Shared Variables
+# Characters kept per tool output (exact tool name or "server" prefix; "default" otherwise)
+TOOL_OUTPUT_LIMITS: Dict[str, int] = {
+    "default": int(os.getenv("TOOL_OUTPUT_MAX_CHARS", "4000")),
+    "web_search": int(os.getenv("WEB_SEARCH_OUTPUT_MAX_CHARS", "6000")),
+    "filesystem": int(os.getenv("FILESYSTEM_OUTPUT_MAX_CHARS", "6000")),
+    "postgres": int(os.getenv("POSTGRES_OUTPUT_MAX_CHARS", "4000")),
+}
+TOOL_CHUNK_CHARS = int(os.getenv("TOOL_CHUNK_CHARS", "1200"))
+# "extract": keep the most relevant chunks; "llm": also summarize them with the local model
+TOOL_SUMMARY_MODE = os.getenv("TOOL_SUMMARY_MODE", "extract")
+TOOL_SUMMARY_CONCURRENCY = int(os.getenv("TOOL_SUMMARY_CONCURRENCY", "2"))
+
+_summary_semaphore: Optional[asyncio.Semaphore] = None
+
+
+# 4. Shared Functions
+def compact_tool_output(result: Any) -> str:
+    """ Text for a (JSON-safe) tool result without pretty-printing overhead. """
+    if isinstance(result, str):
+        return result
+    # MCP content blocks: [{"type": "text", "text": "..."}]
+    if isinstance(result, list) and result and all(
+        isinstance(item, dict) and item.get("type") == "text" for item in result
+    ):
+        return "\n".join(str(item.get("text", "")) for item in result)
+    return json.dumps(result, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def output_limit(tool_name: str) -> int:
+    for name, limit in TOOL_OUTPUT_LIMITS.items():
+        if tool_name == name or tool_name.startswith(f"{name}__"):
+            return limit
+    return TOOL_OUTPUT_LIMITS["default"]
+
+
+def chunk_text(text: str, size: int = TOOL_CHUNK_CHARS) -> List[str]:
+    """ Chunks of about `size` characters, split at line breaks where possible. """
+    chunks: List[str] = []
+    current = ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > size:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:size])
+            line = line[size:]
+        if len(current) + len(line) > size and current:
+            chunks.append(current)
+            current = ""
+        current += line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def rank_chunks(question: str, chunks: List[str]) -> List[int]:
+    """ Chunk indices, most relevant first (share of question bigrams found; earlier wins ties). """
+    query = Counter(korean_bigrams(question))
+    if not query:
+        return list(range(len(chunks)))
+    scores = []
+    for index, chunk in enumerate(chunks):
+        terms = set(korean_bigrams(chunk))
+        score = sum(count for term, count in query.items() if term in terms) / sum(query.values())
+        scores.append((-score, index))
+    return [index for _, index in sorted(scores)]
+
+
+def select_chunks(question: str, text: str, limit: int) -> List[str]:
+    """ Most relevant chunks of `text` within `limit` characters, in original order. """
+    chunks = chunk_text(text)
+    kept: List[int] = []
+    used = 0
+    for index in rank_chunks(question, chunks):
+        if used + len(chunks[index]) > limit:
+            continue
+        kept.append(index)
+        used += len(chunks[index])
+    if not kept:
+        return [chunks[0][:limit]]
+    return [chunks[index] for index in sorted(kept)]
+
+
+async def _summarize_chunk(llm, question: str, tool_name: str, chunk: str) -> str:
+    global _summary_semaphore
+    if _summary_semaphore is None:
+        _summary_semaphore = asyncio.Semaphore(TOOL_SUMMARY_CONCURRENCY)
+    prompt = TOOL_CHUNK_SUMMARY_PROMPT.format(question=question, tool_name=tool_name, chunk=chunk)
+    try:
+        async with _summary_semaphore:
+            response = await llm.ainvoke([
+                SystemMessage(content=TOOL_CHUNK_SUMMARY_SYSTEM_PROMPT),
+                HumanMessage(content=prompt)
+            ])
+        return response.content.strip()
+    except LocalModelOverloaded:
+        raise
+    except Exception as e:
+        print(f"  > Chunk summary failed for {tool_name}, keeping the extract: {e}")
+        return chunk
+
+
+async def reduce_output(question: str, tool_name: str, output: str, llm=None) -> str:
+    limit = output_limit(tool_name)
+    if len(output) <= limit:
+        return output
+    chunks = select_chunks(question, output, limit)
+    if TOOL_SUMMARY_MODE == "llm" and llm is not None:
+        chunks = await asyncio.gather(
+            *(_summarize_chunk(llm, question, tool_name, chunk) for chunk in chunks)
+        )
+    return "\n…\n".join(chunk.strip() for chunk in chunks)
+
+
+class ToolOutputMetrics:
+    """ Bytes before/after reduction, per tool; exposed on /api/system/health. """
+    def __init__(self):
+        self.bytes_in: Counter = Counter()
+        self.bytes_out: Counter = Counter()
+        self.reduced: Counter = Counter()
+
+    def record(self, tool_name: str, before: str, after: str):
+        self.bytes_in[tool_name] += len(before.encode("utf-8"))
+        self.bytes_out[tool_name] += len(after.encode("utf-8"))
+        if after != before:
+            self.reduced[tool_name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total_in = sum(self.bytes_in.values())
+        total_out = sum(self.bytes_out.values())
+        return {
+            "bytes_in": total_in,
+            "bytes_out": total_out,
+            "ratio": round(total_out / total_in, 3) if total_in else 1.0,
+            "per_tool": {
+                name: {"bytes_in": self.bytes_in[name], "bytes_out": self.bytes_out[name], "reduced": self.reduced[name]}
+                for name in self.bytes_in
+            },
+        }
+
+
+# 전역 metrics
+tool_output_metrics = ToolOutputMetrics()
@@ -2,8 +2,10 @@
 import asyncio
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncEngine
-from langchain_community.llms import Ollama
-from langchain_google_genai import ChatGoogleGenerativeAI
+
+from back.llm.registry import llm_registry
+from back.llm.settings import GEMINI_MODEL
+from back.llm.warm_pool import warm_pool
 
 async def check_db_connection(engine: AsyncEngine):
     """
@@ -16,27 +18,32 @@ async def check_db_connection(engine: AsyncEngine):
     except Exception as e:
         return False, f"Database connection failed: {e}"
 
-async def check_ollama_connection(model_name: str = "exaone3.5"):
+async def check_ollama_connection():
     """
-    Checks if the connection to the Ollama server is valid.
+    Checks that the Ollama server is reachable and which models are loaded (no generation).
     """
-    try:
-        ollama = Ollama(model=model_name)
-        await ollama.ainvoke("Hi")
-        return True, f"Ollama ({model_name}) connection successful."
-    except Exception as e:
-        return False, f"Ollama ({model_name}) connection failed: {e}"
+    probe = await warm_pool.probe()
+    if not probe["reachable"]:
+        return False, f"Ollama connection failed: {probe['error']}"
+    states = ", ".join(
+        f"{model} {'loaded' if state['loaded'] else 'not loaded'}" for model, state in probe["models"].items()
+    )
+    return True, f"Ollama connection successful ({states})."
 
-async def check_gemini_connection(model_name: str = "gemini-2.5-flash"):
+async def check_gemini_connection():
     """
-    Checks if the connection to the Gemini API is valid.
+    Checks that the Gemini API key works and the model exists (model metadata
+    lookup through the registry model's google-genai client; no generation, so it
+    costs nothing from the shared rate limit).
     """
     try:
-        gemini = ChatGoogleGenerativeAI(model=model_name, temperature=0)
-        response = await gemini.ainvoke("Hello")
-        return True, f"Gemini ({model_name}) connection successful."
+        client = getattr(llm_registry.get("gemini"), "client", None)
+        if client is None:
+            return False, f"Gemini ({GEMINI_MODEL}) client is not initialized."
+        await client.aio.models.get(model=GEMINI_MODEL)
+        return True, f"Gemini ({GEMINI_MODEL}) connection successful."
     except Exception as e:
-        return False, f"Gemini ({model_name}) connection failed: {e}"
+        return False, f"Gemini ({GEMINI_MODEL}) connection failed: {e}"
 
 async def run_all_health_checks(engine: AsyncEngine):
     """
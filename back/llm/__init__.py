@@ -0,0 +1 @@
+# llm package
\ No newline at end of file
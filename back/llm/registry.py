@@ -0,0 +1,238 @@
+# back/llm/registry.py
+"""
+Central registry of the chat models.
+
+- Every model is built once per process and shared by the graph nodes, the
+  summarizer, deferred validation and the health checks.
+- Ollama clients (chat and the embedder) share one HTTP transport (connection
+  pool) with the warm pool.
+- Each model has its own concurrency limit; calls beyond it wait in line.
+  The local model's line is a FairScheduler (bounded, short nodes first,
+  round-robin across users; see back/llm/scheduler.py).
+- Every call records how long it waited for a slot (queue) and how long the
+  model took (generation); recent calls and totals are on /api/system/health.
+
+Models are wrapped, not copied: callbacks still reach the underlying chat
+model, so astream_events keeps streaming its tokens.
+"""
+import asyncio
+import os
+import re
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_ollama import ChatOllama, OllamaEmbeddings
+
+from .scheduler import FairScheduler, current_node
+from .settings import (
+    EMBEDDING_MODEL, GEMINI_MODEL, LOCAL_LLM_MODEL, LOCAL_NUM_CTX, LOCAL_OUTPUT_TOKENS, OLLAMA_BASE_URL
+)
+from .warm_pool import warm_pool
+
+# 3. Shared Variables
+# Concurrent generations per model (Ollama serializes on one GPU anyway)
+LLM_CONCURRENCY = {
+    "local": int(os.getenv("LOCAL_LLM_CONCURRENCY", "2")),
+    "gemini": int(os.getenv("GEMINI_CONCURRENCY", "4")),
+    "embedder": int(os.getenv("EMBEDDING_CONCURRENCY", "4")),
+}
+# Models whose calls go through admission control instead of a plain semaphore
+SCHEDULED_MODELS = {"local"}
+# Roles served by another model's client
+MODEL_ALIASES = {"summarizer": "gemini", "judge": "gemini"}
+LLM_RECENT_CALLS = int(os.getenv("LLM_RECENT_CALLS", "50"))
+# Queue waits longer than this are logged
+LLM_SLOW_QUEUE_SECONDS = float(os.getenv("LLM_SLOW_QUEUE_SECONDS", "1.0"))
+
+
+_DURATION_RE = re.compile(r"^(?P<value>\d+)(?P<unit>[smh])$")
+_DURATION_SECONDS = {"s": 1, "m": 60, "h": 3600}
+
+
+# 4. Shared Functions
+def _shared_transport_kwargs(model_class: Any) -> Dict[str, Any]:
+    # Older langchain-ollama releases have no async_client_kwargs; they keep their own pool
+    if "async_client_kwargs" in getattr(model_class, "model_fields", {}):
+        return {"async_client_kwargs": {"transport": warm_pool.transport}}
+    return {}
+
+
+def _keep_alive_seconds(keep_alive: Any) -> Optional[int]:
+    """ OllamaEmbeddings takes keep_alive in seconds; "30m" -> 1800. """
+    if isinstance(keep_alive, int):
+        return keep_alive
+    match = _DURATION_RE.match(str(keep_alive))
+    return int(match.group("value")) * _DURATION_SECONDS[match.group("unit")] if match else None
+
+
+def _build_local() -> ChatOllama:
+    kwargs = _shared_transport_kwargs(ChatOllama)
+    return ChatOllama(
+        model=LOCAL_LLM_MODEL,
+        base_url=OLLAMA_BASE_URL,
+        temperature=0,
+        num_ctx=LOCAL_NUM_CTX,
+        num_predict=LOCAL_OUTPUT_TOKENS,
+        keep_alive=warm_pool.keep_alive,
+        **kwargs
+    )
+
+
+def _build_gemini() -> ChatGoogleGenerativeAI:
+    return ChatGoogleGenerativeAI(model=GEMINI_MODEL, temperature=0)
+
+
+def _build_embedder() -> OllamaEmbeddings:
+    kwargs = _shared_transport_kwargs(OllamaEmbeddings)
+    # Without keep_alive every embedding request would reset the warm pool's pin to Ollama's default
+    keep_alive = _keep_alive_seconds(warm_pool.keep_alive)
+    if keep_alive is not None and "keep_alive" in getattr(OllamaEmbeddings, "model_fields", {}):
+        kwargs["keep_alive"] = keep_alive
+    return OllamaEmbeddings(model=EMBEDDING_MODEL, base_url=OLLAMA_BASE_URL, **kwargs)
+
+
+MODEL_BUILDERS: Dict[str, Callable[[], Any]] = {
+    "local": _build_local,
+    "gemini": _build_gemini,
+    "embedder": _build_embedder,
+}
+
+
+class ManagedLLM:
+    """
+    A model behind a semaphore (or a FairScheduler). `ainvoke` / `astream` (and
+    `aembed_query` for embedding models) are metered; any other attribute is
+    served by the wrapped model.
+    """
+    def __init__(self, name: str, model: Any, concurrency: int, scheduler: Optional[FairScheduler] = None):
+        self.name = name
+        self.model = model
+        self.concurrency = max(1, concurrency)
+        self.scheduler = scheduler
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.queue_seconds = 0.0
+        self.generation_seconds = 0.0
+        self.max_queue_seconds = 0.0
+        self.recent: deque = deque(maxlen=LLM_RECENT_CALLS)
+
+    async def _acquire(self) -> Tuple[float, Optional[str]]:
+        """ Waits for a slot; returns (seconds spent queued, calling node). """
+        node = current_node()
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            if self.scheduler is not None:
+                await self.scheduler.acquire(node)
+            else:
+                await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return time.perf_counter() - started, node
+
+    def _release(self, queued: float, generation: float, ok: bool, node: Optional[str] = None):
+        self.in_flight -= 1
+        if self.scheduler is not None:
+            self.scheduler.release(node, generation)
+        else:
+            self._semaphore.release()
+        self.calls += 1
+        self.failures += 0 if ok else 1
+        self.queue_seconds += queued
+        self.generation_seconds += generation
+        self.max_queue_seconds = max(self.max_queue_seconds, queued)
+        self.recent.append({
+            "queue_ms": round(queued * 1000, 1),
+            "generation_ms": round(generation * 1000, 1),
+            "ok": ok,
+        })
+        if queued >= LLM_SLOW_QUEUE_SECONDS:
+            print(f"  > [LLM] {self.name}: waited {queued:.2f}s for a slot ({self.waiting} still waiting)")
+
+    async def ainvoke(self, input: Any, config: Any = None, **kwargs) -> Any:
+        queued, node = await self._acquire()
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = await self.model.ainvoke(input, config, **kwargs)
+            ok = True
+            return result
+        finally:
+            self._release(queued, time.perf_counter() - started, ok, node)
+
+    async def astream(self, input: Any, config: Any = None, **kwargs):
+        queued, node = await self._acquire()
+        started = time.perf_counter()
+        ok = False
+        try:
+            async for chunk in self.model.astream(input, config, **kwargs):
+                yield chunk
+            ok = True
+        finally:
+            self._release(queued, time.perf_counter() - started, ok, node)
+
+    async def aembed_query(self, text: str) -> Any:
+        queued, node = await self._acquire()
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = await self.model.aembed_query(text)
+            ok = True
+            return result
+        finally:
+            self._release(queued, time.perf_counter() - started, ok, node)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.model, name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "scheduler": self.scheduler.stats() if self.scheduler is not None else None,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "calls": self.calls,
+            "failures": self.failures,
+            "avg_queue_ms": round(self.queue_seconds / self.calls * 1000, 1) if self.calls else 0.0,
+            "max_queue_ms": round(self.max_queue_seconds * 1000, 1),
+            "avg_generation_ms": round(self.generation_seconds / self.calls * 1000, 1) if self.calls else 0.0,
+            "recent": list(self.recent),
+        }
+
+
+class LLMRegistry:
+    """ Builds each model on first use and hands out the shared ManagedLLM. """
+    def __init__(self, concurrency: Dict[str, int] = LLM_CONCURRENCY):
+        self.concurrency = concurrency
+        self._models: Dict[str, ManagedLLM] = {}
+        self.schedulers: Dict[str, FairScheduler] = {
+            name: FairScheduler(concurrency.get(name, 1)) for name in SCHEDULED_MODELS
+        }
+
+    def get(self, name: str) -> ManagedLLM:
+        name = MODEL_ALIASES.get(name, name)
+        if name not in self._models:
+            builder = MODEL_BUILDERS.get(name)
+            if builder is None:
+                raise KeyError(f"Unknown model '{name}' (expected one of {sorted(MODEL_BUILDERS) + sorted(MODEL_ALIASES)})")
+            self._models[name] = ManagedLLM(
+                name, builder(), self.concurrency.get(name, 1), scheduler=self.schedulers.get(name)
+            )
+        return self._models[name]
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: model.stats() for name, model in self._models.items()}
+
+    async def aclose(self):
+        """ Closes the shared Ollama transport (owned by the warm pool's client). """
+        await warm_pool.aclose()
+
+
+# 전역 registry
+llm_registry = LLMRegistry()
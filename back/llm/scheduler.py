@@ -0,0 +1,209 @@
+# back/llm/scheduler.py
+"""
+Admission control for the local model.
+
+- At most `concurrency` generations run at once; up to `max_queue` more wait.
+  Beyond that a call fails immediately with LocalModelOverloaded instead of
+  piling up inside Ollama.
+- Short nodes (intent classification, planning, profile extraction) are served
+  before long generations.
+- Within a class, users take turns (round-robin), so one user's burst cannot
+  starve everyone else.
+- A caller that has to wait is told its position and an estimated wait through
+  the notifier of its request (`scheduler_request`); main.py sends it as a
+  `queued` WebSocket event.
+"""
+import asyncio
+import contextvars
+import os
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional
+
+from langchain_core.runnables.config import var_child_runnable_config
+
+# 3. Shared Variables
+LOCAL_QUEUE_MAX = int(os.getenv("LOCAL_QUEUE_MAX", "16"))
+# Nodes whose local-model calls are short and jump ahead of answer generation
+SHORT_NODES = {"clarify_intent", "initial_planner", "update_user_profile"}
+PRIORITY_SHORT = 0
+PRIORITY_LONG = 1
+# Initial guess of a call's duration (seconds) until real calls have been timed
+DEFAULT_HOLD_SECONDS = {PRIORITY_SHORT: 1.0, PRIORITY_LONG: 8.0}
+HOLD_SMOOTHING = 0.2
+
+
+class SchedulerRequest:
+    """ Who is asking (for fair sharing) and where to report queueing. """
+    def __init__(self, user_id: Hashable, notify: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None):
+        self.user_id = user_id
+        self.notify = notify
+
+
+# 전역 request context (set per WebSocket message; inherited by the graph's node tasks)
+scheduler_request: contextvars.ContextVar[Optional[SchedulerRequest]] = contextvars.ContextVar(
+    "scheduler_request", default=None
+)
+
+
+class LocalModelOverloaded(Exception):
+    """ The local model's queue is full; the caller should retry after `retry_after` seconds. """
+    def __init__(self, queue_depth: int, retry_after: float):
+        super().__init__(f"Local model is overloaded ({queue_depth} calls waiting)")
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+
+
+# 4. Shared Functions
+def current_node() -> Optional[str]:
+    """ Graph node making the current call (from the LangGraph run config), if any. """
+    config = var_child_runnable_config.get() or {}
+    return (config.get("metadata") or {}).get("langgraph_node")
+
+
+class FairScheduler:
+    """
+    Bounded, priority-then-round-robin queue in front of a model.
+    Waiters are futures granted by `_dispatch` when a slot is released.
+    """
+    def __init__(self, concurrency: int, max_queue: int = LOCAL_QUEUE_MAX):
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self.active = 0
+        # priority -> user -> waiting futures (users in turn order)
+        self._queues: Dict[int, "OrderedDict[Hashable, Deque[asyncio.Future]]"] = {
+            PRIORITY_SHORT: OrderedDict(),
+            PRIORITY_LONG: OrderedDict(),
+        }
+        self.hold_seconds = dict(DEFAULT_HOLD_SECONDS)
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for users in self._queues.values() for queue in users.values())
+
+    def overloaded(self) -> bool:
+        return self.waiting >= self.max_queue
+
+    def estimate_wait(self, ahead: Dict[int, int]) -> float:
+        """ Seconds until a slot frees up for a caller with `ahead[priority]` calls in front. """
+        work = sum(count * self.hold_seconds[priority] for priority, count in ahead.items())
+        # Running calls are assumed half done
+        work += self.active * self.hold_seconds[PRIORITY_LONG] / 2
+        return round(work / self.concurrency, 1)
+
+    def retry_after(self) -> float:
+        return self.estimate_wait({priority: sum(len(q) for q in users.values()) for priority, users in self._queues.items()})
+
+    def _ahead(self, priority: int, user: Hashable) -> Dict[int, int]:
+        """ Waiters served before the newest waiter of `user` in class `priority`. """
+        ahead = {p: 0 for p in self._queues}
+        for p, users in self._queues.items():
+            if p < priority:
+                ahead[p] = sum(len(queue) for queue in users.values())
+            elif p == priority:
+                turns = len(users[user]) - 1
+                ahead[p] = turns + sum(min(len(queue), turns + 1) for other, queue in users.items() if other != user)
+        return ahead
+
+    async def acquire(self, node: Optional[str] = None):
+        """ Waits for a slot; raises LocalModelOverloaded when the queue is full. """
+        request = scheduler_request.get()
+        user = request.user_id if request else None
+        node = node or current_node()
+        priority = PRIORITY_SHORT if node in SHORT_NODES else PRIORITY_LONG
+
+        if self.active < self.concurrency and self.waiting == 0:
+            self.active += 1
+            self.admitted += 1
+            return
+        if self.overloaded():
+            self.rejected += 1
+            raise LocalModelOverloaded(self.waiting, self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        users = self._queues[priority]
+        users.setdefault(user, deque()).append(future)
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.waiting)
+        try:
+            if request and request.notify:
+                ahead = self._ahead(priority, user)
+                try:
+                    await request.notify({
+                        "type": "queued",
+                        "node": node,
+                        "position": sum(ahead.values()) + 1,
+                        "estimated_wait_seconds": self.estimate_wait(ahead),
+                    })
+                except Exception as e:
+                    print(f"  > [Scheduler] Could not send queue position: {e}")
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was granted just before cancellation: hand it back
+                self.release()
+            else:
+                self._remove(priority, user, future)
+            raise
+        self.admitted += 1
+
+    def _remove(self, priority: int, user: Hashable, future: asyncio.Future):
+        queue = self._queues[priority].get(user)
+        if queue is None:
+            return
+        try:
+            queue.remove(future)
+        except ValueError:
+            pass
+        if not queue:
+            del self._queues[priority][user]
+
+    def _next(self) -> Optional[asyncio.Future]:
+        """ Oldest waiter of the next user in turn, highest priority class first. """
+        for priority in sorted(self._queues):
+            users = self._queues[priority]
+            while users:
+                user, queue = next(iter(users.items()))
+                future = queue.popleft()
+                if queue:
+                    users.move_to_end(user)
+                else:
+                    del users[user]
+                if not future.done():
+                    return future
+        return None
+
+    def _dispatch(self):
+        while self.active < self.concurrency:
+            future = self._next()
+            if future is None:
+                return
+            self.active += 1
+            future.set_result(None)
+
+    def release(self, node: Optional[str] = None, held_seconds: Optional[float] = None):
+        """ Frees a slot; `held_seconds` (the call's duration) refines the wait estimates. """
+        if held_seconds is not None:
+            priority = PRIORITY_SHORT if node in SHORT_NODES else PRIORITY_LONG
+            self.hold_seconds[priority] += HOLD_SMOOTHING * (held_seconds - self.hold_seconds[priority])
+        self.active -= 1
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "hold_seconds": {
+                "short": round(self.hold_seconds[PRIORITY_SHORT], 2),
+                "long": round(self.hold_seconds[PRIORITY_LONG], 2),
+            },
+        }
@@ -0,0 +1,15 @@
+# back/llm/settings.py
+import os
+
+# 3. Shared Variables
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434").rstrip("/")
+# Duration string ("30m") or seconds; "-1" keeps the models loaded indefinitely
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "exaone3.5")
+# Context window requested from Ollama (its default can be smaller than our prompts)
+LOCAL_NUM_CTX = int(os.getenv("LOCAL_NUM_CTX", "4096"))
+# Longest local answer; reserved out of LOCAL_NUM_CTX when prompts are packed
+LOCAL_OUTPUT_TOKENS = int(os.getenv("LOCAL_OUTPUT_TOKENS", "1024"))
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
+# Embedding model of the semantic answer cache (served by the same Ollama server)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "bge-m3")
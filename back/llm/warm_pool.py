@@ -0,0 +1,140 @@
+# back/llm/warm_pool.py
+"""
+Keeps the local Ollama models resident.
+
+- `preload`: POST /api/generate (or /api/embed for embedding models) without a
+  prompt loads the model and pins it for OLLAMA_KEEP_ALIVE. No tokens are generated.
+- `run_keepalive_loop`: re-pins every model periodically so Ollama never
+  unloads it between requests (a cold load is several seconds of first-token latency).
+- `probe`: GET /api/ps reports which models are loaded; used by the health checks.
+"""
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .settings import EMBEDDING_MODEL, LOCAL_LLM_MODEL, LOCAL_NUM_CTX, OLLAMA_BASE_URL, OLLAMA_KEEP_ALIVE
+
+# 3. Shared Variables
+OLLAMA_TOUCH_INTERVAL = float(os.getenv("OLLAMA_TOUCH_INTERVAL", "300"))
+# A model load can take a while on a cold GPU
+OLLAMA_LOAD_TIMEOUT = float(os.getenv("OLLAMA_LOAD_TIMEOUT", "120"))
+# Connection pool shared with the chat model clients (see back/llm/registry.py)
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "10"))
+
+
+# 4. Shared Functions
+class OllamaWarmPool:
+    """
+    Preloads and pins the configured models. `models` maps a model name to
+    "generate" (chat/completion model) or "embed" (embedding model).
+    """
+    def __init__(
+        self,
+        models: Optional[Dict[str, str]] = None,
+        base_url: str = OLLAMA_BASE_URL,
+        keep_alive: str = OLLAMA_KEEP_ALIVE
+    ):
+        self.models = models if models is not None else {LOCAL_LLM_MODEL: "generate", EMBEDDING_MODEL: "embed"}
+        self.base_url = base_url
+        self.keep_alive = int(keep_alive) if keep_alive.lstrip("-").isdigit() else keep_alive
+        self._transport: Optional[httpx.AsyncHTTPTransport] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self.loads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def transport(self) -> httpx.AsyncHTTPTransport:
+        if self._transport is None:
+            self._transport = httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(max_connections=OLLAMA_MAX_CONNECTIONS, max_keepalive_connections=OLLAMA_MAX_CONNECTIONS)
+            )
+        return self._transport
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=OLLAMA_LOAD_TIMEOUT, transport=self.transport)
+        return self._client
+
+    async def preload(self, model: str) -> bool:
+        payload: Dict[str, Any] = {"model": model, "keep_alive": self.keep_alive}
+        if self.models.get(model) == "embed":
+            endpoint = "/api/embed"
+        else:
+            endpoint = "/api/generate"
+            # Same num_ctx as the chat client, or Ollama reloads the model on the first request
+            payload["options"] = {"num_ctx": LOCAL_NUM_CTX}
+        try:
+            response = await self.client.post(endpoint, json=payload)
+            response.raise_for_status()
+            self.loads += 1
+            return True
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{model}: {e}"
+            print(f"  > [WarmPool] Could not load '{model}': {e}")
+            return False
+
+    async def preload_all(self) -> Dict[str, bool]:
+        results = await asyncio.gather(*(self.preload(model) for model in self.models))
+        return dict(zip(self.models, results))
+
+    async def loaded_models(self) -> List[Dict[str, Any]]:
+        """ Models currently held in memory by Ollama (GET /api/ps). """
+        response = await self.client.get("/api/ps", timeout=5)
+        response.raise_for_status()
+        return response.json().get("models") or []
+
+    async def probe(self) -> Dict[str, Any]:
+        """ Load state of every configured model, without generating. """
+        try:
+            loaded = {m.get("name", ""): m for m in await self.loaded_models()}
+        except Exception as e:
+            return {"reachable": False, "error": str(e), "models": {}}
+
+        def _find(model: str) -> Optional[Dict[str, Any]]:
+            # Ollama reports tagged names ("exaone3.5:latest")
+            return loaded.get(model) or loaded.get(f"{model}:latest")
+
+        return {
+            "reachable": True,
+            "models": {
+                model: {
+                    "loaded": _find(model) is not None,
+                    "expires_at": (_find(model) or {}).get("expires_at"),
+                    "size_vram": (_find(model) or {}).get("size_vram"),
+                }
+                for model in self.models
+            },
+        }
+
+    async def run_keepalive_loop(self, interval: float = OLLAMA_TOUCH_INTERVAL):
+        """ Re-pins every model; a touch on a resident model only resets its keep_alive timer. """
+        while True:
+            await asyncio.sleep(interval)
+            await self.preload_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "models": list(self.models),
+            "keep_alive": self.keep_alive,
+            "loads": self.loads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+    async def aclose(self):
+        """ Also closes the shared transport; call once at shutdown. """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        elif self._transport is not None:
+            await self._transport.aclose()
+        self._transport = None
+
+
+# 전역 warm pool
+warm_pool = OllamaWarmPool()
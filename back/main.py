@@ -3,40 +3,106 @@
 # 1. External Imports
 import asyncio
 import json
+import os
 import uuid
 from contextlib import asynccontextmanager
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Set
 from datetime import datetime
 
 from fastapi import Depends, FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlmodel.ext.asyncio.session import AsyncSession
 from langchain_core.messages import HumanMessage, AIMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 # 2. Internal Imports
 from back.db import crud
-from back.db.engine import async_engine, get_session, init_db
-from back.graph.graph import create_graph
+from back.db.engine import async_engine, async_session_factory, get_session, init_db
+from back.db.embeddings import embed_text
+from back.db.export import distillation_record, stream_distillation
+from back.db.history_writer import history_writer
+from back.db.partitions import require_partitioned, run_maintenance as run_partition_maintenance, run_maintenance_loop as run_partition_maintenance_loop
+from back.graph.checkpoint import BoundedMemorySaver, open_checkpointer, release_thread, run_retention_loop
+from back.graph.context import HISTORY_LOAD_LIMIT
+from back.graph.deferred_validation import validate_deferred
+from back.graph.local_validator import validation_metrics
+from back.graph.tool_output import tool_output_metrics
+from back.graph.graph import GRAPH_FANOUT_MODE, create_graph
 from back.tools.manager import MCPToolManager
+from back.tools.registry import ToolRegistry
 from back.health_checks import run_all_health_checks
+from back.llm.registry import llm_registry
+from back.llm.scheduler import LocalModelOverloaded, SchedulerRequest, scheduler_request
+from back.llm.warm_pool import warm_pool
+from back.summarizer import run_summarizer_loop
+from back.utils.answer_cache import answer_cache, is_cacheable
+from back.utils.rate_limiter import gemini_limiter
+from back.utils.single_flight import single_flight
 
 # 3. Shared Variables
+# Per-turn fields cleared when a conversation resumes from its checkpoint
+TURN_STATE_RESET = {
+    "user_intent": None,
+    "intent_source": None,
+    "rewritten_prompt": None,
+    "plan": None,
+    "tool_queue": None,
+    "tool_results": None,
+    "db_hit": None,
+    "final_answer": None,
+    "is_final_answer_satisfactory": None,
+    "gemini_unavailable": None,
+    "validation_deferred": None,
+    "current_node": None,
+}
 tool_manager: MCPToolManager | None = None
 graph: Any = None
+close_checkpointer: Any = None
 summarizer_llm: Any = None
 health_status: Dict[str, Any] = {}
+# Agent runs by thread_id (cancellable through /api/agent/stop)
 background_tasks: Dict[str, asyncio.Task] = {}
+# Service loops (partition maintenance, summarizer, ...); only shutdown cancels them
+service_tasks: Dict[str, asyncio.Task] = {}
+# Gemini judge runs for answers that were sent before validation
+deferred_validations: Set[asyncio.Task] = set()
+# Forward answer tokens as `token` events (otherwise only "thinking" placeholders are sent)
+STREAM_ANSWER_TOKENS = os.getenv("STREAM_ANSWER_TOKENS", "true").strip().lower() in ("1", "true", "yes", "on")
+STREAMED_ANSWER_NODES = {"check_with_8b", "synthesize_answer", "call_gemini"}
+OVERLOADED_MESSAGE = "요청이 많아 지금은 처리할 수 없습니다. 잠시 후 다시 시도해 주세요."
 
 # 4. Shared Functions (Lifespan)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global tool_manager, graph, summarizer_llm, health_status
+    global tool_manager, graph, summarizer_llm, health_status, close_checkpointer
     
     print("\n--- [System] Running Startup Health Checks ---")
     await init_db() 
+    # A pre-partitioning database needs the one-off --convert migration first
+    await require_partitioned()
+    try:
+        # Partitions for the current and upcoming months must exist before the first insert
+        await run_partition_maintenance()
+        service_tasks["partition_maintenance"] = asyncio.create_task(run_partition_maintenance_loop())
+    except Exception as e:
+        print(f"  \033[91m[WARN]\033[0m Partition maintenance failed: {e}")
+    try:
+        async with async_session_factory() as session:
+            backfilled = await crud.backfill_search_vectors(session)
+            digests = await crud.backfill_query_digests(session)
+        if backfilled:
+            print(f"  > Backfilled search vectors for {backfilled} history rows")
+        if digests:
+            print(f"  > Backfilled query digests for {digests} distillation rows")
+    except Exception as e:
+        print(f"  \033[91m[WARN]\033[0m Search vector / query digest backfill skipped: {e}")
     
+    # Load and pin the local models before the first request (and before the load-state probe)
+    warm_results = await warm_pool.preload_all()
+    print(f"  > Ollama warm pool: {warm_results} (keep_alive={warm_pool.keep_alive})")
+    service_tasks["ollama_keepalive"] = asyncio.create_task(warm_pool.run_keepalive_loop())
+
     # Run checks
     db_ok, ollama_ok, gemini_ok = await run_all_health_checks(async_engine)
     
@@ -56,25 +122,39 @@ async def lifespan(app: FastAPI):
     print("  > Initializing MCP Tool Manager...")
     tool_manager = MCPToolManager()
     await tool_manager.initialize()
+    tool_registry = ToolRegistry(await tool_manager.get_langchain_tools())
+    service_tasks["tool_registry_refresh"] = asyncio.create_task(tool_registry.run_refresh_loop(tool_manager))
     
     # MCP 연결 확인 로그
     if tool_manager.sessions:
         print(f"  \033[92m[OK]\033[0m MCP Connected: {len(tool_manager.sessions)} servers active.")
         # 로드된 툴 목록 출력 (디버깅용)
-        tools = await tool_manager.get_langchain_tools()
-        tool_names = [t.name for t in tools]
-        print(f"  > Loaded Tools: {tool_names}")
+        print(f"  > Loaded Tools: {list(tool_registry.signature)}")
     else:
         print("  \033[91m[WARN]\033[0m No MCP servers connected. Check 'mcp_server_config.json'.")
 
-    # 2. Graph Init
+    # 2. History Writer Init (write-behind ChatHistory persistence)
+    await history_writer.start()
+    print(f"  > Chat history writer mode: {history_writer.mode}")
+
+    # 3. Graph Init
     print("  > Creating Agent Graph...")
-    graph = await create_graph(tool_manager)
+    try:
+        checkpointer, close_checkpointer = await open_checkpointer()
+        if not isinstance(checkpointer, BoundedMemorySaver):
+            # Postgres threads are never evicted on their own
+            service_tasks["checkpoint_retention"] = asyncio.create_task(run_retention_loop(checkpointer))
+    except Exception as e:
+        print(f"  \033[91m[WARN]\033[0m Checkpointer unavailable, using in-memory checkpoints: {e}")
+        checkpointer, close_checkpointer = None, None
+    graph = await create_graph(tool_manager, tool_registry, checkpointer=checkpointer)
     
-    # 3. Summarizer Init (모델 버전 수정됨: 1.5 -> 2.5)
+    # 4. Summarizer Init (모델 버전 수정됨: 1.5 -> 2.5)
     print("  > Initializing Summarizer LLM...")
     try:
-        summarizer_llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp", temperature=0)
+        summarizer_llm = llm_registry.get("summarizer")
+        # Incremental daily summaries, built off the request path
+        service_tasks["daily_summarizer"] = asyncio.create_task(run_summarizer_loop(summarizer_llm))
     except Exception as e:
         print(f"  \033[91m[FAIL]\033[0m Summarizer Init failed: {e}")
 
@@ -83,9 +163,21 @@ async def lifespan(app: FastAPI):
     yield
     
     print("\n--- [System] Shutting down... ---")
+    for task in deferred_validations:
+        task.cancel()
+    # Let cancelled judges write their (unjudged) rows before the writer flushes
+    await asyncio.gather(*deferred_validations, return_exceptions=True)
+    await history_writer.stop()
+    print("  > Chat history flushed.")
+    for task in [*background_tasks.values(), *service_tasks.values()]:
+        if not task.done():
+            task.cancel()
+    if close_checkpointer:
+        await close_checkpointer()
     if tool_manager:
         await tool_manager.cleanup()
         print("  > MCP connections closed.")
+    await llm_registry.aclose()
 
 
 # 5. Pydantic Models
@@ -115,13 +207,115 @@ app.add_middleware(
 
 
 # 7. Helper Functions
-async def _summarize_if_needed(thread_id: str, db: AsyncSession):
+def _encode_history_cursor(row) -> str:
+    return f"{row.created_at.isoformat()}|{row.id}"
+
+
+def _decode_history_cursor(cursor: str):
+    try:
+        created_at, row_id = cursor.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid history cursor")
+
+
+async def _run_deferred_validation(
+    websocket: WebSocket,
+    values: Dict[str, Any],
+    user_message: str,
+    user_id: int,
+    conversation_id: str,
+    query_embedding: Optional[List[float]],
+    turn_id: str,
+    verdict_future: Optional[asyncio.Future] = None
+):
+    """
+    Judges an answer that was already sent, then stores the turn's single
+    assistant row. A rejected answer is replaced by a Gemini correction and
+    pushed as `answer_update` (matched by `turn_id` on the client). Only judged
+    answers get the question embedding and go to the answer cache.
+    `verdict_future` (set for coalesced runs) receives (verdict, answer, embedding)
+    so followers of the run get the same update.
     """
-    Placeholder for summarization logic.
-    In a real scenario, this would check chat volume and trigger summarization.
+    intent = values.get("user_intent", "unknown")
+    answer = values.get("final_answer")
+    embedding = None
+    verdict = "unjudged"
+    try:
+        verdict, correction = await validate_deferred(values, judge_llm=llm_registry.get("judge"), fallback_llm=llm_registry.get("gemini"))
+        if verdict == "corrected":
+            answer = correction
+        if verdict in ("approved", "corrected") and is_cacheable(intent, answer):
+            embedding = query_embedding
+            answer_cache.put(user_message, answer, user_id=user_id, intent=intent)
+        if verdict == "corrected":
+            try:
+                await websocket.send_json({"type": "answer_update", "content": correction, "turn_id": turn_id})
+            except Exception as e:
+                print(f"[WS] Could not push answer update (client gone?): {e}")
+    finally:
+        if verdict_future is not None and not verdict_future.done():
+            verdict_future.set_result((verdict, answer, embedding))
+        # Written once, after judging (unjudged answers, e.g. on shutdown, are kept without an embedding)
+        await history_writer.write(intent=intent, role="assistant", content=answer, embedding=embedding, user_id=user_id, thread_id=conversation_id)
+
+
+async def _append_turn_to_thread(config: Dict[str, Any], user_message: str, answer: str):
+    """ Keeps a resumable thread complete when a turn was answered outside the graph. """
+    snapshot = await graph.aget_state(config)
+    if snapshot and snapshot.values.get("messages"):
+        await graph.aupdate_state(
+            config,
+            {"messages": [HumanMessage(content=user_message), AIMessage(content=answer)]},
+            as_node="give_final_answer"
+        )
+
+
+async def _follow_flight(
+    websocket: WebSocket,
+    flight,
+    user_message: str,
+    user_id: int,
+    conversation_id: str,
+    received_at: datetime
+):
     """
-    # 현재는 에러 방지용으로 비워둠 (추후 구현)
-    pass
+    Serves a coalesced request: replays the leader's events and final answer,
+    then stores this client's own ChatHistory rows. When the leader's answer is
+    judged after the turn, this client's answer row waits for the same verdict
+    (and gets the same `answer_update`).
+    """
+    print(f"[WS] Coalesced with an in-flight run ({flight.followers} follower(s))")
+    async for event in flight.subscribe():
+        await websocket.send_json(event)
+    result = flight.result
+    if result is None:
+        await websocket.send_json({"type": "error", "content": "처리 중 오류가 발생했습니다. 다시 시도해 주세요."})
+        await websocket.send_json({"type": "end"})
+        await history_writer.write(intent="unknown", role="user", content=user_message, user_id=user_id, thread_id=conversation_id, created_at=received_at)
+        return
+    await history_writer.write(intent=result["user_intent"], role="user", content=user_message, user_id=user_id, thread_id=conversation_id, created_at=received_at)
+    await websocket.send_json({"type": "end"})
+    if result.get("verdict") is not None:
+        task = asyncio.create_task(_follow_deferred_verdict(websocket, result, user_id, conversation_id))
+        deferred_validations.add(task)
+        task.add_done_callback(deferred_validations.discard)
+        return
+    await history_writer.write(intent=result["user_intent"], role="assistant", content=result["final_answer"], embedding=result["embedding"], user_id=user_id, thread_id=conversation_id)
+
+
+async def _follow_deferred_verdict(websocket: WebSocket, result: Dict[str, Any], user_id: int, conversation_id: str):
+    """ Follower side of `_run_deferred_validation`: same update, own answer row. """
+    answer, embedding = result["final_answer"], None
+    try:
+        verdict, answer, embedding = await asyncio.shield(result["verdict"])
+        if verdict == "corrected":
+            try:
+                await websocket.send_json({"type": "answer_update", "content": answer, "turn_id": result["turn_id"]})
+            except Exception as e:
+                print(f"[WS] Could not push answer update (client gone?): {e}")
+    finally:
+        await history_writer.write(intent=result["user_intent"], role="assistant", content=answer, embedding=embedding, user_id=user_id, thread_id=conversation_id)
 
 
 # 8. API Endpoints
@@ -148,17 +342,84 @@ async def agent_stop(request: StopRequest):
 @app.get("/api/agent/{thread_id}/state")
 async def get_agent_state(thread_id: str):
     config = {"configurable": {"thread_id": thread_id}}
-    state = await graph.get_state(config)
-    if not state:
+    state = await graph.aget_state(config)
+    if not state or not state.values:
         raise HTTPException(status_code=404, detail="Thread not found")
     return state.values
 
 
+@app.get("/api/users/{user_id}/history")
+async def get_user_history(
+    user_id: int,
+    limit: int = 20,
+    before: Optional[str] = None,
+    thread_id: Optional[str] = None,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Keyset-paginated chat history, newest first.
+    Pass the returned `next_cursor` as `before` to fetch the next page.
+    """
+    limit = max(1, min(limit, 100))
+    rows = await crud.get_history_page(
+        session,
+        user_id=user_id,
+        limit=limit,
+        before=_decode_history_cursor(before) if before else None,
+        thread_id=thread_id
+    )
+    return {
+        "items": [
+            {
+                "id": row.id,
+                "thread_id": row.thread_id,
+                "intent": row.intent,
+                "role": row.role,
+                "content": row.content,
+                "created_at": row.created_at.isoformat(),
+            }
+            for row in rows
+        ],
+        "next_cursor": _encode_history_cursor(rows[-1]) if len(rows) == limit else None
+    }
+
+
+@app.get("/api/distillation/export")
+async def export_distillation(since: Optional[str] = None, dedupe: bool = True):
+    """
+    Streams KnowledgeDistillation rows as JSONL (server-side cursor, constant memory).
+    For incremental exports, pass `since` as "<created_at>|<id>" of the last row received.
+    With `dedupe`, a query already exported by an earlier row (in this or a previous export) is skipped.
+    """
+    watermark = None
+    if since:
+        try:
+            watermark = _decode_history_cursor(since)
+        except HTTPException:
+            raise HTTPException(status_code=400, detail="Invalid export watermark (expected '<created_at>|<id>')")
+
+    async def _lines():
+        async with async_session_factory() as session:
+            async for row in stream_distillation(session, since=watermark, dedupe=dedupe):
+                yield json.dumps(distillation_record(row), ensure_ascii=False) + "\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
 @app.get("/api/system/health")
 async def system_health():
     return {
         "components": health_status,
-        "mcp_tools": len(tool_manager.sessions) if tool_manager else 0
+        "mcp_tools": len(tool_manager.sessions) if tool_manager else 0,
+        "answer_cache": answer_cache.stats(),
+        "history_writer": history_writer.stats(),
+        "validation": validation_metrics.stats(),
+        "gemini_limiter": gemini_limiter.stats(),
+        "single_flight": single_flight.stats(),
+        "tool_output": tool_output_metrics.stats(),
+        "llm": llm_registry.stats(),
+        "ollama_warm_pool": {**warm_pool.stats(), **(await warm_pool.probe())},
+        "checkpointer": graph.checkpointer.stats() if graph is not None and hasattr(graph.checkpointer, "stats") else None
     }
 
 
@@ -167,11 +428,15 @@ async def system_health():
 async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket for real-time chat with the agent.
-    Each message from a client starts a new, independent agent run.
+    Messages run on the conversation's graph thread ("thread_id" from the client,
+    otherwise one per connection), so a conversation resumes from its checkpoint.
     """
     await websocket.accept()
     print("[WS] Client connected")
 
+    # Conversation thread recorded on ChatHistory rows (clients may pass their own "thread_id")
+    connection_thread_id = str(uuid.uuid4())
+
     try:
         while True:
             # 1. Receive Message
@@ -194,10 +459,12 @@ async def websocket_endpoint(websocket: WebSocket):
             except (ValueError, TypeError):
                 user_id = 1
             
+            conversation_id = str(payload.get("thread_id") or connection_thread_id)
+
             print(f"[WS] Processing message: '{user_message}' from user {user_id}")
             
-            # ALWAYS create a new thread_id for each run to ensure a clean state.
-            thread_id = str(uuid.uuid4())
+            # The conversation is the graph thread; its checkpoint holds the earlier turns
+            thread_id = conversation_id
 
             # 2. Setup Graph Config
             config = {
@@ -208,52 +475,113 @@ async def websocket_endpoint(websocket: WebSocket):
             }
 
             # Get a new DB session for this interaction
-            async with AsyncSession(async_engine) as session:
-                # 0. Check DB for an existing matching answer
-                existing_answer = await crud.find_similar_answer(session, user_message)
-                if existing_answer:
+            async with async_session_factory() as session:
+                # 0. Check the in-process cache, then DB for a semantically similar, already answered question
+                #    (in speculative mode the graph runs the DB lookup next to intent classification)
+                query_embedding = None
+                cached_answer = answer_cache.get(user_message, user_id)
+                if cached_answer is None and GRAPH_FANOUT_MODE != "speculative":
+                    query_embedding = await embed_text(user_message)
+                    existing_answer = await crud.find_similar_answer(session, query_embedding, user_id=user_id)
+                    if existing_answer:
+                        cached_answer = existing_answer.content
+                        answer_cache.put(user_message, cached_answer, user_id=user_id, intent=existing_answer.intent)
+                    else:
+                        answer_cache.mark_miss(user_message, user_id)
+
+                if cached_answer is not None:
                     await websocket.send_json({
                         "type": "final_answer",
-                        "content": existing_answer.content
+                        "content": cached_answer
                     })
                     await websocket.send_json({"type": "end"})
                     # Save user message + reused assistant answer
-                    await crud.create_chat_history(session, intent="db_cache", role="user", content=user_message)
-                    await crud.create_chat_history(session, intent="db_cache", role="assistant", content=existing_answer.content)
+                    await history_writer.write(intent="db_cache", role="user", content=user_message, user_id=user_id, thread_id=conversation_id)
+                    # No embedding: the original row already serves the semantic cache (and carries its scope)
+                    await history_writer.write(intent="db_cache", role="assistant", content=cached_answer, user_id=user_id, thread_id=conversation_id)
+                    await _append_turn_to_thread(config, user_message, cached_answer)
                     continue
 
-                # 1. Load recent chat history for context (last 5 messages)
-                recent_history = await crud.get_recent_chat_history(session, limit=5)
-                recent_history = list(reversed(recent_history)) if recent_history else []
-
-                context_messages = []
-                for item in recent_history:
-                    if item.role == "user":
-                        context_messages.append(HumanMessage(content=item.content))
-                    else:
-                        context_messages.append(AIMessage(content=item.content))
+                # Local model saturated: reject now instead of letting the request time out in the queue
+                local_scheduler = llm_registry.schedulers["local"]
+                if local_scheduler.overloaded():
+                    await websocket.send_json({
+                        "type": "overloaded",
+                        "content": OVERLOADED_MESSAGE,
+                        "retry_after": local_scheduler.retry_after()
+                    })
+                    await websocket.send_json({"type": "end"})
+                    continue
 
-                # 3. Setup initial state (without db_session to avoid pickle error)
-                initial_state = {
-                    "messages": context_messages + [HumanMessage(content=user_message)],
-                    "user_id": user_id,
-                    "log": [],
-                }
+                # A checkpointed conversation resumes without reloading history from ChatHistory
+                snapshot = await graph.aget_state(config)
+                resumed = bool(snapshot and snapshot.values.get("messages"))
+
+                # An identical question already running: follow that run instead of starting another
+                # (fresh threads only; a resumed conversation gives the message its own context)
+                received_at = datetime.utcnow()
+                flight_key = None if resumed else single_flight.key(user_message, user_id)
+                flight, is_leader = single_flight.join(flight_key)
+                if not is_leader:
+                    await _follow_flight(websocket, flight, user_message, user_id, conversation_id, received_at)
+                    continue
 
-                # Save user message to DB
-                # TODO: The 'intent' is not yet classified here. We'll use a placeholder.
-                await crud.create_chat_history(session, intent="unknown", role="user", content=user_message)
+                # The user message is saved once the intent is known (training data for the
+                # local intent classifier), stamped with the time it was received
+                user_row_saved = False
+                flight_result = None
+                # Resolved with the deferred verdict for followers of this run
+                verdict_future: Optional[asyncio.Future] = None
 
+                # Everything after join() is covered by the finally below, so the flight is always finished
+                # (an unfinished flight would hang its followers and every later identical question)
                 try:
+                    async def emit(event: Dict[str, Any]):
+                        """ Sends to this client and replays to followers of the run. """
+                        await websocket.send_json(event)
+                        if flight is not None:
+                            flight.publish(event)
+
+                    # Local-model calls of this run queue fairly per user and report `queued` events
+                    scheduler_request.set(SchedulerRequest(user_id, emit))
+
+                    if resumed:
+                        initial_state = {
+                            **TURN_STATE_RESET,
+                            "messages": [HumanMessage(content=user_message)],
+                            "user_id": user_id,
+                            "query_embedding": query_embedding,
+                            "log": [],
+                        }
+                    else:
+                        # 1. Load this user's recent chat history for context (packed to the model's token budget later)
+                        recent_history = await crud.get_recent_chat_history(session, user_id=user_id, limit=HISTORY_LOAD_LIMIT)
+                        recent_history = list(reversed(recent_history)) if recent_history else []
+
+                        context_messages = []
+                        for item in recent_history:
+                            if item.role == "user":
+                                context_messages.append(HumanMessage(content=item.content))
+                            else:
+                                context_messages.append(AIMessage(content=item.content))
+
+                        # 3. Setup initial state (without db_session to avoid pickle error)
+                        initial_state = {
+                            "messages": context_messages + [HumanMessage(content=user_message)],
+                            "user_id": user_id,
+                            "query_embedding": query_embedding,
+                            "log": [],
+                        }
+
                     # 4. Execute Graph and Stream Results
-                    current_response = ""
+                    streamed_draft_node = None
                     async for event in graph.astream_events(initial_state, config=config, version="v1"):
                         kind = event["event"]
                         
                         # Node start/end notifications
                         if kind == "on_chain_start":
                             node_name = event.get("name", "unknown")
-                            await websocket.send_json({
+                            await emit({
                                 "type": "node_start",
                                 "content": f"🔄 {node_name} 실행 중...",
                                 "node": node_name
@@ -261,28 +589,42 @@ async def websocket_endpoint(websocket: WebSocket):
                         
                         elif kind == "on_chain_end":
                             node_name = event.get("name", "unknown")
-                            await websocket.send_json({
+                            await emit({
                                 "type": "node_end",
                                 "content": f"✅ {node_name} 완료",
                                 "node": node_name
                             })
+                            # The streamed draft was rejected: tell the client to drop it
+                            if node_name == "validate_answer" and streamed_draft_node:
+                                output = event.get("data", {}).get("output")
+                                if isinstance(output, dict) and output.get("is_final_answer_satisfactory") is False:
+                                    await emit({
+                                        "type": "retract",
+                                        "node": streamed_draft_node,
+                                        "content": "답변을 다시 생성하는 중입니다..."
+                                    })
+                                    streamed_draft_node = None
                         
-                        # LLM streaming
+                        # LLM streaming: answer tokens go to the client, everything else is "thinking"
                         elif kind == "on_chat_model_stream":
                             content = event["data"]["chunk"].content
                             if content:
-                                current_response += content
-                                await websocket.send_json({"type": "thinking", "content": "..."})
+                                stream_node = event.get("metadata", {}).get("langgraph_node")
+                                if STREAM_ANSWER_TOKENS and stream_node in STREAMED_ANSWER_NODES:
+                                    streamed_draft_node = stream_node
+                                    await emit({"type": "token", "content": content, "node": stream_node})
+                                else:
+                                    await emit({"type": "thinking", "content": "..."})
                         
                         # Tool execution notifications
                         elif kind == "on_tool_start":
-                            await websocket.send_json({
+                            await emit({
                                 "type": "tool_start",
                                 "content": f"🛠️ {event['name']} 실행 중..."
                             })
                         
                         elif kind == "on_tool_end":
-                            await websocket.send_json({
+                            await emit({
                                 "type": "tool_end",
                                 "content": f"✔️ {event['name']} 완료"
                             })
@@ -294,22 +636,66 @@ async def websocket_endpoint(websocket: WebSocket):
                         # The final answer is now stored in the 'final_answer' key
                         final_answer_content = final_state.values.get("final_answer", final_answer_content)
 
-                    # Send the final answer with tool metadata
+                    # Send the final answer with tool metadata (turn_id matches a later answer_update)
                     tool_results = final_state.values.get("tool_results", []) if final_state else []
-                    await websocket.send_json({
+                    turn_id = str(uuid.uuid4())
+                    await emit({
                         "type": "final_answer", 
                         "content": final_answer_content,
-                        "tool_results": tool_results
+                        "tool_results": tool_results,
+                        "turn_id": turn_id
                     })
 
-                    # Save AI message to DB
-                    # TODO: Get the actual intent from the final_state
+                    # Save user + AI messages to DB
                     final_intent = final_state.values.get("user_intent", "unknown")
-                    await crud.create_chat_history(session, intent=final_intent, role="assistant", content=final_answer_content)
+                    await history_writer.write(intent=final_intent, role="user", content=user_message, user_id=user_id, thread_id=conversation_id, created_at=received_at, intent_source=final_state.values.get("intent_source"))
+                    user_row_saved = True
+                    query_embedding = final_state.values.get("query_embedding") or query_embedding
+                    deferred = bool(final_state.values.get("validation_deferred"))
+                    # Unjudged answers (Gemini unavailable) and failure placeholders are neither cached nor embedded;
+                    # neither are cache hits (the original row already serves the semantic cache, with its scope)
+                    reusable = (
+                        is_cacheable(final_intent, final_answer_content)
+                        and not final_state.values.get("gemini_unavailable")
+                        and not final_state.values.get("db_hit")
+                    )
+                    if reusable and not deferred:
+                        answer_cache.put(user_message, final_answer_content, user_id=user_id, intent=final_intent)
+                    # Deferred answers are stored by _run_deferred_validation once judged (with the embedding if approved)
+                    if not deferred:
+                        await history_writer.write(intent=final_intent, role="assistant", content=final_answer_content, embedding=query_embedding if reusable else None, user_id=user_id, thread_id=conversation_id)
+                    if deferred and flight is not None:
+                        verdict_future = asyncio.get_running_loop().create_future()
+                    flight_result = {
+                        "user_intent": final_intent,
+                        "final_answer": final_answer_content,
+                        "embedding": query_embedding if reusable and not deferred else None,
+                        "turn_id": turn_id,
+                        "verdict": verdict_future
+                    }
                     
                     # 6. Finish Turn
                     await websocket.send_json({"type": "end"})
+
+                    # 7. Judge deferred answers off the request path
+                    if deferred:
+                        task = asyncio.create_task(_run_deferred_validation(
+                            websocket, dict(final_state.values), user_message, user_id, conversation_id, query_embedding, turn_id,
+                            verdict_future
+                        ))
+                        # From here on the task resolves the verdict (see the finally below)
+                        verdict_future = None
+                        deferred_validations.add(task)
+                        task.add_done_callback(deferred_validations.discard)
                 
+                except LocalModelOverloaded as overload:
+                    print(f"[WS] Rejected, local model overloaded: {overload}")
+                    await websocket.send_json({
+                        "type": "overloaded",
+                        "content": OVERLOADED_MESSAGE,
+                        "retry_after": overload.retry_after
+                    })
+                    await websocket.send_json({"type": "end"})
                 except Exception as graph_error:
                     print(f"[WS] Graph execution error: {graph_error}")
                     await websocket.send_json({
@@ -317,6 +703,14 @@ async def websocket_endpoint(websocket: WebSocket):
                         "content": f"처리 중 오류가 발생했습니다: {str(graph_error)}"
                     })
                     await websocket.send_json({"type": "end"})
+                finally:
+                    single_flight.finish(flight, flight_result)
+                    if verdict_future is not None and not verdict_future.done():
+                        # The judge never started (e.g. the leader's client left): followers keep the unjudged answer
+                        verdict_future.set_result(("unjudged", flight_result["final_answer"], None))
+                    await release_thread(graph.checkpointer, thread_id)
+                    if not user_row_saved:
+                        await history_writer.write(intent="unknown", role="user", content=user_message, user_id=user_id, thread_id=conversation_id, created_at=received_at)
 
     except WebSocketDisconnect:
         print("[WS] Client disconnected")
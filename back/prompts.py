@@ -47,16 +47,22 @@ TOOL_PLANNER_PROMPT = """Create a tool execution plan for the user's request.
 {user_message}
 </User Message>
 
+<User Profile>
+{user_profile}
+</User Profile>
+
 <Available Tools>
 {tools_json}
 </Available Tools>
 
 <Rules>
 1. Output ONLY a JSON array.
-2. Each item must be: {{ "name": "tool_name", "args": {{ ... }} }}
+2. Each item must be: {{ "id": "t1", "name": "tool_name", "args": {{ ... }}, "depends_on": [] }}
 3. Use 0-3 tools. Use an empty array [] if no tool is needed.
 4. Use the tool's argument schema if provided.
-5. Do NOT invent tools or arguments.
+5. "depends_on" lists ids of steps that must finish first. Leave it empty for independent steps (they run in parallel).
+6. Do NOT invent tools or arguments.
+7. Use the user profile only to fill in details the message leaves out (e.g. the user's city for a weather search).
 </Rules>
 
 JSON Array Only:
@@ -102,7 +108,7 @@ PROFILE_EXTRACTOR_PROMPT = """Extract personal information from the user's state
 # Rules:
 1. Extract key-value pairs (e.g., \"name\": \"John\", \"job\": \"developer\").
 2. For general preferences, use the key \"preference\".
-3. If no specific information is found, return an empty JSON object {}.
+3. If no specific information is found, return an empty JSON object {{}}.
 
 # Examples:
 Statement: \"My name is John and I am a doctor.\"
@@ -142,11 +148,32 @@ Output:
 # JSON Output:
 """
 
+# --- 4. Tool Output Reduction Node ---
+TOOL_CHUNK_SUMMARY_SYSTEM_PROMPT = "You are a Tool Output Summarizer."
+TOOL_CHUNK_SUMMARY_PROMPT = """Extract what answers the question from this part of a tool output.
+
+<Question>
+{question}
+</Question>
+
+<Tool Output ({tool_name})>
+{chunk}
+</Tool Output>
+
+<Rules>
+1. KEEP: Facts, numbers, names, paths, errors relevant to the question.
+2. DROP: Everything unrelated.
+3. OUTPUT: Short bullet points ONLY (same language as the output).
+</Rules>"""
+
+
 # --- 5. Check 8B Node (Synthesizer) ---
 CHECK_8B_SYSTEM_PROMPT = "You are a Result Synthesizer."
 CHECK_8B_PROMPT = """Synthesize the Tool Results into a final answer for \"부장님\".
 
 <Input>
+[Conversation]
+{history}
 [Intent] {user_intent}
 [Results] {tool_results}
 </Input>
@@ -165,6 +192,8 @@ GEMINI_FALLBACK_SYSTEM_PROMPT = "You are a Senior AI Consultant."
 GEMINI_FALLBACK_PROMPT = """The local model failed. Provide a superior answer and explain why.
 
 <Context>
+[Conversation]
+{history}
 [Intent] {user_intent}
 [Local Execution] {tool_results}
 </Context>
@@ -0,0 +1,109 @@
+# back/summarizer.py
+import asyncio
+import os
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+
+from langchain_core.messages import HumanMessage
+
+from back.db import crud
+from back.db.engine import async_session_factory
+from back.prompts import SUMMARIZER_PROMPT
+from back.utils.rate_limiter import gemini_limiter
+
+# 3. Shared Variables
+SUMMARY_INTERVAL = float(os.getenv("SUMMARY_INTERVAL", "600"))
+# Messages per LLM call; a busy day is folded in over several calls
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "200"))
+# Skip the newest messages: write-behind rows may still be in flight
+SUMMARY_SETTLE_SECONDS = float(os.getenv("SUMMARY_SETTLE_SECONDS", "30"))
+
+
+# 4. Shared Functions
+def _watermark(summary, day_start: datetime) -> Tuple[datetime, int]:
+    """
+    (created_at, id) keyset of the newest message already folded into `summary`.
+    Ids are positive, so id 0 sits just before every row at that timestamp:
+    no summary starts at the top of the day, and summaries written before the id
+    was stored re-read their boundary timestamp rather than risk skipping rows.
+    """
+    if summary is None:
+        return day_start, 0
+    return summary.updated_at, summary.last_message_id or 0
+
+
+async def summarize_day(llm, user_id: int, day: date, now: datetime) -> int:
+    """
+    Folds the messages of `day` that arrived after the stored summary's
+    watermark into that summary. Returns the number of messages summarized.
+    """
+    day_start, day_end = crud.day_bounds(day)
+    end = min(day_end, now - timedelta(seconds=SUMMARY_SETTLE_SECONDS))
+    summarized = 0
+
+    while True:
+        async with async_session_factory() as session:
+            summary = await crud.get_daily_summary(session, day, user_id=user_id)
+            messages = await crud.get_messages_between(
+                session, user_id, _watermark(summary, day_start), end, limit=SUMMARY_BATCH_SIZE
+            )
+        if not messages:
+            return summarized
+
+        history = "\n".join(
+            f"[{m.created_at:%H:%M}] {m.role}: {m.content}" for m in messages
+        )
+        prompt = SUMMARIZER_PROMPT.format(
+            existing_summary=summary.summary_content if summary else "(없음)",
+            history=history
+        )
+        await gemini_limiter.acquire("summarizer")
+        response = await llm.ainvoke([HumanMessage(content=prompt)])
+
+        async with async_session_factory() as session:
+            await crud.create_daily_summary(
+                session,
+                summary_date=day,
+                summary_content=response.content.strip(),
+                user_id=user_id,
+                updated_at=messages[-1].created_at,
+                last_message_id=messages[-1].id
+            )
+        summarized += len(messages)
+        if len(messages) < SUMMARY_BATCH_SIZE:
+            return summarized
+
+
+async def summarize_pending(llm, now: Optional[datetime] = None) -> int:
+    """
+    Incrementally summarizes yesterday and today for every user with recent activity.
+    Yesterday is included so messages sent just before midnight are not missed.
+    """
+    now = now or datetime.utcnow()
+    today = now.date()
+    days = [today - timedelta(days=1), today]
+    async with async_session_factory() as session:
+        user_ids = await crud.get_active_users(session, since=crud.day_bounds(days[0])[0])
+
+    total = 0
+    for user_id in user_ids:
+        for day in days:
+            total += await summarize_day(llm, user_id, day, now)
+    return total
+
+
+async def run_summarizer_loop(llm, interval_seconds: float = SUMMARY_INTERVAL):
+    """
+    Background task: runs `summarize_pending` every `interval_seconds`,
+    off the request path.
+    """
+    while True:
+        try:
+            count = await summarize_pending(llm)
+            if count:
+                print(f"[Summarizer] Summarized {count} new messages")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Summarizer] Summarization failed: {e}")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.tools import StructuredTool
+
+# Seconds between checks of the MCP tool list (0 disables the background refresh)
+TOOL_REGISTRY_REFRESH_INTERVAL = float(os.getenv("TOOL_REGISTRY_REFRESH_INTERVAL", "300"))
+# Number of tools shown to the planner per request
+TOOL_SHORTLIST_K = int(os.getenv("TOOL_SHORTLIST_K", "6"))
+
+# Tools (exact name or "server" prefix) favoured for each intent
+INTENT_TOOL_PRIORS: Dict[str, Tuple[str, ...]] = {
+    "Search": ("web_search",),
+    "System": ("filesystem",),
+    "Database": ("postgres",),
+}
+INTENT_PRIOR_BOOST = 0.25
+
+# Tool descriptions are English; map common Korean request words onto their vocabulary
+_KO_HINTS = {
+    "파일": "file", "폴더": "directory", "디렉토리": "directory", "디렉터리": "directory",
+    "목록": "list", "읽": "read", "열어": "read", "내용": "content read", "써": "write", "쓰기": "write",
+    "저장": "write", "만들": "create", "생성": "create", "수정": "edit", "삭제": "delete", "이동": "move",
+    "검색": "search", "찾": "search", "뉴스": "news search web", "웹": "web", "인터넷": "web search",
+    "데이터베이스": "database query sql", "디비": "database query sql", "테이블": "table query sql",
+    "쿼리": "query sql",
+}
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _safe_tool_schema(tool) -> Dict[str, Any]:
+    if not getattr(tool, "args_schema", None):
+        return {}
+    try:
+        return tool.args_schema.schema()
+    except Exception:
+        try:
+            return tool.args_schema.model_json_schema()
+        except Exception:
+            return {}
+
+
+class ToolRegistry:
+    """
+    Precompiled view of the available tools, built once from
+    MCPToolManager.get_langchain_tools() and rebuilt only when the tool list changes.
+    - `resolve()`: O(1) lookup by full name or by unprefixed alias ("write_file")
+    - `planner_payload`: compact JSON catalog for TOOL_PLANNER_PROMPT, serialized once
+    - `shortlist()`: top-k tools for a message/intent, so the planner prompt
+      stays the same size as more MCP servers are added
+    """
+    def __init__(self, tools: List[StructuredTool]):
+        self._build(tools)
+
+    def _build(self, tools: List[StructuredTool]):
+        self.tools = list(tools)
+        self.signature: Tuple[str, ...] = tuple(t.name for t in self.tools)
+        self.by_name: Dict[str, StructuredTool] = {t.name: t for t in self.tools}
+
+        # "server__tool" is also reachable as "tool"; the first server wins, exact names always win
+        self.aliases: Dict[str, StructuredTool] = {}
+        for tool in self.tools:
+            if "__" in tool.name:
+                alias = tool.name.split("__", 1)[1]
+                if alias not in self.by_name:
+                    self.aliases.setdefault(alias, tool)
+
+        self.catalog: Dict[str, Dict[str, Any]] = {}
+        for tool in self.tools:
+            schema = _safe_tool_schema(tool)
+            self.catalog[tool.name] = {
+                "name": tool.name,
+                "description": tool.description or "",
+                "args_schema": schema.get("properties", schema),
+            }
+        self.planner_payload = self.serialize(self.signature)
+        self._build_index()
+        self._payload_cache: Dict[Tuple[str, ...], str] = {}
+
+    @staticmethod
+    def _terms(text: str) -> List[str]:
+        text = (text or "").lower()
+        hints = [english for korean, english in _KO_HINTS.items() if korean in text]
+        text = text.replace("__", " ").replace("_", " ") + " " + " ".join(hints)
+        return _TOKEN_RE.findall(text)
+
+    def _build_index(self):
+        """ TF-IDF vectors over tool names + descriptions, built once per rebuild. """
+        docs = {
+            name: Counter(self._terms(f"{name} {entry['description']}"))
+            for name, entry in self.catalog.items()
+        }
+        doc_freq = Counter(term for terms in docs.values() for term in terms)
+        n_docs = max(len(docs), 1)
+        self.idf = {term: math.log((1 + n_docs) / (1 + df)) + 1.0 for term, df in doc_freq.items()}
+        self.vectors: Dict[str, Dict[str, float]] = {}
+        for name, terms in docs.items():
+            vector = {term: count * self.idf[term] for term, count in terms.items()}
+            norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+            self.vectors[name] = {term: v / norm for term, v in vector.items()}
+
+    def shortlist(self, message: str, intent: Optional[str] = None, k: int = TOOL_SHORTLIST_K) -> Tuple[str, ...]:
+        """
+        Top-k tool names for a message: cosine similarity against the TF-IDF
+        index plus a boost for tools associated with the intent.
+        Returned in catalog order so equal shortlists share a cached payload.
+        """
+        if len(self.signature) <= k:
+            return self.signature
+        query = Counter(self._terms(message))
+        query_vector = {term: count * self.idf[term] for term, count in query.items() if term in self.idf}
+        norm = math.sqrt(sum(v * v for v in query_vector.values())) or 1.0
+        priors = INTENT_TOOL_PRIORS.get(intent or "", ())
+
+        scores = {}
+        for name, vector in self.vectors.items():
+            score = sum(weight * vector.get(term, 0.0) for term, weight in query_vector.items()) / norm
+            if any(name == prior or name.startswith(f"{prior}__") for prior in priors):
+                score += INTENT_PRIOR_BOOST
+            scores[name] = score
+        top = set(sorted(scores, key=lambda name: scores[name], reverse=True)[:k])
+        return tuple(name for name in self.signature if name in top)
+
+    def planner_payload_for(self, names: Tuple[str, ...]) -> str:
+        """ Serialized catalog for a shortlist, cached per distinct shortlist. """
+        payload = self._payload_cache.get(names)
+        if payload is None:
+            if len(self._payload_cache) >= 256:
+                self._payload_cache.clear()
+            payload = self._payload_cache[names] = self.serialize(names)
+        return payload
+
+    def serialize(self, names) -> str:
+        """ Compact JSON catalog of the given tools, in the given order. """
+        items = [self.catalog[name] for name in names if name in self.catalog]
+        return json.dumps(items, ensure_ascii=False, separators=(",", ":"))
+
+    def resolve(self, name: str) -> Optional[StructuredTool]:
+        return self.by_name.get(name) or self.aliases.get(name)
+
+    def __len__(self) -> int:
+        return len(self.tools)
+
+    async def refresh(self, tool_manager) -> bool:
+        """
+        Re-reads the tool list and rebuilds the registry if it changed.
+        Returns True when a rebuild happened.
+        """
+        tools = await tool_manager.get_langchain_tools()
+        if tuple(t.name for t in tools) == self.signature:
+            return False
+        self._build(tools)
+        return True
+
+    async def run_refresh_loop(self, tool_manager, interval_seconds: float = TOOL_REGISTRY_REFRESH_INTERVAL):
+        """
+        Background task: keeps the registry in sync with the connected MCP servers.
+        """
+        while interval_seconds > 0:
+            await asyncio.sleep(interval_seconds)
+            try:
+                if await self.refresh(tool_manager):
+                    print(f"[Tools] Tool registry rebuilt: {len(self)} tools")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Tools] Tool registry refresh failed: {e}")
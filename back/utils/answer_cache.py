@@ -0,0 +1,95 @@
+import os
+import re
+import unicodedata
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .ttl_cache import TTLCache
+
+_SPACE_RE = re.compile(r"\s+")
+
+# Answers to these intents depend on the asking user (their history, machine): cached per user
+USER_SCOPED_INTENTS = {"Database", "System"}
+# Never cached (the answer acknowledges a profile update)
+UNCACHED_INTENTS = {"Profile"}
+# Failure placeholders the graph answers with when nothing could be generated
+FAILURE_ANSWERS = {
+    "죄송합니다. 답변을 생성하지 못했습니다.",
+    "죄송합니다. 현재 답변을 생성할 수 없습니다.",
+}
+
+
+def normalize_query(text: str) -> str:
+    """
+    Cache key for a user message.
+    - NFKC: composes decomposed Hangul jamo into syllables, folds full-width forms
+    - lowercases, drops punctuation/symbols, collapses whitespace
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = "".join(
+        " " if unicodedata.category(ch)[0] in ("P", "S") else ch
+        for ch in text
+    )
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def is_cacheable(intent: Optional[str], answer: Optional[str]) -> bool:
+    return bool(answer) and intent not in UNCACHED_INTENTS and answer.strip() not in FAILURE_ANSWERS
+
+
+class AnswerCache:
+    """
+    Normalized-message -> answer cache placed in front of Postgres.
+    Answers to user-scoped intents are keyed by (message, user_id), all others
+    by (message, None); a lookup tries the user's own entry first.
+    Misses are remembered briefly (per user) so the /ws/chat pre-check and the
+    db_search node don't both hit the database for the same turn.
+    """
+    def __init__(self, max_size: int, ttl_seconds: float, miss_ttl_seconds: float):
+        self.answers = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.recent_misses = TTLCache(max_size=max_size, ttl_seconds=miss_ttl_seconds)
+
+    def get(self, message: str, user_id: Optional[Hashable] = None) -> Optional[str]:
+        normalized = normalize_query(message)
+        # Probe the user's entry without counting, so a lookup records exactly one hit or miss
+        if user_id is not None and (normalized, user_id) in self.answers:
+            return self.answers.get((normalized, user_id))
+        return self.answers.get((normalized, None))
+
+    def put(
+        self,
+        message: str,
+        answer: str,
+        user_id: Optional[Hashable] = None,
+        intent: Optional[str] = None
+    ) -> None:
+        """ Skips failure placeholders and uncached intents; scopes user-dependent intents to `user_id`. """
+        normalized = normalize_query(message)
+        if not normalized or not is_cacheable(intent, answer):
+            return
+        scope = user_id if intent in USER_SCOPED_INTENTS else None
+        self.answers.set((normalized, scope), answer)
+        self.recent_misses.pop(self._miss_key(message, user_id))
+
+    @staticmethod
+    def _miss_key(message: str, user_id: Optional[Hashable]) -> Tuple[str, Optional[Hashable]]:
+        return normalize_query(message), user_id
+
+    def mark_miss(self, message: str, user_id: Optional[Hashable] = None) -> None:
+        self.recent_misses.set(self._miss_key(message, user_id), True)
+
+    def recently_missed(self, message: str, user_id: Optional[Hashable] = None) -> bool:
+        return self._miss_key(message, user_id) in self.recent_misses
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.answers.stats(),
+            "negative_entries": len(self.recent_misses),
+        }
+
+
+# 전역 answer cache
+answer_cache = AnswerCache(
+    max_size=int(os.getenv("ANSWER_CACHE_SIZE", "2048")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    miss_ttl_seconds=float(os.getenv("ANSWER_CACHE_MISS_TTL", "30")),
+)
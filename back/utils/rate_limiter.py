@@ -1,37 +1,192 @@
 import asyncio
+import heapq
+import itertools
+import os
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from functools import wraps
 
+# Gemini free tier: 15 requests/minute shared by every caller
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "15"))
+# Per-purpose budgets inside the shared one
+GEMINI_BUDGETS = {
+    "fallback": int(os.getenv("GEMINI_FALLBACK_RPM", "10")),
+    "judge": int(os.getenv("GEMINI_JUDGE_RPM", "8")),
+    "summarizer": int(os.getenv("GEMINI_SUMMARIZER_RPM", "3")),
+    # Corrections of answers a deferred judge rejected (the user already has an answer)
+    "correction": int(os.getenv("GEMINI_CORRECTION_RPM", "3")),
+}
+# Lower value is served first: a user waiting for a fallback answer beats a judge call
+PRIORITIES = {"fallback": 0, "default": 1, "judge": 1, "summarizer": 2, "correction": 2}
+
+
+class TokenBucket:
+    """
+    `capacity` tokens, refilled continuously at `rate_per_minute`.
+    O(1) per call; no call history is kept.
+    """
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(float(rate_per_minute), 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= 1.0
+
+    def take(self):
+        self.tokens -= 1.0
+
+    def seconds_until_available(self, now: float) -> float:
+        self._refill(now)
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+
 class RateLimiter:
-    def __init__(self, calls_per_minute: int = 15):
+    """
+    Token-bucket limiter: one shared bucket plus optional named budgets.
+    A call needs a token from the shared bucket and from its budget's bucket.
+
+    Waiters are queued by priority and granted tokens by a timer callback, so
+    nothing sleeps while holding a lock and a throttled caller never blocks
+    callers on other budgets. `try_acquire` never waits.
+    """
+    def __init__(self, calls_per_minute: int = 15, budgets: Optional[Dict[str, int]] = None):
         self.calls_per_minute = calls_per_minute
-        self.calls = []
-        self.lock = asyncio.Lock()
-    
+        self.shared = TokenBucket(calls_per_minute)
+        self.budgets = {name: TokenBucket(rpm) for name, rpm in (budgets or {}).items()}
+        self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.granted: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.max_queue_depth = 0
+
+    def _buckets(self, budget: str) -> List[TokenBucket]:
+        bucket = self.budgets.get(budget)
+        return [self.shared, bucket] if bucket else [self.shared]
+
+    def _ready(self, budget: str, now: float) -> bool:
+        return all(bucket.available(now) for bucket in self._buckets(budget))
+
+    def _grant(self, budget: str):
+        for bucket in self._buckets(budget):
+            bucket.take()
+        self.granted[budget] = self.granted.get(budget, 0) + 1
+
+    def _queued_ahead(self, priority: int) -> bool:
+        return any(waiter[0] <= priority and not waiter[3].done() for waiter in self._waiters)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def try_acquire(self, budget: str = "default") -> bool:
+        """
+        Takes a token only if one is free right now and no caller of equal or
+        higher priority is queued. Returns False instead of waiting.
+        """
+        priority = PRIORITIES.get(budget, PRIORITIES["default"])
+        if not self._queued_ahead(priority) and self._ready(budget, time.monotonic()):
+            self._grant(budget)
+            return True
+        self.rejected[budget] = self.rejected.get(budget, 0) + 1
+        return False
+
+    async def acquire(self, budget: str = "default", priority: Optional[int] = None):
+        """ Waits until a token for `budget` is granted. """
+        if priority is None:
+            priority = PRIORITIES.get(budget, PRIORITIES["default"])
+        if not self._queued_ahead(priority) and self._ready(budget, time.monotonic()):
+            self._grant(budget)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), budget, future))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+        started = time.monotonic()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Token was granted just before cancellation: hand it back
+                for bucket in self._buckets(budget):
+                    bucket.tokens += 1.0
+            self._waiters = [waiter for waiter in self._waiters if waiter[3] is not future]
+            heapq.heapify(self._waiters)
+            self._dispatch()
+            raise
+        self.waited += 1
+        self.wait_seconds += time.monotonic() - started
+
+    def _dispatch(self):
+        """ Grants tokens to queued callers in priority order, then re-arms the timer. """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        pending = []
+        next_check = None
+        while self._waiters:
+            waiter = heapq.heappop(self._waiters)
+            priority, _, budget, future = waiter
+            if future.done():
+                continue
+            if self._ready(budget, now):
+                self._grant(budget)
+                future.set_result(None)
+                continue
+            pending.append(waiter)
+            delay = max(bucket.seconds_until_available(now) for bucket in self._buckets(budget))
+            next_check = delay if next_check is None else min(next_check, delay)
+            if not self.shared.available(now):
+                # Nobody can run before the shared bucket refills; keep the order
+                break
+        for waiter in pending:
+            heapq.heappush(self._waiters, waiter)
+        if self._waiters:
+            delay = next_check if next_check is not None else self.shared.seconds_until_available(now)
+            self._timer = asyncio.get_running_loop().call_later(max(delay, 0.01), self._dispatch)
+
     async def wait_if_needed(self):
-        async with self.lock:
-            now = time.time()
-            # 1분 이전 호출 기록 제거
-            self.calls = [call_time for call_time in self.calls if now - call_time < 60]
-            
-            if len(self.calls) >= self.calls_per_minute:
-                # 가장 오래된 호출로부터 60초 대기
-                wait_time = 60 - (now - self.calls[0])
-                if wait_time > 0:
-                    await asyncio.sleep(wait_time)
-                    # 대기 후 다시 정리
-                    now = time.time()
-                    self.calls = [call_time for call_time in self.calls if now - call_time < 60]
-            
-            self.calls.append(now)
+        """ Backwards-compatible entry point: waits on the shared bucket only. """
+        await self.acquire("default")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls_per_minute": self.calls_per_minute,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "granted": dict(self.granted),
+            "rejected": dict(self.rejected),
+            "waited": self.waited,
+            "avg_wait_seconds": round(self.wait_seconds / self.waited, 3) if self.waited else 0.0,
+        }
 
 # 전역 rate limiter
-gemini_limiter = RateLimiter(calls_per_minute=15)
-
-def rate_limited_gemini(func):
-    @wraps(func)
-    async def wrapper(*args, **kwargs):
-        await gemini_limiter.wait_if_needed()
-        return await func(*args, **kwargs)
-    return wrapper
\ No newline at end of file
+gemini_limiter = RateLimiter(calls_per_minute=GEMINI_RPM, budgets=GEMINI_BUDGETS)
+
+def rate_limited_gemini(func=None, *, budget: str = "default"):
+    """
+    Waits for a Gemini token before running `func`.
+    Usable as `@rate_limited_gemini` or `@rate_limited_gemini(budget="fallback")`.
+    """
+    def decorator(inner):
+        @wraps(inner)
+        async def wrapper(*args, **kwargs):
+            await gemini_limiter.acquire(budget)
+            return await inner(*args, **kwargs)
+        return wrapper
+    if func is not None:
+        return decorator(func)
+    return decorator
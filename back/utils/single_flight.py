@@ -0,0 +1,111 @@
+# back/utils/single_flight.py
+import asyncio
+import os
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Tuple
+
+from .answer_cache import normalize_query
+
+# "user": only the same user's identical questions share a run
+# "global": identical questions from any user share a run (answers must not depend on the user)
+# "off": no coalescing
+COALESCE_SCOPE = os.getenv("COALESCE_SCOPE", "user")
+
+_DONE = None
+
+
+class Flight:
+    """
+    One in-flight graph run. The leader publishes the events it sends to its
+    own client; followers get a replay of everything so far, then live events,
+    then the leader's result.
+    """
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.events: List[Dict[str, Any]] = []
+        self.subscribers: List[asyncio.Queue] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.done = False
+        self.followers = 0
+
+    def publish(self, event: Dict[str, Any]):
+        self.events.append(event)
+        for queue in self.subscribers:
+            queue.put_nowait(event)
+
+    def finish(self, result: Optional[Dict[str, Any]]):
+        """ `result` is None when the leader failed. """
+        self.result = result
+        self.done = True
+        for queue in self.subscribers:
+            queue.put_nowait(_DONE)
+
+    async def subscribe(self) -> AsyncIterator[Dict[str, Any]]:
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in self.events:
+            queue.put_nowait(event)
+        if self.done:
+            queue.put_nowait(_DONE)
+        self.subscribers.append(queue)
+        try:
+            while True:
+                event = await queue.get()
+                if event is _DONE:
+                    return
+                yield event
+        finally:
+            self.subscribers.remove(queue)
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent questions: the first caller for a key
+    leads (runs the graph), later callers follow the leader's flight.
+    """
+    def __init__(self, scope: str = COALESCE_SCOPE):
+        if scope not in ("user", "global", "off"):
+            raise ValueError(f"Unknown coalesce scope '{scope}' (expected 'user', 'global' or 'off')")
+        self.scope = scope
+        self.flights: Dict[Hashable, Flight] = {}
+        self.led = 0
+        self.followed = 0
+
+    def key(self, message: str, user_id: int) -> Optional[Hashable]:
+        if self.scope == "off":
+            return None
+        normalized = normalize_query(message)
+        if not normalized:
+            return None
+        return (normalized,) if self.scope == "global" else (normalized, user_id)
+
+    def join(self, key: Optional[Hashable]) -> Tuple[Optional[Flight], bool]:
+        """
+        Returns (flight, is_leader). A None key never coalesces: (None, True).
+        """
+        if key is None:
+            return None, True
+        flight = self.flights.get(key)
+        if flight is not None and not flight.done:
+            flight.followers += 1
+            self.followed += 1
+            return flight, False
+        flight = self.flights[key] = Flight(key)
+        self.led += 1
+        return flight, True
+
+    def finish(self, flight: Optional[Flight], result: Optional[Dict[str, Any]]):
+        if flight is None:
+            return
+        flight.finish(result)
+        if self.flights.get(flight.key) is flight:
+            del self.flights[flight.key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "scope": self.scope,
+            "in_flight": len(self.flights),
+            "led": self.led,
+            "followed": self.followed,
+        }
+
+# 전역 single flight
+single_flight = SingleFlight()
@@ -6,7 +6,7 @@ export const useAgentStore = defineStore('agent', {
   state: () => ({
     messages: [],
     currentNode: 'idle',
-    status: 'waiting', // 'waiting', 'thinking', 'streaming', 'finished', 'error'
+    status: 'waiting', // 'waiting', 'queued', 'thinking', 'streaming', 'finished', 'error'
     logs: [],
     isConnected: false,
     nodeStates: {}, // node status (pending, running, completed, error)
@@ -51,16 +51,66 @@ export const useAgentStore = defineStore('agent', {
         case 'thinking':
           this.status = 'thinking';
           break;
+        case 'token': {
+          // Draft answer tokens; a new node's draft replaces the previous one
+          this.status = 'streaming';
+          let lastMessage = this.messages[this.messages.length - 1];
+          if (lastMessage && lastMessage.role === 'assistant') {
+            if (lastMessage.streamNode !== data.node) {
+              lastMessage.content = '';
+              lastMessage.streamNode = data.node;
+            }
+            lastMessage.content += data.content;
+          }
+          break;
+        }
+        case 'retract': {
+          // Validation rejected the streamed draft
+          this.status = 'thinking';
+          this.logs.unshift(data.content);
+          let lastMessage = this.messages[this.messages.length - 1];
+          if (lastMessage && lastMessage.role === 'assistant') {
+            lastMessage.content = '...';
+            lastMessage.streamNode = null;
+          }
+          break;
+        }
         case 'final_answer': {
           this.status = 'streaming';
           let lastMessage = this.messages[this.messages.length - 1];
           if (lastMessage && lastMessage.role === 'assistant') {
             lastMessage.content = data.content;
             lastMessage.tool_results = data.tool_results || [];
+            lastMessage.turnId = data.turn_id || null;
           }
           this.lastToolResults = data.tool_results || [];
           break;
         }
+        case 'answer_update': {
+          // Correction pushed after a deferred validation rejected the answer of turn `turn_id`
+          let updated = this.messages.find((m) => m.role === 'assistant' && m.turnId && m.turnId === data.turn_id);
+          if (!updated) {
+            break;
+          }
+          updated.content = data.content;
+          this.logs.unshift('[INFO] 답변이 검증 후 수정되었습니다.');
+          break;
+        }
+        case 'queued':
+          // Waiting for the local model
+          this.status = 'queued';
+          this.logs.unshift(`[INFO] 대기 중: ${data.position}번째 (약 ${data.estimated_wait_seconds}초)`);
+          break;
+        case 'overloaded': {
+          // Rejected at admission; the user can resend after retry_after seconds
+          this.status = 'error';
+          this.logs.unshift(`[WARN] ${data.content} (${data.retry_after}초 후 재시도)`);
+          let lastMessage = this.messages[this.messages.length - 1];
+          if (lastMessage && lastMessage.role === 'assistant' && lastMessage.content === '...') {
+            lastMessage.content = data.content;
+          }
+          break;
+        }
         case 'log':
           this.logs.unshift(data.content);
           break;
@@ -0,0 +1,62 @@
+# tests/test_answer_cache.py
+from back.utils.answer_cache import AnswerCache, is_cacheable, normalize_query
+
+
+def _cache() -> AnswerCache:
+    return AnswerCache(max_size=10, ttl_seconds=60, miss_ttl_seconds=60)
+
+
+def test_normalize_query_folds_case_punctuation_and_width():
+    assert normalize_query("  Hello,   World!! ") == "hello world"
+    assert normalize_query("ＡＢＣ？") == "abc"
+    # Decomposed jamo compose into the same syllables
+    assert normalize_query("한") == normalize_query("한")
+    assert normalize_query("?!") == ""
+
+
+def test_is_cacheable():
+    assert is_cacheable("Search", "서울은 맑습니다.")
+    assert not is_cacheable("Profile", "알겠습니다.")
+    assert not is_cacheable("Search", "죄송합니다. 답변을 생성하지 못했습니다.")
+    assert not is_cacheable("Search", "")
+
+
+def test_shared_answers_are_served_to_everyone():
+    cache = _cache()
+    cache.put("서울 날씨?", "맑음", user_id=1, intent="Search")
+    assert cache.get("서울 날씨", user_id=2) == "맑음"
+    assert cache.get("서울 날씨") == "맑음"
+
+
+def test_user_scoped_answers_stay_with_their_user():
+    cache = _cache()
+    cache.put("내 최근 질문", "A의 기록", user_id=1, intent="Database")
+    assert cache.get("내 최근 질문", user_id=1) == "A의 기록"
+    assert cache.get("내 최근 질문", user_id=2) is None
+
+
+def test_failures_and_profile_answers_are_not_cached():
+    cache = _cache()
+    cache.put("질문", "죄송합니다. 현재 답변을 생성할 수 없습니다.", user_id=1, intent="Search")
+    cache.put("내 이름은 민수", "알겠습니다.", user_id=1, intent="Profile")
+    assert len(cache.answers) == 0
+
+
+def test_each_lookup_counts_once():
+    cache = _cache()
+    cache.put("서울 날씨", "맑음", user_id=1, intent="Search")
+    cache.put("내 기록", "기록", user_id=1, intent="Database")
+    assert cache.get("서울 날씨", user_id=1) == "맑음"
+    assert cache.get("내 기록", user_id=1) == "기록"
+    assert cache.get("없는 질문", user_id=1) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_misses_are_remembered_per_user_until_an_answer_is_stored():
+    cache = _cache()
+    cache.mark_miss("질문", user_id=1)
+    assert cache.recently_missed("질문!", user_id=1)
+    assert not cache.recently_missed("질문", user_id=2)
+    cache.put("질문", "답", user_id=1, intent="Search")
+    assert not cache.recently_missed("질문", user_id=1)
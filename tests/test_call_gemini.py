@@ -0,0 +1,43 @@
+# tests/test_call_gemini.py
+import asyncio
+import importlib
+
+from langchain_core.messages import HumanMessage
+
+# back.graph.nodes re-exports the node function under the module's name
+call_gemini_module = importlib.import_module("back.graph.nodes.call_gemini")
+from back.utils.rate_limiter import RateLimiter
+
+
+class _FailingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        raise RuntimeError("quota exceeded")
+
+
+def _state(**extra):
+    return {"messages": [HumanMessage(content="서울 날씨")], "user_intent": "Search", "log": [], **extra}
+
+
+def test_unavailable_gemini_takes_no_token(monkeypatch):
+    limiter = RateLimiter(calls_per_minute=5, budgets={"fallback": 1})
+    monkeypatch.setattr(call_gemini_module, "gemini_limiter", limiter)
+    llm = _FailingLLM()
+    result = asyncio.run(call_gemini_module.call_gemini(
+        _state(gemini_unavailable=True, final_answer="로컬 답변"), llm=llm
+    ))
+    assert result == {"final_answer": "로컬 답변"}
+    assert llm.calls == 0
+    assert limiter.granted == {}
+
+
+def test_tokens_are_charged_to_the_given_budget(monkeypatch):
+    limiter = RateLimiter(calls_per_minute=5, budgets={"fallback": 1, "correction": 1})
+    monkeypatch.setattr(call_gemini_module, "gemini_limiter", limiter)
+    llm = _FailingLLM()
+    asyncio.run(call_gemini_module.call_gemini(_state(final_answer="초안"), llm=llm, budget="correction"))
+    assert llm.calls == 1
+    assert limiter.granted == {"correction": 1}
@@ -0,0 +1,60 @@
+# tests/test_context.py
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from back.graph.context import (  # noqa: E402
+    OUTPUT_RESERVE,
+    context_budget,
+    count_tokens,
+    pack_tool_results,
+    truncate_to_tokens,
+)
+
+
+def test_count_tokens():
+    assert count_tokens("") == 0
+    # One token per Hangul syllable, about four characters per token otherwise
+    assert count_tokens("안녕하세요") == 5
+    assert count_tokens("abcdefgh") == 2
+    assert count_tokens("abc def") == 2
+
+
+def test_truncate_to_tokens_keeps_short_text_and_marks_cuts():
+    assert truncate_to_tokens("short", 10) == "short"
+    assert truncate_to_tokens("short", 0) == ""
+    cut = truncate_to_tokens("가" * 100, 20)
+    assert cut.endswith("(생략)")
+    assert count_tokens(cut) <= 20
+
+
+def test_small_outputs_are_kept_whole_and_large_ones_share_the_rest():
+    small = {"tool_name": "clock", "output": "12:00"}
+    large = [{"tool_name": f"search{i}", "output": "가" * 1000} for i in range(2)]
+    packed = pack_tool_results([small, *large], 200)
+    lines = packed.split("\n")
+    assert lines[0] == "[clock] 12:00"
+    assert all(line.endswith("(생략)") for line in lines[1:])
+    # Equal outputs get equal shares of what the small one left over
+    assert abs(count_tokens(lines[1]) - count_tokens(lines[2])) <= 1
+    assert count_tokens(packed) <= 200
+
+
+def test_outputs_that_fit_are_untouched():
+    results = [{"tool_name": "a", "output": "one"}, {"tool_name": "b", "output": "two"}]
+    assert pack_tool_results(results, 1000) == "[a] one\n[b] two"
+
+
+def test_empty_or_string_tool_results():
+    assert pack_tool_results(None, 100) == "No tool results."
+    assert pack_tool_results([], 100) == "No tool results."
+    assert pack_tool_results("plain text", 100) == "plain text"
+
+
+def test_budget_subtracts_reserve_and_fixed_prompt():
+    empty = context_budget("local")
+    assert empty < context_budget("gemini")
+    assert context_budget("local", fixed_prompt="가" * 100) == empty - 100
+    assert context_budget("local", messages=3) < context_budget("local", messages=2)
+    assert context_budget("local", fixed_prompt="가" * 100_000) == 0
+    assert OUTPUT_RESERVE["local"] > 0
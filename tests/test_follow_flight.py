@@ -0,0 +1,67 @@
+# tests/test_follow_flight.py
+import asyncio
+from datetime import datetime
+
+import back.main as main
+from back.utils.single_flight import SingleFlight
+
+
+class _Socket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, event):
+        self.sent.append(event)
+
+
+class _Writer:
+    def __init__(self):
+        self.rows = []
+
+    async def write(self, **row):
+        self.rows.append(row)
+
+
+def _follow(monkeypatch, verdict):
+    """ Runs a follower of a deferred leader run whose judge returns `verdict`. """
+    writer = _Writer()
+    monkeypatch.setattr(main, "history_writer", writer)
+
+    async def scenario():
+        flights = SingleFlight("user")
+        flight, _ = flights.join(flights.key("서울 날씨", 1))
+        follower_flight, _ = flights.join(flights.key("서울 날씨", 1))
+        socket = _Socket()
+        follower = asyncio.create_task(main._follow_flight(
+            socket, follower_flight, "서울 날씨", 1, "thread-b", datetime.utcnow()
+        ))
+        await asyncio.sleep(0)
+        flight.publish({"type": "final_answer", "content": "초안", "turn_id": "turn-1"})
+        future = asyncio.get_running_loop().create_future()
+        flights.finish(flight, {
+            "user_intent": "Chat", "final_answer": "초안", "embedding": None,
+            "turn_id": "turn-1", "verdict": future,
+        })
+        await follower
+        # The follower's answer row waits for the leader's verdict
+        assert [row["role"] for row in writer.rows] == ["user"]
+        future.set_result(verdict)
+        await asyncio.gather(*main.deferred_validations)
+        return socket.sent
+
+    return asyncio.run(scenario()), writer.rows
+
+
+def test_follower_receives_the_leaders_correction(monkeypatch):
+    sent, rows = _follow(monkeypatch, ("corrected", "수정된 답변", [0.1]))
+    assert [event["type"] for event in sent] == ["final_answer", "end", "answer_update"]
+    assert sent[-1] == {"type": "answer_update", "content": "수정된 답변", "turn_id": "turn-1"}
+    assert rows[-1]["role"] == "assistant"
+    assert rows[-1]["content"] == "수정된 답변"
+    assert rows[-1]["embedding"] == [0.1]
+
+
+def test_follower_keeps_an_approved_answer(monkeypatch):
+    sent, rows = _follow(monkeypatch, ("approved", "초안", None))
+    assert [event["type"] for event in sent] == ["final_answer", "end"]
+    assert rows[-1]["content"] == "초안"
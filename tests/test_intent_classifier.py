@@ -0,0 +1,90 @@
+# tests/test_intent_classifier.py
+import asyncio
+import importlib
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from langchain_core.messages import HumanMessage
+
+from back.graph import intent_classifier
+from back.graph.intent_classifier import SEED_EXAMPLES, IntentClassifier, get_intent_classifier, prompt_examples
+
+# back.graph.nodes re-exports the node functions under their module names
+clarify_module = importlib.import_module("back.graph.nodes.clarify_intent")
+
+
+@pytest.fixture(scope="module")
+def model():
+    return IntentClassifier.train(SEED_EXAMPLES + prompt_examples(), n_features=2 ** 12)
+
+
+class _FakeRouter:
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return SimpleNamespace(content=f" {self.answer}\n")
+
+
+class _FixedClassifier:
+    def __init__(self, label, probability):
+        self.result = (label, probability)
+
+    def predict(self, text):
+        return self.result
+
+
+def test_training_examples_are_classified(model):
+    for text, label in SEED_EXAMPLES:
+        assert model.predict(text)[0] == label
+
+
+def test_probabilities_sum_to_one(model):
+    proba = model.predict_proba(["오늘 뉴스 검색해줘", ""])
+    assert proba.shape == (2, len(model.labels))
+    assert np.allclose(proba.sum(axis=1), 1.0)
+
+
+def test_training_without_usable_samples_fails():
+    with pytest.raises(ValueError):
+        IntentClassifier.train([("", "Search"), ("hello", "Unknown")], n_features=64)
+
+
+def test_saved_model_round_trips(model, tmp_path):
+    path = str(tmp_path / "intent_model.npz")
+    model.save(path)
+    loaded = get_intent_classifier(path)
+
+    assert loaded.labels == model.labels
+    assert np.allclose(loaded.predict_proba(["파일 목록"]), model.predict_proba(["파일 목록"]))
+
+
+def test_missing_model_file_means_no_classifier(tmp_path):
+    assert get_intent_classifier(str(tmp_path / "missing.npz")) is None
+
+
+def test_prompt_examples_only_use_known_labels():
+    assert all(label in intent_classifier.INTENT_LABELS for _, label in prompt_examples())
+
+
+def test_confident_prediction_skips_the_router(monkeypatch):
+    monkeypatch.setattr(clarify_module, "get_intent_classifier", lambda: _FixedClassifier("System", 0.95))
+    router = _FakeRouter("Chat")
+
+    result = asyncio.run(clarify_module.clarify_intent({"messages": [HumanMessage(content="폴더 보여줘")]}, router))
+
+    assert result == {"user_intent": "System", "intent_source": "classifier"}
+    assert router.calls == 0
+
+
+def test_unsure_prediction_falls_back_to_the_router(monkeypatch):
+    monkeypatch.setattr(clarify_module, "get_intent_classifier", lambda: _FixedClassifier("System", 0.4))
+    router = _FakeRouter("Chat")
+
+    result = asyncio.run(clarify_module.clarify_intent({"messages": [HumanMessage(content="음...")]}, router))
+
+    assert result == {"user_intent": "Chat", "intent_source": "llm"}
+    assert router.calls == 1
@@ -0,0 +1,66 @@
+# tests/test_local_validator.py
+import pytest
+
+pytest.importorskip("sqlmodel")
+pytest.importorskip("pgvector")
+
+from back.graph.local_validator import (  # noqa: E402
+    check_hangul_ratio,
+    check_repetition,
+    check_truncation,
+    question_overlap,
+    score_answer,
+)
+
+WEATHER_OUTPUT = "서울의 오늘 날씨는 맑고 최고 기온은 25도, 최저 기온은 15도입니다. 미세먼지는 보통 수준입니다."
+
+
+def test_relevant_well_formed_answer_is_accepted():
+    verdict = score_answer("서울 날씨 알려줘", "오늘 서울 날씨는 맑고 최고 기온은 25도입니다.")
+    assert verdict.tier == "accept"
+    assert verdict.relevant
+
+
+def test_answer_grounded_in_tool_results_is_accepted():
+    verdict = score_answer("오늘 어때?", "맑고 최고 기온은 25도, 최저 기온은 15도입니다.", [WEATHER_OUTPUT])
+    assert verdict.tier == "accept"
+
+
+def test_off_topic_answer_goes_to_the_judge():
+    verdict = score_answer("서울 날씨 알려줘", "파이썬 리스트는 대괄호로 만들 수 있습니다.")
+    assert verdict.score >= 0.85
+    assert not verdict.relevant
+    assert verdict.tier == "judge"
+
+
+def test_short_fabricated_answer_with_short_tool_output_is_not_accepted():
+    verdict = score_answer("환율 알려줘", "1달러는 900원입니다.", ["rate: 1380"])
+    assert verdict.tier != "accept"
+
+
+def test_answer_ignoring_tool_results_is_penalized():
+    verdict = score_answer("서울 날씨 알려줘", "잘 모르겠지만 우산을 꼭 챙기세요.", [WEATHER_OUTPUT])
+    assert any("tool" in reason for reason in verdict.reasons)
+
+
+def test_degenerate_answers_are_rejected():
+    looping = "좋은 질문입니다. " * 30
+    assert score_answer("서울 날씨 알려줘", looping).tier == "reject"
+    assert score_answer("What is the weather in Seoul?", "The weather is sunny and warm today in Seoul").tier != "accept"
+
+
+def test_individual_checks():
+    assert check_hangul_ratio("안녕하세요. 반갑습니다.")[0] == 0.0
+    assert check_hangul_ratio("This answer is entirely in English.")[0] > 0.5
+    # Code and URLs do not count against the Hangul ratio
+    assert check_hangul_ratio("다음 코드를 실행하세요: `print('hello world')` https://example.com")[0] == 0.0
+    assert check_truncation("완료되었습니다.")[0] == 0.0
+    assert check_truncation("```python\nprint(1)")[0] == 1.0
+    assert check_truncation("그래서 결과는")[0] > 0
+    assert check_repetition("\n".join(["같은 줄이 반복됩니다 계속"] * 6))[0] > 0
+
+
+def test_question_overlap():
+    assert question_overlap("서울 날씨", "서울 날씨는 맑음") == 1.0
+    assert question_overlap("서울 날씨", "부산은 비") == 0.0
+    assert question_overlap("", "아무 답") == 0.0
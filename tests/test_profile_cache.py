@@ -0,0 +1,61 @@
+# tests/test_profile_cache.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from back.db import crud
+from back.db.profile_cache import profile_cache
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    profile_cache.clear()
+    yield
+    profile_cache.clear()
+
+
+def _fake_users(monkeypatch, users):
+    reads = []
+
+    async def get_user(session, user_id=1):
+        reads.append(user_id)
+        return users.get(user_id)
+
+    monkeypatch.setattr(crud, "get_user", get_user)
+    return reads
+
+
+def test_profile_is_read_from_the_database_once(monkeypatch):
+    reads = _fake_users(monkeypatch, {1: SimpleNamespace(info={"city": "서울"})})
+
+    async def scenario():
+        first = await crud.get_user_profile(None, 1)
+        second = await crud.get_user_profile(None, 1)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second == {"city": "서울"}
+    assert reads == [1]
+
+
+def test_callers_cannot_mutate_the_cached_profile(monkeypatch):
+    _fake_users(monkeypatch, {1: SimpleNamespace(info={"city": "서울"})})
+
+    async def scenario():
+        profile = await crud.get_user_profile(None, 1)
+        profile["city"] = "부산"
+        return await crud.get_user_profile(None, 1)
+
+    assert asyncio.run(scenario()) == {"city": "서울"}
+
+
+def test_unknown_user_is_not_cached(monkeypatch):
+    reads = _fake_users(monkeypatch, {})
+
+    async def scenario():
+        await crud.get_user_profile(None, 7)
+        return await crud.get_user_profile(None, 7)
+
+    assert asyncio.run(scenario()) is None
+    assert reads == [7, 7]
@@ -0,0 +1,92 @@
+# tests/test_rate_limiter.py
+import asyncio
+
+import pytest
+
+from back.utils.rate_limiter import RateLimiter, TokenBucket
+
+
+def _drain(limiter: RateLimiter, budget: str = "default"):
+    while limiter.try_acquire(budget):
+        pass
+
+
+def test_bucket_starts_full_and_refills_at_rate():
+    bucket = TokenBucket(rate_per_minute=60, capacity=2)
+    now = bucket.updated
+    assert bucket.available(now)
+    bucket.take()
+    bucket.take()
+    assert not bucket.available(now)
+    assert bucket.seconds_until_available(now) == pytest.approx(1.0)
+    assert bucket.available(now + 1.0)
+
+
+def test_bucket_never_exceeds_capacity():
+    bucket = TokenBucket(rate_per_minute=60, capacity=3)
+    bucket.available(bucket.updated + 3600)
+    assert bucket.tokens == 3
+
+
+def test_try_acquire_respects_budget_and_shared_bucket():
+    limiter = RateLimiter(calls_per_minute=5, budgets={"judge": 1})
+    assert limiter.try_acquire("judge")
+    # The judge budget is spent, the shared bucket is not
+    assert not limiter.try_acquire("judge")
+    assert limiter.try_acquire("default")
+    assert limiter.granted == {"judge": 1, "default": 1}
+    assert limiter.rejected == {"judge": 1}
+
+
+def test_waiters_are_served_by_priority():
+    async def scenario():
+        limiter = RateLimiter(calls_per_minute=600, budgets={"fallback": 600, "summarizer": 600})
+        _drain(limiter)
+        order = []
+
+        async def call(budget):
+            await limiter.acquire(budget)
+            order.append(budget)
+
+        summarizer = asyncio.create_task(call("summarizer"))
+        await asyncio.sleep(0)
+        fallback = asyncio.create_task(call("fallback"))
+        await asyncio.wait_for(asyncio.gather(summarizer, fallback), timeout=5)
+        return order, limiter
+
+    order, limiter = asyncio.run(scenario())
+    assert order == ["fallback", "summarizer"]
+    assert limiter.queue_depth == 0
+    assert limiter.waited == 2
+
+
+def test_try_acquire_does_not_jump_the_queue():
+    async def scenario():
+        limiter = RateLimiter(calls_per_minute=600)
+        _drain(limiter)
+        waiter = asyncio.create_task(limiter.acquire("default"))
+        await asyncio.sleep(0)
+        # A token refilled in the meantime belongs to the queued caller
+        limiter.shared.tokens = 1.0
+        jumped = limiter.try_acquire("default")
+        await asyncio.wait_for(waiter, timeout=5)
+        return jumped
+
+    assert asyncio.run(scenario()) is False
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = RateLimiter(calls_per_minute=1)
+        _drain(limiter)
+        waiter = asyncio.create_task(limiter.acquire("default"))
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.queue_depth == 0
+    assert limiter.waited == 0
@@ -0,0 +1,164 @@
+# tests/test_scheduler.py
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from back.llm.scheduler import FairScheduler, LocalModelOverloaded, SchedulerRequest, scheduler_request  # noqa: E402
+
+SHORT = "clarify_intent"
+LONG = "synthesize_answer"
+
+
+async def _call(scheduler, order, user, node=LONG, notify=None):
+    scheduler_request.set(SchedulerRequest(user, notify))
+    await scheduler.acquire(node)
+    order.append((user, node))
+
+
+async def _serve_all(scheduler, tasks, order):
+    """ Releases the slot held by the test, then each granted call's slot, one at a time. """
+    expected = len(order) + len(tasks)
+    scheduler.release()
+    while len(order) < expected:
+        await asyncio.sleep(0)
+        if scheduler.active:
+            scheduler.release()
+    await asyncio.gather(*tasks)
+
+
+def test_free_slot_is_granted_immediately():
+    async def scenario():
+        scheduler = FairScheduler(concurrency=2)
+        await scheduler.acquire(LONG)
+        await scheduler.acquire(LONG)
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert scheduler.active == 2
+    assert scheduler.waiting == 0
+    assert scheduler.admitted == 2
+
+
+def test_full_queue_rejects_with_retry_after():
+    async def scenario():
+        scheduler = FairScheduler(concurrency=1, max_queue=1)
+        order = []
+        await scheduler.acquire(LONG)
+        waiter = asyncio.create_task(_call(scheduler, order, "a"))
+        await asyncio.sleep(0)
+        with pytest.raises(LocalModelOverloaded) as overloaded:
+            await scheduler.acquire(LONG)
+        await _serve_all(scheduler, [waiter], order)
+        return scheduler, overloaded.value
+
+    scheduler, overloaded = asyncio.run(scenario())
+    assert overloaded.queue_depth == 1
+    assert overloaded.retry_after > 0
+    assert scheduler.rejected == 1
+
+
+def test_short_nodes_are_served_first():
+    async def scenario():
+        scheduler = FairScheduler(concurrency=1)
+        order = []
+        await scheduler.acquire(LONG)
+        long_call = asyncio.create_task(_call(scheduler, order, "a", LONG))
+        await asyncio.sleep(0)
+        short_call = asyncio.create_task(_call(scheduler, order, "b", SHORT))
+        await asyncio.sleep(0)
+        await _serve_all(scheduler, [long_call, short_call], order)
+        return order
+
+    assert asyncio.run(scenario()) == [("b", SHORT), ("a", LONG)]
+
+
+def test_users_take_turns():
+    async def scenario():
+        scheduler = FairScheduler(concurrency=1)
+        order = []
+        await scheduler.acquire(LONG)
+        tasks = []
+        for user in ("a", "a", "a", "b"):
+            tasks.append(asyncio.create_task(_call(scheduler, order, user)))
+            await asyncio.sleep(0)
+        await _serve_all(scheduler, tasks, order)
+        return [user for user, _ in order]
+
+    assert asyncio.run(scenario()) == ["a", "b", "a", "a"]
+
+
+def test_waiter_is_told_its_position():
+    async def scenario():
+        scheduler = FairScheduler(concurrency=1)
+        order, events = [], []
+
+        async def notify(event):
+            events.append(event)
+
+        await scheduler.acquire(LONG)
+        tasks = []
+        for user in ("a", "b"):
+            tasks.append(asyncio.create_task(_call(scheduler, order, user, notify=notify)))
+            await asyncio.sleep(0)
+        await _serve_all(scheduler, tasks, order)
+        return events
+
+    events = asyncio.run(scenario())
+    assert [event["type"] for event in events] == ["queued", "queued"]
+    assert [event["position"] for event in events] == [1, 2]
+    assert all(event["estimated_wait_seconds"] > 0 for event in events)
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        scheduler = FairScheduler(concurrency=1)
+        order = []
+        await scheduler.acquire(LONG)
+        waiter = asyncio.create_task(_call(scheduler, order, "a"))
+        await asyncio.sleep(0)
+        assert scheduler.waiting == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        scheduler.release()
+        return scheduler, order
+
+    scheduler, order = asyncio.run(scenario())
+    assert order == []
+    assert scheduler.waiting == 0
+    assert scheduler.active == 0
+
+
+def test_slot_granted_to_a_cancelled_waiter_is_handed_back():
+    async def scenario():
+        scheduler = FairScheduler(concurrency=1)
+        order = []
+        await scheduler.acquire(LONG)
+        first = asyncio.create_task(_call(scheduler, order, "a"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(_call(scheduler, order, "b"))
+        await asyncio.sleep(0)
+        # The slot goes to "a", which is cancelled before it can resume
+        scheduler.release()
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        await asyncio.sleep(0)
+        return scheduler, order, second
+
+    scheduler, order, second = asyncio.run(scenario())
+    assert order == [("b", LONG)]
+    assert second.done()
+    assert scheduler.active == 1
+
+
+def test_release_refines_hold_estimate():
+    scheduler = FairScheduler(concurrency=1)
+    scheduler.active = 1
+    before = scheduler.hold_seconds
+    short_before = before[0]
+    scheduler.release(SHORT, held_seconds=short_before + 10)
+    assert scheduler.hold_seconds[0] > short_before
+    assert scheduler.active == 0
@@ -0,0 +1,99 @@
+# tests/test_single_flight.py
+import asyncio
+
+import pytest
+
+from back.utils.single_flight import SingleFlight
+
+
+def test_key_scopes():
+    assert SingleFlight("user").key("Hello!", 1) == SingleFlight("user").key("hello", 1)
+    assert SingleFlight("user").key("hello", 1) != SingleFlight("user").key("hello", 2)
+    assert SingleFlight("global").key("hello", 1) == SingleFlight("global").key("hello", 2)
+    assert SingleFlight("off").key("hello", 1) is None
+    assert SingleFlight("user").key("?!", 1) is None
+
+
+def test_unknown_scope_is_rejected():
+    with pytest.raises(ValueError):
+        SingleFlight("everyone")
+
+
+def test_second_caller_follows_until_finished():
+    flights = SingleFlight("user")
+    key = flights.key("hello", 1)
+    leader, is_leader = flights.join(key)
+    follower, is_follower_leader = flights.join(key)
+    assert is_leader and not is_follower_leader
+    assert follower is leader
+    assert leader.followers == 1
+
+    flights.finish(leader, {"answer": "hi"})
+    assert key not in flights.flights
+    # A finished flight is never handed out again
+    again, leads_again = flights.join(key)
+    assert leads_again and again is not leader
+
+
+def test_none_key_never_coalesces():
+    flights = SingleFlight("off")
+    assert flights.join(None) == (None, True)
+    flights.finish(None, None)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_follower_gets_replay_then_live_events_then_result():
+    async def scenario():
+        flights = SingleFlight("user")
+        flight, _ = flights.join(flights.key("hello", 1))
+        flight.publish({"type": "node_start"})
+        received = []
+
+        async def follow():
+            async for event in flight.subscribe():
+                received.append(event)
+
+        follower = asyncio.create_task(follow())
+        await asyncio.sleep(0)
+        flight.publish({"type": "token"})
+        flights.finish(flight, {"answer": "hi"})
+        await asyncio.wait_for(follower, timeout=1)
+        return flight, received
+
+    flight, received = asyncio.run(scenario())
+    assert [event["type"] for event in received] == ["node_start", "token"]
+    assert flight.result == {"answer": "hi"}
+    assert flight.subscribers == []
+
+
+def test_failed_leader_releases_followers():
+    async def scenario():
+        flights = SingleFlight("user")
+        key = flights.key("hello", 1)
+        flight, _ = flights.join(key)
+        follower = asyncio.create_task(_collect(flight))
+        await asyncio.sleep(0)
+        # main.py finishes with None when the leader's turn raises
+        flights.finish(flight, None)
+        events = await asyncio.wait_for(follower, timeout=1)
+        return flights, key, flight, events
+
+    flights, key, flight, events = asyncio.run(scenario())
+    assert events == []
+    assert flight.done and flight.result is None
+    assert key not in flights.flights
+
+
+def test_late_subscriber_of_finished_flight_does_not_hang():
+    async def scenario():
+        flights = SingleFlight("user")
+        flight, _ = flights.join(flights.key("hello", 1))
+        flight.publish({"type": "final_answer"})
+        flights.finish(flight, {"answer": "hi"})
+        return await asyncio.wait_for(_collect(flight), timeout=1)
+
+    assert [event["type"] for event in asyncio.run(scenario())] == ["final_answer"]
+
+
+async def _collect(flight):
+    return [event async for event in flight.subscribe()]
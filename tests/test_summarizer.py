@@ -0,0 +1,89 @@
+# tests/test_summarizer.py
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from back import summarizer
+from back.db import crud
+
+
+DAY = date(2026, 3, 2)
+
+
+class _FakeLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages[0].content)
+        return SimpleNamespace(content=f"summary {len(self.prompts)}")
+
+
+def _fake_db(monkeypatch, rows, batch_size):
+    summaries = {}
+
+    @asynccontextmanager
+    async def session_factory():
+        yield None
+
+    async def get_daily_summary(session, summary_date, user_id=1):
+        return summaries.get((summary_date, user_id))
+
+    async def get_messages_between(session, user_id, after, end, limit=200):
+        picked = [m for m in rows if (m.created_at, m.id) > after and m.created_at < end]
+        return sorted(picked, key=lambda m: (m.created_at, m.id))[:limit]
+
+    async def create_daily_summary(session, summary_date, summary_content, user_id=1,
+                                   updated_at=None, last_message_id=None):
+        summaries[(summary_date, user_id)] = SimpleNamespace(
+            summary_content=summary_content, updated_at=updated_at, last_message_id=last_message_id
+        )
+
+    async def acquire(budget):
+        return None
+
+    monkeypatch.setattr(summarizer, "async_session_factory", session_factory)
+    monkeypatch.setattr(summarizer, "SUMMARY_BATCH_SIZE", batch_size)
+    monkeypatch.setattr(summarizer.gemini_limiter, "acquire", acquire)
+    monkeypatch.setattr(crud, "get_daily_summary", get_daily_summary)
+    monkeypatch.setattr(crud, "get_messages_between", get_messages_between)
+    monkeypatch.setattr(crud, "create_daily_summary", create_daily_summary)
+    return summaries
+
+
+def _message(message_id, created_at):
+    return SimpleNamespace(id=message_id, created_at=created_at, role="user", content=f"m{message_id}")
+
+
+def test_rows_sharing_the_batch_boundary_timestamp_are_not_skipped(monkeypatch):
+    same = datetime(2026, 3, 2, 9, 0, 0)
+    rows = [_message(1, same), _message(2, same), _message(3, same), _message(4, datetime(2026, 3, 2, 9, 5))]
+    summaries = _fake_db(monkeypatch, rows, batch_size=2)
+    llm = _FakeLLM()
+
+    count = asyncio.run(summarizer.summarize_day(llm, 1, DAY, now=datetime(2026, 3, 3)))
+
+    assert count == 4
+    assert "m3" in llm.prompts[1]
+    assert summaries[(DAY, 1)].last_message_id == 4
+
+
+def test_second_pass_only_reads_new_messages(monkeypatch):
+    rows = [_message(1, datetime(2026, 3, 2, 9, 0)), _message(2, datetime(2026, 3, 2, 9, 1))]
+    _fake_db(monkeypatch, rows, batch_size=10)
+    llm = _FakeLLM()
+    now = datetime(2026, 3, 3)
+
+    assert asyncio.run(summarizer.summarize_day(llm, 1, DAY, now)) == 2
+    rows.append(_message(3, datetime(2026, 3, 2, 9, 1)))
+    assert asyncio.run(summarizer.summarize_day(llm, 1, DAY, now)) == 1
+    assert asyncio.run(summarizer.summarize_day(llm, 1, DAY, now)) == 0
+
+
+def test_summaries_without_a_stored_id_reread_their_boundary_timestamp():
+    boundary = datetime(2026, 3, 2, 9, 0)
+    legacy = SimpleNamespace(updated_at=boundary, last_message_id=None)
+
+    assert summarizer._watermark(legacy, datetime(2026, 3, 2)) == (boundary, 0)
+    assert summarizer._watermark(None, datetime(2026, 3, 2)) == (datetime(2026, 3, 2), 0)
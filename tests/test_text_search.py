@@ -0,0 +1,45 @@
+# tests/test_text_search.py
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from back.db.text_search import BigramMatcher, bigram_document, get_matcher, korean_bigrams
+
+
+def test_words_split_into_character_bigrams():
+    assert korean_bigrams("안녕하세요") == ["안녕", "녕하", "하세", "세요"]
+
+
+def test_bigrams_do_not_cross_word_boundaries():
+    assert korean_bigrams("서울 날씨") == ["서울", "날씨"]
+
+
+def test_stem_matches_across_particles():
+    # "회의를" and "회의는" share the stem bigram without a morphological analyzer
+    assert set(korean_bigrams("회의를")) & set(korean_bigrams("회의는")) == {"회의"}
+
+
+def test_single_characters_are_kept_and_text_is_lowercased():
+    assert korean_bigrams("A 비") == ["a", "비"]
+    assert korean_bigrams("GPU") == ["gp", "pu"]
+
+
+def test_punctuation_and_empty_text_produce_no_tokens():
+    assert korean_bigrams(None) == []
+    assert korean_bigrams("?!...") == []
+    assert bigram_document("내일, 일정") == "내일 일정"
+
+
+def test_tsquery_operators_in_user_text_are_quoted():
+    statement = BigramMatcher().statement("a|b & 일정", k=5)
+    params = statement.compile(dialect=postgresql.dialect()).params
+    assert "'a' | 'b' | '일정'" in params.values()
+
+
+def test_query_without_tokens_has_no_statement():
+    assert BigramMatcher().statement("!!", k=5) is None
+
+
+def test_unknown_matcher_is_rejected():
+    assert get_matcher("bigram").name == "bigram"
+    with pytest.raises(ValueError):
+        get_matcher("missing")
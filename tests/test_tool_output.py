@@ -0,0 +1,60 @@
+# tests/test_tool_output.py
+from functools import partial
+
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("sqlmodel")
+
+from back.graph import tool_output  # noqa: E402
+from back.graph.tool_output import (  # noqa: E402
+    TOOL_OUTPUT_LIMITS,
+    chunk_text,
+    compact_tool_output,
+    output_limit,
+    select_chunks,
+)
+
+
+def test_chunk_text_splits_at_lines_and_keeps_everything():
+    text = "".join(f"line {i}\n" for i in range(50))
+    chunks = chunk_text(text, size=40)
+    assert "".join(chunks) == text
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert all(chunk.endswith("\n") for chunk in chunks)
+
+
+def test_chunk_text_cuts_overlong_lines():
+    chunks = chunk_text("x" * 25, size=10)
+    assert chunks == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def test_select_chunks_keeps_relevant_chunks_in_order(monkeypatch):
+    monkeypatch.setattr(tool_output, "chunk_text", partial(chunk_text, size=20))
+    filler = "무관한 내용입니다.\n" * 5
+    text = filler + "서울 날씨는 맑음입니다.\n" + filler + "서울 날씨 내일은 비.\n" + filler
+    kept = select_chunks("서울 날씨", text, limit=30)
+    joined = "".join(kept)
+    assert "서울 날씨는 맑음" in joined
+    assert "서울 날씨 내일은 비" in joined
+    assert "무관한" not in joined
+    assert sum(len(chunk) for chunk in kept) <= 30
+    # Original order is preserved
+    assert kept == sorted(kept, key=text.index)
+
+
+def test_select_chunks_falls_back_to_the_first_chunk():
+    kept = select_chunks("anything", "y" * 5000, limit=100)
+    assert kept == ["y" * 100]
+
+
+def test_output_limit_matches_server_prefix():
+    assert output_limit("filesystem__read_file") == TOOL_OUTPUT_LIMITS["filesystem"]
+    assert output_limit("web_search") == TOOL_OUTPUT_LIMITS["web_search"]
+    assert output_limit("unknown_tool") == TOOL_OUTPUT_LIMITS["default"]
+
+
+def test_compact_tool_output_unwraps_mcp_text():
+    assert compact_tool_output([{"type": "text", "text": "a"}, {"type": "text", "text": "b"}]) == "a\nb"
+    assert compact_tool_output({"k": [1, 2]}) == '{"k":[1,2]}'
+    assert compact_tool_output("plain") == "plain"
@@ -0,0 +1,85 @@
+# tests/test_tool_plan.py
+import asyncio
+import importlib
+from types import SimpleNamespace
+
+# back.graph.nodes re-exports the node functions under their module names
+execute_tools_module = importlib.import_module("back.graph.nodes.execute_tools")
+planner_module = importlib.import_module("back.graph.nodes.initial_planner")
+
+
+def _step(step_id, *depends_on):
+    return {"id": step_id, "name": step_id, "args": {}, "depends_on": list(depends_on)}
+
+
+class _FakeRegistry:
+    def __init__(self, tools):
+        self.tools = tools
+        self.started = []
+
+    def resolve(self, name):
+        handler = self.tools.get(name)
+        if handler is None:
+            return None
+
+        async def coroutine(**kwargs):
+            self.started.append(name)
+            return await handler(**kwargs)
+
+        return SimpleNamespace(name=name, coroutine=coroutine)
+
+
+def test_independent_steps_share_a_wave():
+    plan = [_step("a"), _step("b"), _step("c", "a", "b"), _step("d", "c"), _step("e", "a")]
+    assert execute_tools_module._execution_waves(plan) == [[0, 1], [2, 4], [3]]
+
+
+def test_forward_and_unknown_dependencies_are_ignored():
+    plan = [_step("a", "b"), _step("b", "missing")]
+    assert execute_tools_module._execution_waves(plan) == [[0, 1]]
+    assert execute_tools_module._execution_waves([]) == []
+
+
+def test_normalize_plan_keeps_only_backward_dependencies():
+    plan = planner_module._normalize_plan([
+        {"id": "s1", "name": "search", "args": {"q": "x"}, "depends_on": "s2"},
+        {"id": "s2", "name": "fetch", "depends_on": ["s1", "s9"]},
+        {"name": ""},
+        "not a step",
+    ])
+    assert plan == [
+        {"id": "s1", "name": "search", "args": {"q": "x"}, "depends_on": []},
+        {"id": "s2", "name": "fetch", "args": {}, "depends_on": ["s1"]},
+    ]
+
+
+def test_normalize_plan_fills_and_deduplicates_ids():
+    plan = planner_module._normalize_plan([{"name": "a"}, {"id": "t1", "name": "b"}, {"id": 3, "name": "c", "depends_on": [1]}])
+    assert [step["id"] for step in plan] == ["t1", "t1_2", "3"]
+    assert plan[2]["depends_on"] == []
+
+
+def test_execute_tools_runs_a_wave_concurrently_and_skips_failed_dependents():
+    both_started = asyncio.Event()
+    registry = None
+
+    async def slow(**kwargs):
+        # Only finishes once the other step of the wave has started too
+        if len(registry.started) == 2:
+            both_started.set()
+        await asyncio.wait_for(both_started.wait(), timeout=1)
+        return "ok"
+
+    async def broken(**kwargs):
+        raise RuntimeError("boom")
+
+    registry = _FakeRegistry({"a": slow, "b": slow, "c": broken, "d": slow})
+    plan = [_step("a"), _step("b"), _step("c", "a"), _step("d", "c")]
+
+    result = asyncio.run(execute_tools_module.execute_tools({"tool_queue": plan}, registry))
+
+    outputs = [r["output"] for r in result["tool_results"]]
+    assert outputs[:2] == ["ok", "ok"]
+    assert outputs[2] == "Error: boom"
+    assert outputs[3] == "Skipped: dependency 'c' failed."
+    assert "d" not in registry.started
@@ -0,0 +1,62 @@
+# tests/test_tool_registry.py
+import asyncio
+import json
+
+from langchain_core.tools import StructuredTool
+
+from back.tools.registry import ToolRegistry
+
+
+def _tool(name, description="", func=None):
+    def default(path: str = "") -> str:
+        return name
+
+    return StructuredTool.from_function(func=func or default, name=name, description=description or name)
+
+
+class _FakeManager:
+    def __init__(self, tools):
+        self.tools = tools
+
+    async def get_langchain_tools(self):
+        return self.tools
+
+
+def test_resolve_by_full_name_and_unprefixed_alias():
+    registry = ToolRegistry([_tool("filesystem__read_file"), _tool("other__read_file"), _tool("web_search")])
+
+    assert registry.resolve("web_search").name == "web_search"
+    assert registry.resolve("filesystem__read_file").name == "filesystem__read_file"
+    # The first server wins the alias
+    assert registry.resolve("read_file").name == "filesystem__read_file"
+    assert registry.resolve("missing") is None
+
+
+def test_exact_name_wins_over_alias():
+    registry = ToolRegistry([_tool("filesystem__search"), _tool("search")])
+    assert registry.resolve("search").name == "search"
+
+
+def test_planner_payload_is_compact_catalog_json():
+    registry = ToolRegistry([_tool("a", "first tool"), _tool("b", "second tool")])
+
+    catalog = json.loads(registry.planner_payload)
+    assert [item["name"] for item in catalog] == ["a", "b"]
+    assert "path" in catalog[0]["args_schema"]
+    assert ", " not in registry.planner_payload
+
+
+def test_payload_for_a_shortlist_is_cached():
+    registry = ToolRegistry([_tool("a"), _tool("b")])
+    first = registry.planner_payload_for(("b",))
+    assert registry.planner_payload_for(("b",)) is first
+    assert [item["name"] for item in json.loads(first)] == ["b"]
+
+
+def test_refresh_rebuilds_only_when_the_tool_list_changes():
+    registry = ToolRegistry([_tool("a")])
+
+    assert asyncio.run(registry.refresh(_FakeManager([_tool("a")]))) is False
+    assert asyncio.run(registry.refresh(_FakeManager([_tool("a"), _tool("srv__b")]))) is True
+    assert registry.resolve("b").name == "srv__b"
+    assert len(registry) == 2
@@ -0,0 +1,45 @@
+# tests/test_tool_shortlist.py
+from langchain_core.tools import StructuredTool
+
+from back.tools.registry import ToolRegistry
+
+
+def _tool(name, description):
+    def run(query: str = "") -> str:
+        return name
+
+    return StructuredTool.from_function(func=run, name=name, description=description)
+
+
+TOOLS = [
+    _tool("filesystem__read_file", "Read the content of a file"),
+    _tool("filesystem__write_file", "Write content to a file"),
+    _tool("filesystem__list_directory", "List the entries of a directory"),
+    _tool("web_search", "Search the web for news and pages"),
+    _tool("postgres__query", "Run a read-only SQL query against the database"),
+    _tool("calendar__list_events", "List calendar events"),
+]
+
+
+def test_small_catalog_is_returned_whole():
+    registry = ToolRegistry(TOOLS[:2])
+    assert registry.shortlist("anything", k=5) == registry.signature
+
+
+def test_korean_request_matches_english_descriptions():
+    registry = ToolRegistry(TOOLS)
+    assert registry.shortlist("이 폴더 목록 보여줘", k=1) == ("filesystem__list_directory",)
+    assert registry.shortlist("데이터베이스에서 조회해줘", k=1) == ("postgres__query",)
+
+
+def test_intent_prior_boosts_associated_tools():
+    registry = ToolRegistry(TOOLS)
+    assert registry.shortlist("오늘 어때?", intent="Search", k=1) == ("web_search",)
+
+
+def test_shortlist_keeps_catalog_order():
+    registry = ToolRegistry(TOOLS)
+    names = registry.shortlist("파일 읽고 웹 검색", k=3)
+    assert len(names) == 3
+    assert list(names) == [name for name in registry.signature if name in names]
+    assert "web_search" in names and "filesystem__read_file" in names